@@ -1,220 +1,652 @@
 
+import contextlib
+import hashlib
+import io
+import math
+import sqlite3
+import time
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 
-from catalog import all_models
-from finance import annual_schedule, irr, npv, simple_payback, discounted_payback
-from report import export_word
+import charts
+import dispatch
+import fleet
+import goalseek
+import instrument
+import montecarlo
+import optimize
+import performance
+import sensitivity
+import surrogate
+from cache import LRUCache, params_key
+from catalog import catalog
+from finance import hhv_scale
+from report import ReportJobs
+from store import ScenarioStore
 
 st.set_page_config(page_title="CHP Feasibility (Multi-OEM)", layout="wide")
 
-st.title("Natural Gas CHP Feasibility & Financial Model")
-st.caption("Efficiency per EPA CHP methods; OEM datasheets cited in the catalog for each model.")
+# Optional cProfile of this whole rerun (toggled in the Debug panel at the bottom of the sidebar) and
+# the rerun timer; both are closed in the finally below even when the script stops early (exception,
+# st.stop(), st.rerun())
+rerun_scope = contextlib.ExitStack()
+rerun_profile_out = (rerun_scope.enter_context(instrument.profiled())
+                     if st.session_state.get('debug_profile') else None)
+rerun_scope.enter_context(instrument.stage('app.rerun'))
 
-# --- Load engine list across OEMs ---
-models = all_models()
-model_names = [f"{m.oem} {m.model_name} ({m.family})" for m in models]
-sel = st.selectbox("Select engine model", model_names, index=0)
-m = models[model_names.index(sel)]
+try:
+    st.title("Natural Gas CHP Feasibility & Financial Model")
+    st.caption("Efficiency per EPA CHP methods; OEM datasheets cited in the catalog for each model.")
 
+    # --- Process-wide caches shared by every session and rerun ---
+    @st.cache_resource
+    def model_caches():
+        return {
+            'scenario': LRUCache(maxsize=512),
+            'profile': LRUCache(maxsize=16),
+            'chart': charts.CACHE,
+        }
 
-# --- Sidebar organized into logical sections with tooltips (V0.2 + BTU/hr support) ---
+    caches = model_caches()
 
-st.sidebar.header("Inputs")
+    @st.cache_resource
+    def report_jobs():
+        return ReportJobs(workers=2)
 
-# Engine
-with st.sidebar.expander("Engine", expanded=True):
-    power_kw = st.number_input(
-        "Rated power (kW)",
-        min_value=200.0, max_value=25000.0, value=float(m.rated_power_kw), step=10.0,
-        help="Override the catalog rated kW to test derating or alternate nodes."
-    )
-    eff_basis = st.selectbox(
-        "Efficiency basis", ["HHV","LHV"], index=0,
-        help="Most OEM datasheets publish LHV efficiency. Model assumes HHV by default for EPA-aligned total system comparisons."
-    )
-    elec_eff_pct = st.number_input(
-        "Electrical efficiency (%)",
-        min_value=25.0, max_value=55.0, value=float(m.electrical_efficiency_pct), step=0.1,
-        help="Electrical efficiency at rated conditions. If catalog is LHV, approximate HHV by multiplying LHV by ~1.11 for pipeline NG (future V0.3: automated conversion)."
+    @st.cache_resource
+    def surrogates():
+        return surrogate.SurrogateBuilder()
+
+    @st.cache_resource
+    def scenario_store():
+        # Saved scenarios persist across sessions; fall back to memory if the store path is not writable
+        try:
+            return ScenarioStore()
+        except (OSError, sqlite3.Error):
+            return ScenarioStore(':memory:')
+
+    # --- Load engine list across OEMs ---
+    with instrument.stage('app.catalog'):
+        engines = catalog()
+    sel = st.selectbox("Select engine model", engines.display_names, index=0)
+    m = engines.by_display_name(sel)
+
+
+    # --- Sidebar organized into logical sections with tooltips (V0.2 + BTU/hr support) ---
+
+    st.sidebar.header("Inputs")
+
+    # Engine
+    with st.sidebar.expander("Engine", expanded=True):
+        power_kw = st.number_input(
+            "Rated power (kW)",
+            min_value=200.0, max_value=25000.0, value=float(m.rated_power_kw), step=10.0,
+            help="Override the catalog rated kW to test derating or alternate nodes."
+        )
+        eff_basis = st.selectbox(
+            "Efficiency basis", ["HHV","LHV"], index=["HHV", "LHV"].index(m.efficiency_basis),
+            help=("Basis of the efficiencies entered below (defaults to the catalog record's). Most OEM datasheets "
+                  "publish LHV; LHV inputs are converted to HHV (÷ 1.108 for pipeline NG) for EPA-aligned totals.")
+        )
+        elec_eff_pct = st.number_input(
+            "Electrical efficiency (%)",
+            min_value=25.0, max_value=55.0, value=float(m.electrical_efficiency_pct), step=0.1,
+            help="Electrical efficiency at rated conditions, on the basis selected above."
+        )
+        use_fixed_thermal = st.checkbox(
+            "Use thermal output (BTU/hr) instead of thermal efficiency (%)",
+            value=False,
+            help=("Check to enter a fixed thermal output rate in BTU/hr. "
+                  "Uncheck to enter thermal efficiency (% of fuel input).")
+        )
+        if use_fixed_thermal:
+            # NEW: BTU/hr input
+            therm_output_btu_per_hr = st.number_input(
+                "Thermal output (BTU/hr)",
+                min_value=0.0, max_value=200_000_000.0, value=0.0, step=10_000.0,
+                help=("Instantaneous useful heat recovery rate. The model converts BTU/hr × operating hours to "
+                      "annual MMBtu (1 MMBtu = 1,000,000 BTU).")
+            )
+            therm_output_kw = 0.0   # not used in BTU/hr mode
+            therm_eff_pct = 0.0
+        else:
+            therm_output_btu_per_hr = 0.0
+            therm_output_kw = 0.0
+            therm_eff_pct = st.number_input(
+                "Thermal efficiency (% of fuel input)",
+                min_value=0.0, max_value=60.0, value=43.6, step=0.1,
+                help="Share of fuel input recovered as useful heat (CHP). Typical ranges 35–50% depending on engine and recovery design."
+            )
+        cap_factor = st.slider(
+            "Capacity factor",
+            min_value=0.0, max_value=1.0, value=0.90, step=0.01,
+            help="Average annual operating fraction (hours/8760). 0.90 ≈ ~7,884 hours."
+        )
+
+    # Site conditions
+    with st.sidebar.expander("Site conditions", expanded=False):
+        ambient_temp_c = st.number_input(
+            "Design ambient temperature (°C)", min_value=-40.0, max_value=55.0,
+            value=performance.ISO_TEMP_C, step=1.0,
+            help="Annual-average (or design) air temperature; hot sites derate engine output."
+        )
+        altitude_m = st.number_input(
+            "Site altitude (m)", min_value=0.0, max_value=5000.0, value=performance.ISO_ALTITUDE_M, step=50.0,
+            help="Thinner air at altitude derates engine output."
+        )
+        ambient_derate = performance.ambient_derate(m, ambient_temp_c, altitude_m)
+        st.caption(f"Site output: {ambient_derate:.1%} of rated "
+                   f"({'engine datasheet' if m.ambient_derate else 'generic'} derate table). "
+                   "An hourly profile with ambient_temp_c derates hour by hour instead.")
+
+    # Tariffs & Fuel
+    with st.sidebar.expander("Tariffs & Fuel", expanded=True):
+        tariff_elec = st.number_input(
+            "Avoided electricity ($/kWh)",
+            min_value=0.00, max_value=0.75, value=0.10, step=0.01,
+            help="Blended or marginal energy rate you avoid buying from the grid."
+        )
+        tariff_therm = st.number_input(
+            "Thermal value ($/MMBtu)",
+            min_value=0.00, max_value=40.00, value=8.00, step=0.10,
+            help=("Economic value per MMBtu of recovered heat (boiler displacement or thermal sales). "
+                  "Quick estimate if NG boiler: thermal value ≈ gas $/MMBtu ÷ boiler efficiency "
+                  "(e.g., $5 ÷ 0.80 ≈ $6.25/MMBtu).")
+        )
+        gas_price = st.number_input(
+            "Natural gas price ($/MMBtu)",
+            min_value=0.00, max_value=40.00, value=5.00, step=0.10,
+            help="Delivered fuel price on HHV basis."
+        )
+
+    # CapEx & O&M
+    with st.sidebar.expander("CapEx & O&M", expanded=True):
+        capex = st.number_input(
+            "CapEx ($)",
+            min_value=0.0, max_value=100_000_000.0, value=3_000_000.0, step=10_000.0,
+            help="Total installed cost before incentives."
+        )
+        om_fixed = st.number_input(
+            "Fixed O&M ($/yr)",
+            min_value=0.0, max_value=5_000_000.0, value=50_000.0, step=1_000.0,
+            help="Annual fixed O&M (maintenance contracts, inspections, etc.)."
+        )
+        om_var = st.number_input(
+            "Variable O&M ($/kWh)",
+            min_value=0.00, max_value=0.20, value=0.003, step=0.001,
+            help="Variable O&M per kWh generated (oil, consumables, overhauls allocated)."
+        )
+
+    # Financing
+    with st.sidebar.expander("Financing", expanded=True):
+        debt = st.slider(
+            "Debt fraction",
+            min_value=0.0, max_value=0.9, value=0.60, step=0.05,
+            help=("Share of net project cost financed with debt. The remainder is equity. "
+                  "Debt and equity are calculated after ITC is applied.")
+        )
+        interest = st.slider(
+            "Debt interest (real)",
+            min_value=0.0, max_value=0.20, value=0.07, step=0.005,
+            help="Real (post-inflation) interest rate on project debt."
+        )
+        term = st.slider(
+            "Debt term (years)",
+            min_value=0, max_value=25, value=10, step=1,
+            help="Amortization term for the debt annuity payment."
+        )
+        tax_rate = st.slider(
+            "Tax rate",
+            min_value=0.0, max_value=0.50, value=0.25, step=0.01,
+            help="Effective income tax rate. Interest and tax depreciation are deductible; losses carry forward."
+        )
+        macrs_class = st.selectbox(
+            "Tax depreciation (MACRS)", options=[5, 7, 15, 0],
+            format_func=lambda c: f"{c}-year MACRS" if c else "None",
+            help="MACRS class for the CHP equipment (5-year energy property by default). "
+                 "Basis is CapEx reduced by half the ITC."
+        )
+        bonus_pct = st.slider(
+            "Bonus depreciation (%)",
+            min_value=0.0, max_value=100.0, value=0.0, step=10.0,
+            help="Share of the depreciable basis expensed in year 1; the rest follows the MACRS table."
+        )
+        years = st.slider(
+            "Project life (years)",
+            min_value=5, max_value=30, value=20, step=1,
+            help="Evaluation horizon for IRR/NPV/payback."
+        )
+
+    # Policy
+    with st.sidebar.expander("Policy", expanded=True):
+        itc_pct = st.slider(
+            "IRA §48 ITC (%)",
+            min_value=0.0, max_value=40.0, value=30.0, step=1.0,
+            help=("Investment Tax Credit for CHP per IRA §48. Base 6%; up to 30% with prevailing wage "
+                  "and apprenticeship requirements. Additional bonuses may apply (domestic content, energy community).")
+        )
+
+    # Hourly dispatch
+    with st.sidebar.expander("Hourly profile (optional)", expanded=False):
+        profile_file = st.file_uploader(
+            "Hourly load & price profile (CSV or Parquet)", type=["csv", "parquet"],
+            help=("Columns: elec_load_kw (required), therm_load_mmbtu, price_elec, price_therm, price_gas, "
+                  "ambient_temp_c. "
+                  "When provided the engine is dispatched hour by hour (load following, part-load efficiency) "
+                  "and capacity factor acts as an availability derate.")
+        )
+        min_load_frac = st.slider(
+            "Minimum load (fraction of rated)",
+            min_value=0.0, max_value=1.0, value=0.5, step=0.05,
+            help="Below this load the engine shuts down in load-following dispatch."
+        )
+
+    # Multi-year escalation, degradation and major overhauls
+    with st.sidebar.expander("Escalation & degradation", expanded=False):
+        esc_elec = st.number_input("Electricity price escalation (%/yr)", value=0.0, step=0.25, format="%.2f")
+        esc_therm = st.number_input("Thermal value escalation (%/yr)", value=0.0, step=0.25, format="%.2f")
+        esc_gas = st.number_input("Gas price escalation (%/yr)", value=0.0, step=0.25, format="%.2f")
+        esc_om = st.number_input("O&M escalation (%/yr)", value=0.0, step=0.25, format="%.2f",
+                                 help="Also escalates the overhaul cost.")
+        degradation = st.number_input(
+            "Output degradation (%/yr)", min_value=0.0, max_value=10.0, value=0.0, step=0.1, format="%.2f",
+            help="Annual loss of electric and thermal output; restored at each major overhaul."
+        )
+        eff_degradation = st.number_input(
+            "Efficiency degradation (%/yr)", min_value=0.0, max_value=10.0, value=0.0, step=0.1, format="%.2f",
+            help="Annual loss of electrical efficiency (more fuel per kWh); restored at each major overhaul."
+        )
+        overhaul_interval = st.number_input(
+            "Major overhaul interval (years)", min_value=0, max_value=30, value=0, step=1,
+            help="0 = no scheduled overhauls."
+        )
+        overhaul_cost = st.number_input("Overhaul cost ($, today's dollars)", min_value=0.0, value=0.0, step=10000.0)
+
+    use_surrogate = st.sidebar.checkbox(
+        "Surrogate mode (instant slider feedback)", value=False,
+        help=("Answers gas price, tariff, capacity factor, CapEx and debt changes by interpolating a KPI grid "
+              "precomputed in the background around the current inputs (flat mode only). The exact model runs "
+              "once the inputs have settled; the schedule, chart, saved scenarios and reports always use it.")
     )
-    use_fixed_thermal = st.checkbox(
-        "Use thermal output (BTU/hr) instead of thermal efficiency (%)",
-        value=False,
-        help=("Check to enter a fixed thermal output rate in BTU/hr. "
-              "Uncheck to enter thermal efficiency (% of fuel input).")
+
+    params = dict(
+        power_kw=power_kw,
+        cap_factor=cap_factor,
+        elec_eff_pct=elec_eff_pct,
+        therm_output_btu_per_hr=therm_output_btu_per_hr,  # NEW
+        therm_output_kw=therm_output_kw,                  # legacy (unused if BTU/hr mode)
+        therm_eff_pct=therm_eff_pct,
+        hh_basis=eff_basis,
+        ambient_derate=ambient_derate,
+        ambient_temp_c=ambient_temp_c,
+        altitude_m=altitude_m,
+        tariff_elec=tariff_elec,
+        tariff_therm=tariff_therm,
+        gas_price_per_mmbtu=gas_price,
+        capex=capex,
+        itc_pct=itc_pct / 100.0,                          # slider is in %, model expects a fraction
+        om_fixed=om_fixed,
+        om_var_per_kwh=om_var,
+        years=years,
+        debt=debt,
+        interest=interest,
+        term=term,
+        tax_rate=tax_rate,
+        macrs_class=macrs_class,
+        bonus_pct=bonus_pct / 100.0,
+        esc_elec=esc_elec / 100.0,                        # inputs are in %/yr, model expects fractions
+        esc_therm=esc_therm / 100.0,
+        esc_gas=esc_gas / 100.0,
+        esc_om=esc_om / 100.0,
+        degradation=degradation / 100.0,
+        eff_degradation=eff_degradation / 100.0,
+        overhaul_interval=int(overhaul_interval),
+        overhaul_cost=overhaul_cost,
     )
-    if use_fixed_thermal:
-        # NEW: BTU/hr input
-        therm_output_btu_per_hr = st.number_input(
-            "Thermal output (BTU/hr)",
-            min_value=0.0, max_value=200_000_000.0, value=0.0, step=10_000.0,
-            help=("Instantaneous useful heat recovery rate. The model converts BTU/hr × operating hours to "
-                  "annual MMBtu (1 MMBtu = 1,000,000 BTU).")
-        )
-        therm_output_kw = 0.0   # not used in BTU/hr mode
-        therm_eff_pct = 0.0
+
+    npv_rate = 0.10
+
+    # Uploaded profile, parsed once per distinct file (shared by the exact model and the optimizer)
+    profile = profile_hash = None
+    if profile_file is not None:
+        profile_bytes = profile_file.getvalue()
+        profile_hash = hashlib.sha1(profile_bytes).hexdigest()
+        fmt = 'parquet' if profile_file.name.lower().endswith('.parquet') else 'csv'
+        try:
+            profile = caches['profile'].get_or_compute(
+                profile_hash, lambda: dispatch.load_profile(io.BytesIO(profile_bytes), fmt=fmt)
+            )
+        except ValueError as exc:
+            st.error(f"Hourly profile not used: {exc}")
+            profile = profile_hash = None
+
+    def exact_result():
+        # Exact model for the current inputs (cached per input set, so repeated calls in a rerun are free)
+        with instrument.stage('app.evaluate'):
+            if profile is not None:
+                hourly_params = dict(params, min_load_frac=min_load_frac, engine=sel)
+                return caches['scenario'].get_or_compute(
+                    params_key(hourly_params, npv_rate, profile_hash),
+                    lambda: scenario_store().get_or_evaluate(
+                        hourly_params, npv_rate, engine=sel, extra=(profile_hash,),
+                        energy=lambda: dispatch.annual_energy(hourly_params, profile))
+                )
+            return caches['scenario'].get_or_compute(
+                params_key(params, npv_rate), lambda: scenario_store().get_or_evaluate(params, npv_rate, engine=sel)
+            )
+
+    # Surrogate mode: KPIs from the precomputed grid when one covers these inputs. A
+    # slider rerun is answered from the grid alone; the exact model runs when its
+    # result is already cached, on request, or on the rerun queued SETTLE_SECONDS
+    # after the last input change (see the end of the script).
+    SETTLE_SECONDS = 1.0
+    approx = None
+    input_key = params_key(params, npv_rate)
+    if use_surrogate and profile is None:
+        with instrument.stage('app.surrogate'):
+            sg = surrogates().get(params, npv_rate)
+            approx = sg.predict(params) if sg is not None else None
+        if sg is None:
+            st.caption("Surrogate grid is building in the background; showing the exact model meanwhile.")
+    provisional = (approx is not None and input_key not in caches['scenario']
+                   and st.session_state.get('settled_inputs') != input_key)
+    if provisional and st.button("Compute exact results now"):
+        provisional = False
+
+    def _years(value):
+        # Whole years to payback, or ">life" when it never pays back (None, or NaN from the surrogate)
+        return ">life" if value is None or value != value else math.ceil(value)
+
+    col1, col2, col3, col4, col5 = st.columns(5)
+    if provisional:
+        err = sg.errors
+        col1.metric("IRR ≈", f"{approx['irr']*100:0.1f}%" if math.isfinite(approx['irr']) else "n/a")
+        col2.metric("NPV @10% ≈", f"${approx['npv']:,.0f}")
+        col3.metric("Payback (yrs) ≈", _years(approx['payback']))
+        col4.metric("Disc. Payback (yrs) ≈", _years(approx['disc_payback']))
+        col5.metric("Total Efficiency", "—")
+        st.caption(f"Provisional surrogate estimate ({sg.grid_size:,} grid points, built in {sg.build_seconds:.1f} s; "
+                   f"max error vs. the exact model on {surrogate.VALIDATION_POINTS} random points in the window: "
+                   f"IRR ±{err['irr']['max']*100:.2f} pts, NPV ±${err['npv']['max']:,.0f}, payback "
+                   f"±{err['payback']['max']:.1f} yrs). Exact results, schedule and chart follow once the inputs settle.")
     else:
-        therm_output_btu_per_hr = 0.0
-        therm_output_kw = 0.0
-        therm_eff_pct = st.number_input(
-            "Thermal efficiency (% of fuel input)",
-            min_value=0.0, max_value=60.0, value=43.6, step=0.1,
-            help="Share of fuel input recovered as useful heat (CHP). Typical ranges 35–50% depending on engine and recovery design."
-        )
-    cap_factor = st.slider(
-        "Capacity factor",
-        min_value=0.0, max_value=1.0, value=0.90, step=0.01,
-        help="Average annual operating fraction (hours/8760). 0.90 ≈ ~7,884 hours."
-    )
+        result = exact_result()
+        schedule, cf, total_eff = result['schedule'], result['cashflows'], result['total_eff']
+        irr_val, npv_val = result['irr'], result['npv']
+        pb, dpb = result['payback'], result['disc_payback']
 
-# Tariffs & Fuel
-with st.sidebar.expander("Tariffs & Fuel", expanded=True):
-    tariff_elec = st.number_input(
-        "Avoided electricity ($/kWh)",
-        min_value=0.00, max_value=0.75, value=0.10, step=0.01,
-        help="Blended or marginal energy rate you avoid buying from the grid."
-    )
-    tariff_therm = st.number_input(
-        "Thermal value ($/MMBtu)",
-        min_value=0.00, max_value=40.00, value=8.00, step=0.10,
-        help=("Economic value per MMBtu of recovered heat (boiler displacement or thermal sales). "
-              "Quick estimate if NG boiler: thermal value ≈ gas $/MMBtu ÷ boiler efficiency "
-              "(e.g., $5 ÷ 0.80 ≈ $6.25/MMBtu).")
-    )
-    gas_price = st.number_input(
-        "Natural gas price ($/MMBtu)",
-        min_value=0.00, max_value=40.00, value=5.00, step=0.10,
-        help="Delivered fuel price on HHV basis."
-    )
+        col1.metric("IRR", f"{irr_val*100:0.1f}%" if math.isfinite(irr_val) else "n/a")
+        col2.metric("NPV @10%", f"${npv_val:,.0f}")
+        col3.metric("Payback (yrs)", _years(pb))
+        col4.metric("Disc. Payback (yrs)", _years(dpb))
+        col5.metric("Total Efficiency", f"{total_eff*100:0.1f}%")
 
-# CapEx & O&M
-with st.sidebar.expander("CapEx & O&M", expanded=True):
-    capex = st.number_input(
-        "CapEx ($)",
-        min_value=0.0, max_value=100_000_000.0, value=3_000_000.0, step=10_000.0,
-        help="Total installed cost before incentives."
-    )
-    om_fixed = st.number_input(
-        "Fixed O&M ($/yr)",
-        min_value=0.0, max_value=5_000_000.0, value=50_000.0, step=1_000.0,
-        help="Annual fixed O&M (maintenance contracts, inspections, etc.)."
-    )
-    om_var = st.number_input(
-        "Variable O&M ($/kWh)",
-        min_value=0.00, max_value=0.20, value=0.003, step=0.001,
-        help="Variable O&M per kWh generated (oil, consumables, overhauls allocated)."
-    )
+        # Table
+        df = schedule.to_frame()
 
-# Financing
-with st.sidebar.expander("Financing", expanded=True):
-    debt = st.slider(
-        "Debt fraction",
-        min_value=0.0, max_value=0.9, value=0.60, step=0.05,
-        help=("Share of net project cost financed with debt. The remainder is equity. "
-              "Debt and equity are calculated after ITC is applied.")
-    )
-    interest = st.slider(
-        "Debt interest (real)",
-        min_value=0.0, max_value=0.20, value=0.07, step=0.005,
-        help="Real (post-inflation) interest rate on project debt."
-    )
-    term = st.slider(
-        "Debt term (years)",
-        min_value=0, max_value=25, value=10, step=1,
-        help="Amortization term for the debt annuity payment."
-    )
-    tax_rate = st.slider(
-        "Tax rate",
-        min_value=0.0, max_value=0.50, value=0.25, step=0.01,
-        help="Effective tax rate for simplified annual tax calc (V0.2 does not yet include depreciation shields)."
-    )
-    years = st.slider(
-        "Project life (years)",
-        min_value=5, max_value=30, value=20, step=1,
-        help="Evaluation horizon for IRR/NPV/payback."
-    )
+        # Chart (rendered once per distinct cash-flow vector)
+        with instrument.stage('app.chart'):
+            chart_png = charts.cashflow_png(df['year'], df['net_cf'], cache=caches['chart'])
+        st.image(chart_png)
+
+        st.subheader("Annual schedule")
+        st.dataframe(df[['year','rev_elec','rev_therm','fuel_cost','om_cost','overhaul_cost','debt_service','interest','depreciation','tax','net_cf']])
+
+    # Monte Carlo
+    with st.expander("Uncertainty (Monte Carlo P10/P50/P90)", expanded=False):
+        mc1, mc2, mc3 = st.columns(3)
+        mc_draws = mc1.number_input("Draws", min_value=1_000, max_value=200_000, value=20_000, step=1_000)
+        gas_spread = mc2.slider("Gas price ± (%)", 0, 100, 30, help="Triangular around the sidebar value.")
+        tariff_spread = mc3.slider("Tariffs ± (%)", 0, 100, 15, help="Triangular around electric and thermal values.")
+        mc4, mc5, mc6 = st.columns(3)
+        cf_sd = mc4.slider("Capacity factor σ", 0.0, 0.2, 0.05, 0.01, help="Normal around the sidebar value, clipped to [0, 1].")
+        capex_sigma = mc5.slider("CapEx σ (lognormal)", 0.0, 0.5, 0.15, 0.01)
+        gas_elec_rho = mc6.slider("Gas ↔ electricity correlation", -0.9, 0.9, 0.5, 0.05)
+
+        if st.button("Run Monte Carlo"):
+            def tri(value, pct):
+                return ('triangular', value * (1 - pct / 100), value, value * (1 + pct / 100))
+            dists = {
+                'gas_price_per_mmbtu': tri(gas_price, gas_spread),
+                'tariff_elec': tri(tariff_elec, tariff_spread),
+                'tariff_therm': tri(tariff_therm, tariff_spread),
+                'cap_factor': ('normal', cap_factor, cf_sd),
+                'capex': ('lognormal', capex, capex_sigma),
+            }
+            corr = {('gas_price_per_mmbtu', 'tariff_elec'): gas_elec_rho}
+            with instrument.stage('app.montecarlo'):
+                mc = caches['scenario'].get_or_compute(
+                    params_key(params, dists, list(corr.items()), int(mc_draws)),
+                    lambda: montecarlo.run(params, dists, n=int(mc_draws), correlations=corr, npv_rate=npv_rate, seed=0)
+                )
+            pcts = mc.percentiles()
+            st.table(pd.DataFrame({
+                'IRR': [f"{pcts['irr'][p]*100:0.1f}%" for p in (10, 50, 90)],
+                'NPV @10%': [f"${pcts['npv'][p]:,.0f}" for p in (10, 50, 90)],
+            }, index=['P10', 'P50', 'P90']))
+            if mc.no_irr_share > 0:
+                st.caption(f"{mc.no_irr_share:.1%} of draws have no solvable IRR (excluded from IRR percentiles).")
+            h1, h2 = st.columns(2)
+            h1.image(charts.render_histogram(mc.irr[mc.irr == mc.irr] * 100, "IRR distribution", "IRR (%)"))
+            h2.image(charts.render_histogram(mc.npv, "NPV distribution", "NPV ($)"))
+
+    # Fleet availability
+    with st.expander("Multi-unit plant & availability (fleet Monte Carlo)", expanded=False):
+        fl1, fl2, fl3 = st.columns(3)
+        fleet_units = fl1.number_input("Units of the selected engine", min_value=1, max_value=12, value=3, step=1)
+        fleet_redundancy = fl2.number_input(
+            "Redundant units (N+k)", min_value=0, max_value=int(fleet_units) - 1, value=min(1, int(fleet_units) - 1),
+            help="Firm output is the plant capacity with this many units out."
+        )
+        fleet_draws = fl3.number_input("Draws", min_value=100, max_value=50_000, value=2_000, step=100)
+        fl4, fl5, fl6, fl7 = st.columns(4)
+        fleet_rel = fleet.Reliability(
+            outages_per_year=fl4.number_input("Forced outages / unit-yr", min_value=0.0, value=6.0, step=0.5),
+            repair_hours=fl5.number_input("Mean repair (h)", min_value=0.0, value=24.0, step=4.0),
+            maintenance_hours=fl6.number_input("Planned maintenance (h/yr)", min_value=0.0, value=150.0, step=10.0),
+            overhaul_hours=fl7.number_input("Overhaul downtime (h)", min_value=0.0, value=500.0, step=50.0,
+                                            help="Per unit, every 'Major overhaul interval' years (staggered)."),
+        )
+        st.caption("Catalog ratings of the selected engine; CapEx, fixed O&M and overhaul cost scale with the unit "
+                   "count. Capacity factor is read as utilization of the firm output, excluding outages.")
+
+        if st.button("Simulate fleet"):
+            n_units = int(fleet_units)
+            fleet_params = dict(params, capex=capex * n_units, om_fixed=om_fixed * n_units,
+                                overhaul_cost=overhaul_cost * n_units)
+            with instrument.stage('app.fleet'):
+                fr = caches['scenario'].get_or_compute(
+                    params_key(fleet_params, sel, n_units, int(fleet_redundancy), fleet_rel, int(fleet_draws)),
+                    lambda: fleet.run(fleet_params, [m] * n_units, fleet_rel, redundancy=int(fleet_redundancy),
+                                      n=int(fleet_draws), npv_rate=npv_rate, seed=0)
+                )
+            pcts = fr.percentiles()
+            fm1, fm2 = st.columns(2)
+            fm1.metric("Firm output", f"{fr.target_kw:,.0f} kW")
+            fm2.metric("Mean plant availability", f"{fr.plant_availability:.2%}")
+            st.table(pd.DataFrame({
+                'IRR': [f"{pcts['irr'][p]*100:0.1f}%" for p in (10, 50, 90)],
+                'NPV @10%': [f"${pcts['npv'][p]:,.0f}" for p in (10, 50, 90)],
+            }, index=['P10', 'P50', 'P90']))
+            st.line_chart(pd.DataFrame({f"P{p}": v * 100 for p, v in fr.yearly().items()},
+                                       index=pd.RangeIndex(1, len(fr.delivered[0]) + 1, name="year")))
+            st.caption("Delivered share of firm output (%) by operating year.")
+
+    # Sensitivity
+    with st.expander("Sensitivity (tornado)", expanded=False):
+        sa1, sa2 = st.columns(2)
+        sa_pct = sa1.slider("Perturbation ± (%)", 1, 50, 10, help="Each input moved up and down by this share of its value.")
+        sa_metric = sa2.radio("Metric", ["NPV", "IRR"], horizontal=True)
+        if st.button("Run sensitivity"):
+            with instrument.stage('app.sensitivity'):
+                sa_base, sa_rows = caches['scenario'].get_or_compute(
+                    params_key(params, 'tornado', sa_pct, npv_rate),
+                    lambda: sensitivity.tornado(params, pct=sa_pct / 100, npv_rate=npv_rate)
+                )
+            st.image(sensitivity.render_tornado(sa_base, sa_rows, metric=sa_metric.lower()))
+
+    # Goal seek
+    with st.expander("Goal seek (breakeven)", expanded=False):
+        gs_labels = {
+            'gas_price_per_mmbtu': "Gas price ($/MMBtu)", 'tariff_elec': "Electric tariff ($/kWh)",
+            'tariff_therm': "Thermal value ($/MMBtu)", 'capex': "CapEx ($)", 'cap_factor': "Capacity factor",
+            'om_fixed': "Fixed O&M ($/yr)",
+        }
+        gs_metrics = {"IRR (%)": 'irr', "NPV @10% ($)": 'npv', "Payback (yrs)": 'payback',
+                      "Discounted payback (yrs)": 'disc_payback'}
+        g1, g2, g3 = st.columns(3)
+        gs_key = g1.selectbox("Solve for", list(gs_labels), format_func=gs_labels.get)
+        gs_metric = g2.selectbox("Target", list(gs_metrics))
+        gs_target = g3.number_input("Target value", value=12.0 if gs_metric.startswith("IRR") else 5.0)
+        if st.button("Solve"):
+            metric = gs_metrics[gs_metric]
+            target = gs_target / 100 if metric == 'irr' else gs_target
+            with instrument.stage('app.goalseek'):
+                value = caches['scenario'].get_or_compute(
+                    params_key(params, 'goalseek', gs_key, metric, target, npv_rate),
+                    lambda: goalseek.breakeven(params, gs_key, target, metric, npv_rate=npv_rate)
+                )
+            if value != value:
+                st.warning("Target is not reachable within the search range for this input.")
+            else:
+                st.metric(f"Breakeven {gs_labels[gs_key]}", f"{value:,.4g}")
+
+    # Engine selection & sizing
+    with st.expander("Optimize engine selection", expanded=False):
+        o1, o2, o3, o4 = st.columns(4)
+        opt_objective = o1.radio("Objective", ["NPV", "IRR"], horizontal=True)
+        opt_max_kw = o2.number_input("Max plant kW", min_value=0.0, value=5000.0, step=100.0,
+                                     help="Upper limit on installed output (units × derated kW).")
+        opt_min_eff = o3.slider("Min total efficiency (%)", 0, 90, 60)
+        opt_freq = o4.selectbox("Frequency", ["Any", 60, 50])
+        o5, o6 = st.columns(2)
+        opt_units = o5.slider("Max units", 1, 8, 4)
+        opt_capex_kw = o6.number_input("CapEx ($/kW installed)", min_value=0.0, value=float(capex / power_kw), step=50.0)
+        if st.button("Optimize"):
+            opt_params = dict(params, min_load_frac=min_load_frac)
+            with instrument.stage('app.optimize'):
+                front = caches['scenario'].get_or_compute(
+                    params_key(opt_params, 'optimize', opt_objective, opt_max_kw, opt_min_eff, str(opt_freq), opt_units,
+                               opt_capex_kw, npv_rate, profile_hash),
+                    lambda: optimize.optimize(
+                        opt_params, profile=profile, objective=opt_objective.lower(), max_kw=opt_max_kw or None,
+                        min_total_eff=opt_min_eff / 100, frequency_hz=None if opt_freq == "Any" else opt_freq,
+                        max_units=opt_units, capex_per_kw=opt_capex_kw, npv_rate=npv_rate)
+                )
+            if front.empty:
+                st.warning("No catalog engine meets the constraints.")
+            else:
+                st.caption("Pareto set: no other candidate has both a higher objective and a higher total efficiency.")
+                st.dataframe(front)
+
+    # Saved scenarios
+    with st.expander("Saved scenarios", expanded=False):
+        db = scenario_store()
+        s1, s2 = st.columns([3, 1])
+        scenario_name = s1.text_input("Name this scenario", placeholder="e.g. Plant A, 2 x J620 base case")
+        if s2.button("Save scenario", disabled=not scenario_name):
+            db.save(exact_result()['key'], scenario_name)
+            st.success(f"Saved '{scenario_name}'.")
+        f1, f2, f3 = st.columns(3)
+        this_engine = f1.checkbox("Selected engine only")
+        min_irr_pct = f2.number_input("Min IRR (%)", value=0.0, step=1.0)
+        order_by = f3.selectbox("Sort by", ["npv", "irr", "payback", "created"])
+        saved = db.query(engine=sel if this_engine else None, saved_only=True, min_irr=min_irr_pct / 100,
+                         order_by=order_by, descending=order_by != "payback", limit=1000)
+        if len(saved['key']):
+            st.dataframe(pd.DataFrame(saved).drop(columns=['key', 'created']), hide_index=True)
+            picked = st.multiselect("Compare cash flows", list(saved['key']),
+                                    format_func=lambda k: saved['name'][list(saved['key']).index(k)])
+            if picked:
+                cmp = db.compare(picked)
+                st.line_chart(pd.DataFrame(cmp['cashflows'].T, columns=cmp['name']))
+                with st.popover("Inputs"):
+                    st.json({name: db.params(k) for k, name in zip(cmp['key'], cmp['name'])})
+        else:
+            st.caption("No saved scenarios match.")
+
+    # Export report
+    if st.button("Export Word report"):
+        # Reports always use the exact model, also in surrogate mode
+        result = exact_result()
+        schedule, total_eff = result['schedule'], result['total_eff']
+        irr_val, npv_val, pb, dpb = result['irr'], result['npv'], result['payback'], result['disc_payback']
+        chart_png = charts.cashflow_png(schedule['year'], schedule['net_cf'], cache=caches['chart'])
+        kpis = {
+            'engine_display': sel,
+            'rated_power_kw': power_kw,
+            'elec_eff_pct': round(elec_eff_pct * hhv_scale(eff_basis), 1),
+            'total_eff_pct': total_eff*100,
+            'itc_pct': itc_pct,
+            'depreciation_display': (f"{macrs_class}-year MACRS" + (f", {bonus_pct:.0f}% bonus" if bonus_pct else "")
+                                     if macrs_class else "none"),
+            'irr': irr_val,
+            'npv_rate': npv_rate,
+            'npv': npv_val,
+            'payback': pb if pb is not None else -1,
+            'disc_payback': dpb if dpb is not None else -1,
+        }
+        st.session_state['report_job'] = report_jobs().submit(kpis, schedule, chart_png)
+
+    # Report generation runs in the background; poll it on reruns
+    if 'report_job' in st.session_state:
+        job = report_jobs().status(st.session_state['report_job'])
+        if job['state'] == 'done':
+            try:
+                data = report_jobs().result(st.session_state['report_job'])
+            except RuntimeError:   # expired since the status check
+                job = {'state': 'expired'}
+        if job['state'] == 'done':
+            st.success("Report ready.")
+            st.download_button("Download CHP_Report.docx", data, file_name="CHP_Report.docx")
+        elif job['state'] == 'expired':
+            # The shared job list only keeps the newest finished reports; export again to regenerate
+            del st.session_state['report_job']
+        elif job['state'] == 'failed':
+            st.error(f"Report failed: {job['error']}")
+        else:
+            st.progress(job['progress'], text="Generating report…")
+
+    with st.sidebar.expander("Cache stats", expanded=False):
+        for name, c in caches.items():
+            stats = c.stats()
+            st.caption(f"{name}: {stats['hits']} hits / {stats['misses']} misses, "
+                       f"{stats['size']}/{stats['maxsize']} entries, {stats['evictions']} evicted")
+        stats = scenario_store().stats()
+        st.caption(f"store: {stats['hits']} hits / {stats['misses']} misses, {stats['scenarios']} scenarios "
+                   f"({stats['path']})")
+finally:
+    rerun_scope.close()
+    if rerun_profile_out is not None:
+        st.session_state['debug_profile_text'] = rerun_profile_out['text']
+
+with st.sidebar.expander("Debug / instrumentation", expanded=False):
+    instr_on = st.checkbox("Record stage timings", value=instrument.enabled,
+                           help="Per-stage timers and call/IRR-iteration counters (process-wide; near-zero cost when off).")
+    if instr_on != instrument.enabled:
+        instrument.enable(instr_on)
+    st.checkbox("Profile each rerun (cProfile)", key='debug_profile')
+    snap = instrument.snapshot()
+    if snap['stages']:
+        st.dataframe(pd.DataFrame(snap['stages']).T.round(3))
+    if snap['counters']:
+        st.json(snap['counters'])
+    d1, d2 = st.columns(2)
+    d1.download_button("JSON trace", instrument.trace_json(), file_name="chp_trace.json", mime="application/json")
+    if d2.button("Reset"):
+        instrument.reset()
+    if st.session_state.get('debug_profile_text'):
+        st.code(st.session_state['debug_profile_text'], language=None)
 
-# Policy
-with st.sidebar.expander("Policy", expanded=True):
-    itc_pct = st.slider(
-        "IRA §48 ITC (%)",
-        min_value=0.0, max_value=40.0, value=30.0, step=1.0,
-        help=("Investment Tax Credit for CHP per IRA §48. Base        help=("Investment Tax Credit for CHP per IRA §48. Base 6%; up to 30% with prevailing wage "
-              "and apprenticeship requirements. Additional bonuses may apply (domestic content, energy community).")
-
-
-
-params = dict(
-    power_kw=power_kw,
-    cap_factor=cap_factor,
-    elec_eff_pct=elec_eff_pct,
-    therm_output_btu_per_hr=therm_output_btu_per_hr,  # NEW
-    therm_output_kw=therm_output_kw,                  # legacy (unused if BTU/hr mode)
-    therm_eff_pct=therm_eff_pct,
-    hh_basis=eff_basis,
-    tariff_elec=tariff_elec,
-    tariff_therm=tariff_therm,
-    gas_price_per_mmbtu=gas_price,
-    capex=capex,
-    itc_pct=itc_pct,
-    om_fixed=    om_fixed=om_fixed,
-    om_var_per_kwh=om_var,
-    years=years,
-    debt=debt,
-    interest=interest,
-    term=term,
-    tax_rate=tax_rate
-
-)
-
-schedule, cf, total_eff = annual_schedule(params)
-
-irr_val = irr(cf)
-npv_rate = 0.10
-npv_val = npv(npv_rate, cf)
-pb = simple_payback(cf)
-dpb = discounted_payback(npv_rate, cf)
-
-col1, col2, col3, col4, col5 = st.columns(5)
-col1.metric("IRR", f"{irr_val*100:0.1f}%")
-col2.metric("NPV @10%", f"${npv_val:,.0f}")
-col3.metric("Payback (yrs)", pb if pb is not None else ">life")
-col4.metric("Disc. Payback (yrs)", dpb if dpb is not None else ">life")
-col5.metric("Total Efficiency", f"{total_eff*100:0.1f}%")
-
-# Table
-df = pd.DataFrame(schedule)
-
-# Chart
-fig, ax = plt.subplots(figsize=(8,4))
-ax.bar(df['year'], df['net_cf'], color="#2E86C1")
-ax.set_title("Annual Cash Flow")
-ax.set_xlabel("Year"); ax.set_ylabel("Net cash flow ($)")
-st.pyplot(fig)
-chart_path = "cashflow.png"
-fig.savefig(chart_path, dpi=160, bbox_inches="tight")
-
-st.subheader("Annual schedule")
-st.dataframe(df[['year','rev_elec','rev_therm','fuel_cost','om_cost','debt_service','tax','net_cf']])
-
-# Export report
-if st.button("Export Word report"):
-    kpis = {
-        'engine_display': sel,
-        'rated_power_kw': power_kw,
-        'elec_eff_pct': elec_eff_pct,
-        'total_eff_pct': total_eff*100,
-        'itc_pct': itc_pct*100,
-        'irr': irr_val,
-        'npv_rate': npv_rate,
-        'npv': npv_val,
-        'payback': pb if pb is not None else -1,
-        'disc_payback': dpb if dpb is not None else -1,
-    }
-    outfile = export_word(kpis, schedule, chart_path, outfile="CHP_Report.docx")
-    st.success(f"Report saved: {outfile}")
-    with open(outfile, "rb") as f:
-        st.download_button("Download CHP_Report.docx", f, file_name="CHP_Report.docx")
+# Surrogate mode: with the inputs unchanged for SETTLE_SECONDS, rerun once with the exact model
+# (a slider change in the meantime starts a new provisional rerun instead)
+if provisional:
+    st.session_state['settled_inputs'] = input_key
+    time.sleep(SETTLE_SECONDS)
+    st.rerun()
 
+# Poll a running report job once everything else has rendered
+if 'report_job' in st.session_state and report_jobs().status(st.session_state['report_job'])['state'] in ('queued', 'running'):
+    time.sleep(0.3)
+    st.rerun()
@@ -0,0 +1,423 @@
+"""
+Vectorized (columnar) evaluation of the annual CHP model.
+
+`annual_schedule_batch` takes a table of scenarios -- a dict of NumPy arrays /
+scalars or a pandas DataFrame whose columns use the same keys as the
+`finance.annual_schedule` params dict -- and evaluates every scenario in one
+NumPy pass instead of building per-year dicts in Python.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+import finance
+import instrument
+import tax
+from catalog import engine_params
+
+# kWh → MMBtu (HHV), same constant as finance.annual_schedule
+KWH_TO_MMBTU = 0.003412
+
+# Optional keys and the value used when a table omits them
+OPTIONAL_DEFAULTS = {
+    'therm_output_btu_per_hr': 0.0,
+    'therm_output_kw': 0.0,
+    'therm_eff_pct': 0.0,
+    'ambient_derate': 1.0,
+    **finance.YEAR_PROFILE_DEFAULTS,
+    **tax.TAX_DEFAULTS,
+}
+
+REQUIRED_KEYS = (
+    'power_kw', 'cap_factor', 'elec_eff_pct', 'tariff_elec', 'tariff_therm',
+    'gas_price_per_mmbtu', 'capex', 'itc_pct', 'om_fixed', 'om_var_per_kwh',
+    'years', 'debt', 'interest', 'term', 'tax_rate',
+)
+
+
+def columns(table):
+    """
+    Normalize a scenario table into a dict of equal-length float arrays.
+    Scalars broadcast against the longest column; missing optional keys take
+    their defaults. An optional `hh_basis` column ('HHV'/'LHV', scalar or per
+    row) converts LHV efficiencies to HHV. Returns (cols, n_scenarios).
+    """
+    missing = [k for k in REQUIRED_KEYS if k not in table]
+    if missing:
+        raise KeyError(f"scenario table is missing columns: {', '.join(missing)}")
+
+    raw = {k: np.asarray(table[k], dtype=float) for k in REQUIRED_KEYS}
+    for k, default in OPTIONAL_DEFAULTS.items():
+        raw[k] = np.asarray(table[k], dtype=float) if k in table else np.asarray(default)
+    if 'hh_basis' in table:
+        lhv = np.char.upper(np.asarray(table['hh_basis'], dtype=str)) == 'LHV'
+        if lhv.any():
+            scale = np.where(lhv, 1.0 / finance.HHV_PER_LHV, 1.0)
+            raw['elec_eff_pct'] = raw['elec_eff_pct'] * scale
+            raw['therm_eff_pct'] = raw['therm_eff_pct'] * scale
+
+    n = max((v.shape[0] for v in raw.values() if v.ndim), default=1)
+    cols = {k: np.broadcast_to(v, (n,)) for k, v in raw.items()}
+    return cols, n
+
+
+def engine_table(params, engines):
+    """Scenario table with one row per catalog engine, other inputs taken from params."""
+    eng = [engine_params(m) for m in engines]
+    table = {k: v for k, v in finance.hhv_params(params).items() if not isinstance(v, str)}
+    table.update({k: np.array([e[k] for e in eng], dtype=float) for k in eng[0]})
+    return table
+
+
+def energy_batch(cols):
+    """
+    Annual energy balance and value streams per scenario -- the columnar
+    counterpart of finance.annual_energy.
+    """
+    return value_streams_batch(cols, physical_energy_batch(cols))
+
+
+def physical_energy_batch(cols):
+    """Energy balance only (elec kWh, thermal/fuel MMBtu, total efficiency); no prices."""
+    hrs = 8760 * cols['cap_factor']
+    # Site-rated hours: thermal outputs given in BTU/hr or kW scale with the ambient derate too
+    site_hrs = hrs * cols['ambient_derate']
+    elec_kwh = cols['power_kw'] * site_hrs
+    elec_eff_frac = cols['elec_eff_pct'] / 100.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fuel_mmbtu = elec_kwh * (KWH_TO_MMBTU / elec_eff_frac)
+
+    # Same precedence as the scalar model: BTU/hr, then legacy kW, then efficiency
+    btu = cols['therm_output_btu_per_hr']
+    kw = cols['therm_output_kw']
+    therm_mmbtu = np.where(
+        btu > 0.0, btu * site_hrs / 1_000_000.0,
+        np.where(kw > 0.0, kw * site_hrs * KWH_TO_MMBTU, fuel_mmbtu * cols['therm_eff_pct'] / 100.0),
+    )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total_eff = np.where(
+            fuel_mmbtu > 0, (elec_kwh * KWH_TO_MMBTU + therm_mmbtu) / fuel_mmbtu, 0.0
+        )
+    return {'elec_kwh': elec_kwh, 'therm_mmbtu': therm_mmbtu,
+            'fuel_mmbtu': fuel_mmbtu, 'total_eff': total_eff}
+
+
+def value_streams_batch(cols, phys):
+    """Add electric/thermal revenue and fuel cost to a physical energy dict."""
+    return dict(phys,
+                rev_elec=phys['elec_kwh'] * cols['tariff_elec'],
+                rev_therm=phys['therm_mmbtu'] * cols['tariff_therm'],
+                fuel_cost=phys['fuel_mmbtu'] * cols['gas_price_per_mmbtu'])
+
+
+def debt_service_batch(cols):
+    """Net CapEx after ITC and the level annual debt payment per scenario."""
+    capex_net = cols['capex'] * (1 - cols['itc_pct'])
+    debt_amt = cols['debt'] * capex_net
+    i = cols['interest']
+    n = cols['term']
+    has_debt = (debt_amt > 0) & (n > 0) & (i > 0)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        growth = (1 + i) ** n
+        ann = np.where(has_debt, debt_amt * (i * growth) / (growth - 1), 0.0)
+    return capex_net, ann
+
+
+@instrument.timed('batch.annual_schedule')
+def annual_schedule_batch(table):
+    """
+    Evaluate many scenarios at once.
+
+    Returns (cashflows, total_eff) where `cashflows` is a (scenarios × years+1)
+    matrix matching the `cashflows` list of `finance.annual_schedule` row by
+    row. Scenarios with a shorter `years` than the widest one are padded with
+    zero cash flows, which leaves NPV, IRR and payback unchanged.
+    """
+    cols, _ = columns(table)
+    energy = energy_batch(cols)
+    return cashflows_from_energy(cols, energy), energy['total_eff']
+
+
+def _growth(rate, elapsed):
+    """(1 + rate) ** elapsed per scenario × year, or the scalar 1.0 when no scenario escalates."""
+    return (1.0 + rate[:, None]) ** elapsed if np.any(rate) else 1.0
+
+
+def year_profile_batch(cols, horizon):
+    """
+    Columnar counterpart of finance.year_profile: (scenarios × horizon)
+    multipliers for operating years 1..horizon. Factors that are neutral for
+    every scenario come back as the scalar 1.0 so they cost nothing downstream.
+    """
+    y = np.arange(1, horizon + 1)
+    interval = cols['overhaul_interval'].astype(int)[:, None]
+    has_overhaul = interval > 0
+    degrades = np.any(cols['degradation']) or np.any(cols['eff_degradation'])
+    age = np.where(has_overhaul, (y - 1) % np.maximum(interval, 1), y - 1) if degrades else y - 1
+    return {
+        'elec': _growth(cols['esc_elec'], y - 1),
+        'therm': _growth(cols['esc_therm'], y - 1),
+        'gas': _growth(cols['esc_gas'], y - 1),
+        'om': _growth(cols['esc_om'], y - 1),
+        'output': _growth(-cols['degradation'], age),
+        'eff': _growth(-cols['eff_degradation'], age),
+        'overhaul': (has_overhaul & (y % np.maximum(interval, 1) == 0) & (y < cols['years'][:, None])
+                     if has_overhaul.any() else False),
+        'debt': y <= cols['term'][:, None],
+    }
+
+
+def _distinct(*keys):
+    """Distinct combinations of the key columns: ([key tuple, ...], index of each scenario's combination)."""
+    n = keys[0].shape[0]
+    if n and all(k.min() == k.max() for k in keys):
+        return [tuple(float(k[0]) for k in keys)], np.zeros(n, dtype=np.intp)
+    code = np.zeros(n, dtype=np.int64)
+    for k in keys:
+        levels, inv = np.unique(k, return_inverse=True)
+        code = code * len(levels) + inv
+    _, first, inv = np.unique(code, return_index=True, return_inverse=True)
+    return [tuple(float(k[i]) for k in keys) for i in first], inv
+
+
+def depreciation_batch(cols, horizon):
+    """
+    (scenarios × horizon) MACRS depreciation deductions. The cached
+    tax.macrs_fractions table is looked up once per distinct (class, life)
+    and expanded to every scenario sharing it; bonus is applied per row.
+    """
+    combos, inv = _distinct(cols['macrs_class'], cols['years'])
+    tables = np.zeros((len(combos), horizon))
+    for j, (macrs_class, years) in enumerate(combos):
+        tables[j, :int(years)] = tax.macrs_fractions(int(macrs_class), int(years))
+    frac = tables[inv] if len(combos) > 1 else tables[0]
+    bonus = np.where(cols['macrs_class'] > 0, cols['bonus_pct'], 0.0)
+    if np.any(bonus):
+        frac = (1.0 - bonus[:, None]) * frac
+        frac[:, 0] += bonus
+    return tax.depreciable_basis(cols['capex'], cols['itc_pct'])[:, None] * frac
+
+
+def interest_batch(cols, horizon, principal):
+    """
+    (scenarios × horizon) interest share of the debt payments, from one
+    cached tax.interest_fractions schedule per distinct (rate, term).
+    """
+    combos, inv = _distinct(cols['interest'], cols['term'])
+    tables = np.zeros((len(combos), horizon))
+    for j, (rate, term) in enumerate(combos):
+        fractions = tax.interest_fractions(rate, int(term))[:horizon]
+        tables[j, :len(fractions)] = fractions
+    return principal[:, None] * (tables[inv] if len(combos) > 1 else tables[0])
+
+
+def tax_batch(taxable, tax_rate):
+    """
+    Columnar tax.taxes. For rows with a loss year, taxed income to date is
+    the running maximum of cumulative income (floored at 0); rows without
+    losses are simply taxed year by year.
+    """
+    base = np.maximum(taxable, 0.0)
+    loss = np.flatnonzero((taxable < 0).any(axis=1))
+    if loss.size:
+        taxed = np.maximum.accumulate(np.maximum(np.cumsum(taxable[loss], axis=1), 0.0), axis=1)
+        base[loss] = np.diff(taxed, axis=1, prepend=0.0)
+    base *= tax_rate[:, None]
+    return base
+
+
+def cashflows_from_energy(cols, energy, financing=None, availability=None, overhauls=None):
+    """
+    (scenarios × years+1) cash-flow matrix from per-scenario first-year energy
+    and value streams (see energy_batch; dispatch supplies the hourly
+    equivalent), with later years following year_profile_batch, debt
+    service stopping after the debt term and tax net of interest and MACRS
+    depreciation with losses carried forward. `financing` may pass a
+    precomputed (capex_net, ann) from debt_service_batch.
+
+    `availability` (scenarios × years, or years) scales each year's output on
+    top of the year profile, and `overhauls` replaces the overhaul-interval
+    flags with the share of `overhaul_cost` incurred each year (fleet.py
+    supplies both for simulated multi-unit plants).
+    """
+    n = cols['years'].shape[0]
+    capex_net, ann = debt_service_batch(cols) if financing is None else financing
+
+    years = cols['years'].astype(int)
+    horizon = int(years.max()) if n else 0
+    f = year_profile_batch(cols, horizon)
+    out = f['output'] if availability is None else f['output'] * availability
+    fuel_out = out / f['eff']
+
+    def col(v):
+        return v[:, None]
+
+    rev = col(energy['rev_elec']) * out * f['elec'] + col(energy['rev_therm']) * out * f['therm']
+    op_costs = (col(energy['fuel_cost']) * fuel_out * f['gas']
+                + (col(cols['om_fixed']) + col(cols['om_var_per_kwh'] * energy['elec_kwh']) * out) * f['om'])
+    ebitda = rev - op_costs
+    if overhauls is not None:
+        ebitda = ebitda - overhauls * col(cols['overhaul_cost']) * f['om']
+    elif np.any(f['overhaul']):
+        ebitda = ebitda - np.where(f['overhaul'], col(cols['overhaul_cost']) * f['om'], 0.0)
+
+    # (scenarios × years) work is done in place: these arrays dominate the cost at 100k scenarios
+    principal = np.where(ann > 0, cols['debt'] * capex_net, 0.0)
+    taxable = depreciation_batch(cols, horizon)
+    taxable += interest_batch(cols, horizon, principal)
+    np.subtract(ebitda, taxable, out=taxable)
+    net = tax_batch(taxable, cols['tax_rate'])
+    np.subtract(ebitda, net, out=net)
+    net -= np.where(f['debt'], col(ann), 0.0)
+
+    cashflows = np.empty((n, horizon + 1))
+    cashflows[:, 0] = -capex_net
+    cashflows[:, 1:] = net
+    if np.any(years < horizon):
+        cashflows[:, 1:][np.arange(1, horizon + 1) > years[:, None]] = 0.0
+    return cashflows
+
+
+# Per-row status codes returned by irr_batch
+IRR_NEWTON = 0      # Newton-Raphson converged
+IRR_BRACKETED = 1   # Newton failed; bisection over IRR_BRACKET converged
+IRR_NO_ROOT = 2     # no sign change over IRR_BRACKET; rate is NaN
+
+IRR_BRACKET = finance.IRR_BRACKET
+
+
+def _npv_rows(cashflows, r, idx):
+    """NPV of each row at its own rate r."""
+    disc = (1.0 / (1.0 + r))[:, None] ** idx
+    return (cashflows * disc).sum(axis=1)
+
+
+@instrument.timed('batch.irr')
+def irr_batch(cashflows, guess=0.1, max_iter=50, tol=1e-8):
+    """
+    IRR of every row of a (scenarios × years+1) cash-flow matrix.
+
+    Runs vectorized Newton-Raphson on all rows, reusing one discount-power
+    matrix per iteration for both NPV and its slope, then falls back to
+    bisection over IRR_BRACKET for rows where Newton diverged or stalled.
+    Returns (rates, status) with status codes IRR_NEWTON / IRR_BRACKETED /
+    IRR_NO_ROOT per row.
+    """
+    cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    n, width = cashflows.shape
+    idx = np.arange(width)
+    rates = np.full(n, np.nan)
+    status = np.full(n, IRR_NO_ROOT, dtype=np.int8)
+
+    active = np.arange(n)
+    r = np.full(n, float(guess))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for _ in range(max_iter):
+            if not active.size:
+                break
+            instrument.count('irr_batch.newton_iters')
+            instrument.count('irr_batch.newton_rows', active.size)
+            cf = cashflows[active]
+            ra = r[active]
+            v = 1.0 / (1.0 + ra)
+            disc = v[:, None] ** idx
+            npv = (cf * disc).sum(axis=1)
+            dnpv = -(cf * disc * idx).sum(axis=1) * v
+            r_new = ra - npv / dnpv
+
+            ok = np.isfinite(r_new) & (r_new > -1) & (np.abs(dnpv) >= 1e-14)
+            done = ok & (np.abs(r_new - ra) < tol)
+            rates[active[done]] = r_new[done]
+            status[active[done]] = IRR_NEWTON
+            r[active] = r_new
+            active = active[ok & ~done]
+
+        # Bracketed fallback for everything Newton did not settle
+        todo = np.flatnonzero(status != IRR_NEWTON)
+        if todo.size:
+            cf = cashflows[todo]
+            lo = np.full(todo.size, IRR_BRACKET[0])
+            hi = np.full(todo.size, IRR_BRACKET[1])
+            f_lo = _npv_rows(cf, lo, idx)
+            f_hi = _npv_rows(cf, hi, idx)
+            bracketed = np.sign(f_lo) != np.sign(f_hi)
+            cf, lo, hi, f_lo = cf[bracketed], lo[bracketed], hi[bracketed], f_lo[bracketed]
+            todo = todo[bracketed]
+            instrument.count('irr_batch.bisect_rows', todo.size)
+            iters = int(np.ceil(np.log2((IRR_BRACKET[1] - IRR_BRACKET[0]) / tol)))
+            for _ in range(iters):
+                mid = 0.5 * (lo + hi)
+                f_mid = _npv_rows(cf, mid, idx)
+                same = np.sign(f_mid) == np.sign(f_lo)
+                lo = np.where(same, mid, lo)
+                f_lo = np.where(same, f_mid, f_lo)
+                hi = np.where(same, hi, mid)
+            rates[todo] = 0.5 * (lo + hi)
+            status[todo] = IRR_BRACKETED
+    return rates, status
+
+
+@lru_cache(maxsize=512)
+def _discount_row(rate, horizon):
+    row = np.array(finance.discount_factors(rate, horizon))
+    row.setflags(write=False)
+    return row
+
+
+def discount_table(rates, horizon):
+    """(rates × horizon+1) discount-factor table built from memoized rows keyed by (rate, horizon)."""
+    return np.stack([_discount_row(float(r), int(horizon)) for r in np.atleast_1d(rates)])
+
+
+def npv_batch(rates, cashflows):
+    """
+    NPV of every cash-flow row at one or many discount rates.
+    Returns shape (scenarios,) for a scalar rate, else (scenarios × rates).
+    """
+    cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    table = discount_table(rates, cashflows.shape[1] - 1)
+    out = cashflows @ table.T
+    return out[:, 0] if np.ndim(rates) == 0 else out
+
+
+def _payback_from_cumulative(cum):
+    """First year cumulative cash flow turns non-negative, linearly interpolated within the year."""
+    reached = cum >= 0
+    hit = reached.any(axis=1)
+    k = reached.argmax(axis=1)
+    rows = np.arange(cum.shape[0])
+    prev = cum[rows, np.maximum(k - 1, 0)]
+    step = cum[rows, k] - prev
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frac = np.where(step > 0, -prev / step, 0.0)
+    years = np.where(k > 0, k - 1 + frac, 0.0)
+    return np.where(hit, years, np.nan)
+
+
+def payback_batch(cashflows, rate=None):
+    """
+    Fractional payback year for every row (NaN if never paid back).
+    With `rate` given, the payback is computed on discounted cash flows.
+    """
+    cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    if rate is not None:
+        cashflows = cashflows * _discount_row(float(rate), cashflows.shape[1] - 1)
+    return _payback_from_cumulative(np.cumsum(cashflows, axis=1))
+
+
+@instrument.timed('batch.kpis')
+def kpis_batch(cashflows, rates=(0.10,), payback_rate=0.10):
+    """
+    NPV at every rate in `rates` plus simple and discounted (fractional)
+    payback from a single pass over the cash-flow matrix.
+    Returns a dict of arrays: npv (scenarios × rates), payback, disc_payback.
+    """
+    cashflows = np.atleast_2d(np.asarray(cashflows, dtype=float))
+    horizon = cashflows.shape[1] - 1
+    discounted = cashflows * _discount_row(float(payback_rate), horizon)
+    return {
+        'npv': cashflows @ discount_table(rates, horizon).T,
+        'payback': _payback_from_cumulative(np.cumsum(cashflows, axis=1)),
+        'disc_payback': _payback_from_cumulative(np.cumsum(discounted, axis=1)),
+    }
@@ -0,0 +1,180 @@
+"""
+Benchmarks for the finance, catalog and reporting hot paths.
+
+    python bench.py                          # run everything, print a table
+    python bench.py --quick -k irr           # skip 100k cases, only names containing 'irr'
+    python bench.py --save bench_baseline.json
+    python bench.py --compare bench_baseline.json --threshold 0.25
+
+Each case is timed best-of-`--repeat` with enough inner calls per repeat to
+run for at least `--min-time` seconds. --compare exits with status 1 when a
+case is slower than the baseline by more than the threshold (relative), so it
+can gate performance changes. Baselines are only comparable on the machine
+that recorded them.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import batch
+import catalog
+import finance
+import report
+
+SIZES = (1, 1_000, 100_000)
+HORIZONS = (20, 30)
+
+
+def scenarios(n, years, seed=0):
+    """n realistic scenarios as a columnar table (catalog-sized engines, varied prices)."""
+    rng = np.random.default_rng(seed)
+    table = {k: np.full(n, v, dtype=float) for k, v in finance.DEFAULT_PARAMS.items() if not isinstance(v, str)}
+    table.update(
+        power_kw=rng.uniform(300, 4500, n),
+        elec_eff_pct=rng.uniform(36, 46, n),
+        tariff_elec=rng.uniform(0.06, 0.20, n),
+        gas_price_per_mmbtu=rng.uniform(2.5, 9.0, n),
+        capex=rng.uniform(1e6, 8e6, n),
+        years=np.full(n, float(years)),
+    )
+    return table
+
+
+def _rows(table):
+    n = len(table['power_kw'])
+    return [dict({k: float(v[i]) for k, v in table.items()}, hh_basis='HHV', years=int(table['years'][i]))
+            for i in range(n)]
+
+
+def cases(sizes=SIZES, horizons=HORIZONS, workdir=None):
+    """
+    {name: (setup, fn)}; setup() builds the inputs untimed, fn(inputs) is
+    timed. The report case writes into `workdir` (None: os.devnull).
+    """
+    out = {}
+    for years in horizons:
+        for n in sizes:
+            tag = f"n={n},y={years}"
+            table = lambda n=n, years=years: scenarios(n, years)
+            rows = lambda n=n, years=years: _rows(scenarios(n, years))
+            cf_rows = lambda n=n, years=years: [finance.annual_schedule(p)[1] for p in _rows(scenarios(n, years))]
+            cf_mat = lambda n=n, years=years: batch.annual_schedule_batch(scenarios(n, years))[0]
+
+            if n <= 1_000:  # scalar paths loop in Python; 100k would take minutes
+                out[f"annual_schedule.scalar[{tag}]"] = (rows, lambda ps: [finance.annual_schedule(p) for p in ps])
+                out[f"irr.scalar[{tag}]"] = (cf_rows, lambda cfs: [finance.irr(cf) for cf in cfs])
+                out[f"npv.scalar[{tag}]"] = (cf_rows, lambda cfs: [finance.npv(0.10, cf) for cf in cfs])
+                out[f"payback.scalar[{tag}]"] = (cf_rows, lambda cfs: [
+                    (finance.simple_payback(cf), finance.discounted_payback(0.10, cf)) for cf in cfs])
+            out[f"annual_schedule.batch[{tag}]"] = (table, batch.annual_schedule_batch)
+            out[f"irr.batch[{tag}]"] = (cf_mat, batch.irr_batch)
+            out[f"npv.batch[{tag}]"] = (cf_mat, lambda cf: batch.npv_batch(0.10, cf))
+            out[f"payback.batch[{tag}]"] = (cf_mat, lambda cf: batch.kpis_batch(cf))
+
+    out["catalog.load_models[uncached]"] = (lambda: None, lambda _: catalog.load_models(use_cache=False))
+    out["catalog.all_models[warm]"] = (lambda: catalog.catalog(), lambda _: catalog.all_models())
+
+    def report_inputs(years=max(horizons)):
+        p = _rows(scenarios(1, years))[0]
+        res = finance.evaluate(p)
+        kpis = {'engine_display': 'bench', 'irr': res['irr'], 'npv_rate': res['npv_rate'], 'npv': res['npv'],
+                'payback': res['payback'], 'disc_payback': res['disc_payback']}
+        path = os.path.join(workdir, 'bench.docx') if workdir else os.devnull
+        return kpis, res['schedule'], path
+
+    out[f"report.export_word[y={max(horizons)}]"] = (
+        report_inputs, lambda inp: report.export_word(inp[0], inp[1], None, outfile=inp[2]))
+    return out
+
+
+def measure(setup, fn, repeat=5, min_time=0.05):
+    """Best seconds per call of fn(setup()) over `repeat` timed runs."""
+    inputs = setup()
+    fn(inputs)  # warm caches and lazy imports
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(inputs)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= max(2, int(min_time / max(elapsed, 1e-9)))
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(inputs)
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _fmt(seconds):
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def compare(results, baseline, threshold):
+    """Rows of (name, base, new, ratio, regressed) for cases present in both."""
+    rows = []
+    for name, new in results.items():
+        base = baseline.get(name)
+        if base:
+            ratio = new / base
+            rows.append((name, base, new, ratio, ratio > 1.0 + threshold))
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the CHP model hot paths.")
+    ap.add_argument('-k', dest='filter', help="only run cases whose name contains this text")
+    ap.add_argument('--quick', action='store_true', help="skip the 100k-scenario cases")
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--min-time', type=float, default=0.05, help="minimum seconds per timed run")
+    ap.add_argument('--save', metavar='PATH', help="write results as a baseline JSON file")
+    ap.add_argument('--compare', metavar='PATH', help="compare against a baseline JSON file")
+    ap.add_argument('--threshold', type=float, default=0.25,
+                    help="relative slowdown that counts as a regression (default 0.25 = 25%%)")
+    args = ap.parse_args(argv)
+
+    sizes = tuple(s for s in SIZES if not (args.quick and s >= 100_000))
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='chp-bench-') as workdir:
+        todo = {k: v for k, v in cases(sizes, workdir=workdir).items() if not args.filter or args.filter in k}
+        for name, (setup, fn) in todo.items():
+            results[name] = measure(setup, fn, args.repeat, args.min_time)
+            print(f"{name:<45} {_fmt(results[name])}", flush=True)
+
+    if args.save:
+        meta = {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+                'processor': platform.processor(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        rows = compare(results, baseline, args.threshold)
+        print(f"\n{'case':<45} {'baseline':>11} {'current':>11}  ratio")
+        for name, base, new, ratio, regressed in rows:
+            flag = '  REGRESSION' if regressed else ''
+            print(f"{name:<45} {_fmt(base)} {_fmt(new)}  {ratio:5.2f}x{flag}")
+        regressions = [r for r in rows if r[4]]
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+            return 1
+        print(f"\nno regressions beyond {args.threshold:.0%} ({len(rows)} cases compared)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Bounded LRU caches keyed on a canonical hash of the params dict.
+
+Streamlit re-executes app.py on every widget interaction; these caches let a
+rerun with financially identical inputs skip the model, chart rendering and
+catalog load. Caches are thread-safe so one instance can be shared across
+sessions.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+
+def _canonical(value):
+    """JSON fallback for NumPy scalars/arrays and other non-JSON values."""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return repr(value)
+
+
+def params_key(params, *extra):
+    """Stable SHA-1 of a params dict (key order independent) plus any extra arguments."""
+    payload = json.dumps([params, extra], sort_keys=True, default=_canonical, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with a size bound and hit/miss/eviction counters."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, calling compute() and storing the result on a miss."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data), 'maxsize': self.maxsize,
+            'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+def memoize(cache, key=params_key):
+    """Decorator caching fn(*args) in `cache` under key(*args)."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args):
+            return cache.get_or_compute(key(*args), lambda: fn(*args))
+        wrapper.cache = cache
+        return wrapper
+    return decorate
@@ -1,258 +1,326 @@
 
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import pickle
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
-from typing import Optional, List
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, List, Tuple, Union
 
-@dataclass
+import instrument
+from finance import hhv_scale
+
+@dataclass(frozen=True, slots=True)
 class EngineModel:
     oem: str
     family: str
     model_name: str
     rated_power_kw: float             # nominal continuous kW at site frequency
-    electrical_efficiency_pct: float  # assumed HHV unless noted (UI toggle available)
+    electrical_efficiency_pct: float  # on efficiency_basis (HHV unless the record says LHV)
     thermal_output_kw: Optional[float]
     frequency_hz: int
-    voltage_options: List[str]
+    voltage_options: Tuple[str, ...]
     fuel_type: str
     reference_url: str
     notes: str
+    efficiency_basis: str = 'HHV'
+    # Performance curves (empty → generic curves in performance.py)
+    part_load_curve: Tuple[Tuple[float, float], ...] = ()      # (load fraction, elec. eff ÷ rated eff)
+    heat_recovery_curve: Tuple[Tuple[float, float], ...] = ()  # (load fraction, thermal eff ÷ rated)
+    ambient_derate: Tuple = ()  # (temps °C, altitudes m, output fraction rows, one per altitude)
+
+    def __post_init__(self):
+        # Records are shared by every caller of catalog(); keep them immutable and hashable
+        object.__setattr__(self, 'voltage_options', tuple(self.voltage_options))
+        for name in ('part_load_curve', 'heat_recovery_curve'):
+            object.__setattr__(self, name, tuple(tuple(p) for p in getattr(self, name)))
+        if self.ambient_derate:
+            temps, alts, rows = self.ambient_derate
+            object.__setattr__(self, 'ambient_derate', (tuple(temps), tuple(alts), tuple(tuple(r) for r in rows)))
+
+    @property
+    def display_name(self) -> str:
+        return f"{self.oem} {self.model_name} ({self.family})"
 
 # ---------------------------
-# Caterpillar
-# Sources:
-# - CAT CHP1500 (G3512H) page: ~1.49 MW, max electrical efficiency ~42.5%  https://www.cat.com/en_GB/products/new/power-systems/electric-power/gas-generator-sets/113841.html
-# - G3520H Scene7 datasheet: configurations, efficiency options  https://s7d2.scene7.com/is/content/Caterpillar/CM20190904-a8775-29c11
+# Catalog file (JSON / CSV / Parquet)
+# Engine ratings live in engines.json next to this module (override with the
+# CHP_CATALOG environment variable). Per-OEM datasheet sources are kept in the
+# file's "_sources" block; keys starting with "_" are comments and ignored.
 # ---------------------------
-def cat_models() -> List[EngineModel]:
-    return [
-        EngineModel(
-            oem="Caterpillar",
-            family="G3512H / CHP1500",
-            model_name="G3512H",
-            rated_power_kw=1490.0,
-            electrical_efficiency_pct=42.5,  # CAT cites max electrical efficiency ~42.5%
-            thermal_output_kw=1490.0 * 0.436,  # illustrative pack thermal eff × power
-            frequency_hz=60,
-            voltage_options=["4.16 kV"],
-            fuel_type="Natural Gas",
-            reference_url="https://www.cat.com/en_GB/products/new/power-systems/electric-power/gas-generator-sets/113841.html",
-            notes="CHP1500 standardized enclosure; combined efficiency cited by Caterpillar."
-        ),
-        EngineModel(
-            oem="Caterpillar",
-            family="G3520H",
-            model_name="G3520H",
-            rated_power_kw=2476.0,  # representative within brochure range
-            electrical_efficiency_pct=43.5,  # representative high-efficiency config; confirm HHV/LHV on site
-            thermal_output_kw=None,
-            frequency_hz=60,
-            voltage_options=["4.16 kV"],
-            fuel_type="Natural Gas",
-            reference_url="https://s7d2.scene7.com/is/content/Caterpillar/CM20190904-a8775-29c11",
-            notes="Multiple configurations (fuel tolerant vs. high efficiency); check emissions and ambient corrections."
-        ),
-    ]
+CATALOG_PATH = os.environ.get('CHP_CATALOG', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'engines.json'))
+
+# Parsed catalogs are pickled here, keyed by the catalog file's SHA-256
+CACHE_DIR = os.environ.get('CHP_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'chp-model'))
+
+# Bump when EngineModel or parsing changes so stale binary caches are ignored
+SCHEMA_VERSION = 2
+
+class Curve(tuple):
+    """Schema kind: ((x, y), ...) breakpoints. JSON [[0.5, 0.9], [1, 1]]; CSV "0.5:0.9; 1:1"."""
+
+class DerateTable(tuple):
+    """
+    Schema kind: ambient derate grid. JSON {"temp_c": [...], "altitude_m": [...],
+    "factor": [[...], ...]} with one factor row per altitude (output ÷ rated);
+    CSV cells hold the same object as JSON text.
+    """
+
+# field → (type, required)
+SCHEMA: Dict[str, Tuple[type, bool]] = {
+    'oem': (str, True),
+    'family': (str, True),
+    'model_name': (str, True),
+    'rated_power_kw': (float, True),
+    'electrical_efficiency_pct': (float, True),
+    'thermal_output_kw': (float, False),
+    'frequency_hz': (int, True),
+    'voltage_options': (tuple, False),
+    'fuel_type': (str, True),
+    'reference_url': (str, False),
+    'notes': (str, False),
+    'efficiency_basis': (str, False),
+    'part_load_curve': (Curve, False),
+    'heat_recovery_curve': (Curve, False),
+    'ambient_derate': (DerateTable, False),
+}
+
+class CatalogError(ValueError):
+    """A catalog file that does not match the EngineModel schema."""
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip()) or (isinstance(value, float) and math.isnan(value))
+
+def _coerce(kind: type, value: Any) -> Any:
+    if kind is str:
+        if not isinstance(value, str):
+            raise TypeError("expected text")
+        return value
+    if kind is tuple:
+        if isinstance(value, str):  # CSV: "480 V; 4.16 kV"
+            return tuple(v.strip() for v in value.split(';') if v.strip())
+        if not all(isinstance(v, str) for v in value):
+            raise TypeError("expected a list of text")
+        return tuple(value)
+    if kind is Curve:
+        if isinstance(value, str):
+            value = [p.split(':') for p in value.split(';') if p.strip()]
+        curve = tuple((float(x), float(y)) for x, y in value)
+        _increasing(x for x, _ in curve)
+        if any(y <= 0 for _, y in curve):
+            raise ValueError("curve values must be positive")
+        return curve
+    if kind is DerateTable:
+        if isinstance(value, str):
+            value = json.loads(value)
+        temps = tuple(float(t) for t in value['temp_c'])
+        alts = tuple(float(a) for a in value['altitude_m'])
+        rows = tuple(tuple(float(f) for f in row) for row in value['factor'])
+        _increasing(temps)
+        _increasing(alts)
+        if len(rows) != len(alts) or any(len(row) != len(temps) for row in rows):
+            raise ValueError("factor must have one row per altitude and one column per temperature")
+        if any(not 0 < f <= 1.5 for row in rows for f in row):
+            raise ValueError("derate factors must be in (0, 1.5]")
+        return (temps, alts, rows)
+    if isinstance(value, bool):
+        raise TypeError("expected a number")
+    number = float(value)
+    if kind is int:
+        if number != int(number):
+            raise TypeError("expected a whole number")
+        return int(number)
+    return number
+
+def _increasing(xs: Iterable[float]) -> None:
+    xs = list(xs)
+    if not xs:
+        raise ValueError("expected at least one breakpoint")
+    if any(b <= a for a, b in zip(xs, xs[1:])):
+        raise ValueError("breakpoints must be strictly increasing")
+
+def parse_record(raw: Dict[str, Any], where: str) -> EngineModel:
+    """Validate one raw catalog row against SCHEMA and build its EngineModel."""
+    unknown = [k for k in raw if k not in SCHEMA and not str(k).startswith('_')]
+    if unknown:
+        raise CatalogError(f"{where}: unknown field(s) {', '.join(map(str, unknown))}")
+    values = {}
+    for field, (kind, required) in SCHEMA.items():
+        value = raw.get(field)
+        if _is_missing(value):
+            if required:
+                raise CatalogError(f"{where}: missing required field '{field}'")
+            values[field] = {str: '', tuple: (), Curve: (), DerateTable: ()}.get(kind)
+            continue
+        try:
+            values[field] = _coerce(kind, value)
+        except (TypeError, ValueError, KeyError) as exc:
+            raise CatalogError(f"{where}: field '{field}' = {value!r}: {exc}") from None
+
+    if values['rated_power_kw'] <= 0:
+        raise CatalogError(f"{where}: rated_power_kw must be positive")
+    if not 0 < values['electrical_efficiency_pct'] <= 100:
+        raise CatalogError(f"{where}: electrical_efficiency_pct must be in (0, 100]")
+    if values['frequency_hz'] not in (50, 60):
+        raise CatalogError(f"{where}: frequency_hz must be 50 or 60")
+    if values['thermal_output_kw'] is not None and values['thermal_output_kw'] < 0:
+        raise CatalogError(f"{where}: thermal_output_kw cannot be negative")
+    values['efficiency_basis'] = values['efficiency_basis'].strip().upper() or 'HHV'
+    if values['efficiency_basis'] not in ('HHV', 'LHV'):
+        raise CatalogError(f"{where}: efficiency_basis must be HHV or LHV")
+    return EngineModel(**values)
+
+def _read_rows(path: str, data: bytes) -> List[Dict[str, Any]]:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.json':
+        doc = json.loads(data.decode('utf-8'))
+        rows = doc.get('engines') if isinstance(doc, dict) else doc
+        if not isinstance(rows, list):
+            raise CatalogError(f"{path}: expected a list of engines or an object with an 'engines' list")
+        return rows
+    if ext == '.csv':
+        return list(csv.DictReader(io.StringIO(data.decode('utf-8-sig'))))
+    if ext in ('.parquet', '.pq'):
+        import pandas as pd
+        return pd.read_parquet(io.BytesIO(data)).to_dict('records')
+    raise CatalogError(f"{path}: unsupported catalog format '{ext}' (use .json, .csv or .parquet)")
+
+@instrument.timed('catalog.load_models')
+def load_models(path: Optional[str] = None, use_cache: bool = True) -> List[EngineModel]:
+    """
+    Parse and validate a catalog file. The parsed records are pickled under
+    CACHE_DIR keyed by the file's content hash, so later startups with an
+    unchanged file skip parsing and validation.
+    """
+    path = path or CATALOG_PATH
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data + f"|v{SCHEMA_VERSION}".encode()).hexdigest()
+    cache_file = os.path.join(CACHE_DIR, f"catalog-{digest}.pkl")
+
+    if use_cache:
+        try:
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass
+
+    rows = _read_rows(path, data)
+    models = [parse_record(row, f"{os.path.basename(path)} engine #{i + 1}") for i, row in enumerate(rows)]
+
+    if use_cache:
+        import tempfile  # only needed when writing a new cache file
+
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=CACHE_DIR)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(models, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_file)
+        except OSError:
+            pass  # read-only home or similar: the cache is only an accelerator
+    return models
 
 # ---------------------------
-# INNIO Jenbacher (Type 6)
-# Source: J620 product page (electrical output up to ~3.36 MW; up to ~45.9% electrical efficiency)  https://www.jenbacher.com/en/gas-engines/type-6/j620/
+# Aggregate helper
 # ---------------------------
+def fuel_tokens(fuel_type: str) -> Tuple[str, ...]:
+    """Normalized fuels in a catalog fuel_type, e.g. 'Natural Gas / Biogas' → ('natural gas', 'biogas')."""
+    return tuple(part.split('(')[0].strip().lower() for part in fuel_type.split('/') if part.strip())
+
+class Catalog:
+    """
+    Immutable engine catalog with indexes by OEM, frequency and fuel plus a
+    sorted rated-power index for range queries. Built once by catalog().
+    """
+    __slots__ = ('models', 'display_names', '_by_name', '_by_oem', '_by_freq', '_by_fuel',
+                 '_power_kw', '_power_pos')
+
+    def __init__(self, models: Iterable[EngineModel]):
+        self.models: Tuple[EngineModel, ...] = tuple(models)
+        self.display_names: Tuple[str, ...] = tuple(m.display_name for m in self.models)
+        self._by_name = {name: m for name, m in zip(self.display_names, self.models)}
+        self._by_oem: Dict[str, frozenset] = {}
+        self._by_freq: Dict[int, frozenset] = {}
+        self._by_fuel: Dict[str, frozenset] = {}
+        groups = ((self._by_oem, lambda m: [m.oem.lower()]),
+                  (self._by_freq, lambda m: [m.frequency_hz]),
+                  (self._by_fuel, lambda m: fuel_tokens(m.fuel_type)))
+        for index, keys in groups:
+            build: Dict = {}
+            for pos, m in enumerate(self.models):
+                for k in keys(m):
+                    build.setdefault(k, set()).add(pos)
+            index.update({k: frozenset(v) for k, v in build.items()})
+        order = sorted(range(len(self.models)), key=lambda p: self.models[p].rated_power_kw)
+        self._power_kw = tuple(self.models[p].rated_power_kw for p in order)
+        self._power_pos = tuple(order)
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def __iter__(self):
+        return iter(self.models)
+
+    def by_display_name(self, name: str) -> EngineModel:
+        return self._by_name[name]
+
+    def oems(self) -> List[str]:
+        return sorted({m.oem for m in self.models})
+
+    def query(self, oem: Union[str, Iterable[str], None] = None, frequency_hz: Optional[int] = None,
+              fuel_type: Optional[str] = None, min_kw: Optional[float] = None,
+              max_kw: Optional[float] = None) -> Tuple[EngineModel, ...]:
+        """
+        Engines matching every given filter, in catalog order. `oem` may be one
+        name or several (case-insensitive); `fuel_type` matches any fuel token
+        (e.g. 'biogas'); the kW bounds are inclusive.
+        """
+        lo = 0 if min_kw is None else bisect_left(self._power_kw, min_kw)
+        hi = len(self._power_kw) if max_kw is None else bisect_right(self._power_kw, max_kw)
+        hits = set(self._power_pos[lo:hi])
+        if oem is not None:
+            names = [oem] if isinstance(oem, str) else list(oem)
+            hits &= frozenset().union(*(self._by_oem.get(o.lower(), frozenset()) for o in names))
+        if frequency_hz is not None:
+            hits &= self._by_freq.get(frequency_hz, frozenset())
+        if fuel_type is not None:
+            hits &= self._by_fuel.get(fuel_type.strip().lower(), frozenset())
+        return tuple(self.models[p] for p in sorted(hits))
+
+@lru_cache(maxsize=None)
+def catalog(path: Optional[str] = None) -> Catalog:
+    """The engine catalog for `path` (default CATALOG_PATH), loaded on first use."""
+    return Catalog(load_models(path))
+
+def all_models() -> List[EngineModel]:
+    """Return all engines across OEMs."""
+    return list(catalog().models)
+
+# Per-OEM views kept for existing callers
+def cat_models() -> List[EngineModel]:
+    return list(catalog().query(oem='Caterpillar'))
+
 def jenbacher_models() -> List[EngineModel]:
-    return [
-        EngineModel(
-            oem="INNIO Jenbacher",
-            family="Type 6",
-            model_name="J620",
-            rated_power_kw=3360.0,            # top-of-range for quick comparisons
-            electrical_efficiency_pct=45.9,   # “up to 45.9%” (50 Hz)
-            thermal_output_kw=None,
-            frequency_hz=50,
-            voltage_options=["6.3 kV","10.5 kV","11 kV","15 kV"],
-            fuel_type="Natural Gas / Biogas",
-            reference_url="https://www.jenbacher.com/en/gas-engines/type-6/j620/",
-            notes="Electrical output up to ~3.36 MW; electrical efficiency up to ~45.9% (50 Hz). Confirm variant and ambient."
-        ),
-        EngineModel(
-            oem="INNIO Jenbacher",
-            family="Type 6",
-            model_name="J620 (60 Hz)",
-            rated_power_kw=3350.0,
-            electrical_efficiency_pct=45.0,   # “up to 45.0%” at 60 Hz variants
-            thermal_output_kw=None,
-            frequency_hz=60,
-            voltage_options=["6.3 kV","10.5 kV","11 kV","15 kV"],
-            fuel_type="Natural Gas / Biogas",
-            reference_url="https://www.jenbacher.com/en/gas-engines/type-6/j620/",
-            notes="60 Hz variant; electrical efficiency up to ~45.0% depending on model."
-        ),
-    ]
+    return list(catalog().query(oem='INNIO Jenbacher'))
 
-# ---------------------------
-# MTU / Rolls-Royce (Series 4000)
-# Sources:
-# - MTU natural gas gensets overview (250–2535 kW, CHP/CHPC)  https://www.mtu-solutions.com/eu/en/applications/power-generation/power-generation-products/gas-generator-sets/natural-gas-generator-sets.html
-# - Distributor datasheets (Curtis Power)  https://www.curtispowersolutions.com/specs-mtu-continuous-gas-gensets
-# ---------------------------
 def mtu_models() -> List[EngineModel]:
-    return [
-        EngineModel(
-            oem="MTU / Rolls-Royce",
-            family="Series 4000",
-            model_name="16V4000 (60 Hz)",
-            rated_power_kw=2514.0,            # upper end of 60 Hz range
-            electrical_efficiency_pct=41.5,   # representative; confirm per latest datasheet
-            thermal_output_kw=None,
-            frequency_hz=60,
-            voltage_options=["480 V","4.16 kV"],
-            fuel_type="Natural Gas",
-            reference_url="https://www.mtu-solutions.com/eu/en/applications/power-generation/power-generation-products/gas-generator-sets/natural-gas-generator-sets.html",
-            notes="CHP/CHPC capable; distributor literature cites overall CHP efficiency up to ~91.9%."
-        ),
-        EngineModel(
-            oem="MTU / Rolls-Royce",
-            family="Series 4000",
-            model_name="12V4000 (60 Hz)",
-            rated_power_kw=2010.0,            # representative mid-range
-            electrical_efficiency_pct=42.0,   # representative; verify for your node
-            thermal_output_kw=None,
-            frequency_hz=60,
-            voltage_options=["480 V","4.16 kV"],
-            fuel_type="Natural Gas",
-            reference_url="https://www.curtispowersolutions.com/specs-mtu-continuous-gas-gensets",
-            notes="Curtis Power specs provide model datasheets; confirm electrical efficiency and heat balances."
-        ),
-    ]
+    return list(catalog().query(oem='MTU / Rolls-Royce'))
 
-# ---------------------------
-# MAN Energy Solutions
-# Sources:
-# - MAN V51/60G brochure (~50% electrical; up to ~95% total efficiency CHP)  https://studylib.net/doc/26051374/man-v51-60g-eng
-# - MAN E3262 overview  https://www.man.eu/engines/en/products/power-generation/gas/man-motor-e3262.html
-# - MAN E3268 datasheet (CHP/COP variants)  https://www.gasengineexchange.com/landing/file/MAN%20E3268%20gas%20engine%20CHP.pdf
-# - MAN portfolio brochure (E0834/E0836/E2676/E3268/E3262)  https://martinenergygroup.com/wp-content/uploads/2019/01/Power_Gas_EN_150927_web-MAN.pdf
-# ---------------------------
 def man_models() -> List[EngineModel]:
-    return [
-        EngineModel(
-            oem="MAN Energy Solutions",
-            family="51/60G",
-            model_name="18V51/60G (2-stage TC)",
-            rated_power_kw=20700.0,           # brochure shows up to ~20,700 kWm; adjust to kWe with alternator efficiency if needed
-            electrical_efficiency_pct=50.0,   # “~50% in single cycle; up to ~95% total in CHP” (representative)
-            thermal_output_kw=None,
-            frequency_hz=50,
-            voltage_options=["Medium voltage (site-specific)"],
-            fuel_type="Natural Gas (H2-blend capable variants)",
-            reference_url="https://studylib.net/doc/26051374/man-v51-60g-eng",
-            notes="High-efficiency large engine; adjust kWe vs. kWm per alternator; confirm local site configuration."
-        ),
-        EngineModel(
-            oem="MAN Engines",
-            family="E3262",
-            model_name="E3262 LE232 (Natural Gas)",
-            rated_power_kw=550.0,             # representative mech output; adjust electrical as needed
-            electrical_efficiency_pct=39.6,   # representative; verify per site datasheet
-            thermal_output_kw=None,
-            frequency_hz=50,
-            voltage_options=["400 V / MV (site-specific)"],
-            fuel_type="Natural Gas",
-            reference_url="https://www.man.eu/engines/en/products/power-generation/gas/man-motor-e3262.html",
-            notes="12‑cyl forced induction variant; CHP total efficiency reported ~93.6% in literature (verify)."
-        ),
-        EngineModel(
-            oem="MAN Engines",
-            family="E3268",
-            model_name="E3268 (8V)",
-            rated_power_kw=390.0,
-            electrical_efficiency_pct=39.0,   # representative; confirm per node
-            thermal_output_kw=None,
-            frequency_hz=60,
-            voltage_options=["480 V / MV (site-specific)"],
-            fuel_type="Natural Gas / Special Gases",
-            reference_url="https://www.gasengineexchange.com/landing/file/MAN%20E3268%20gas%20engine%20CHP.pdf",
-            notes="Datasheet covers COP/CHP variants; verify local fuel HHV/LHV and heat recovery configuration."
-        ),
-        EngineModel(
-            oem="MAN Engines",
-            family="E2676",
-            model_name="E2676 (6L)",
-            rated_power_kw=220.0,
-            electrical_efficiency_pct=38.0,   # representative; confirm per node
-            thermal_output_kw=None,
-            frequency_hz=50,
-            voltage_options=["400 V / MV"],
-            fuel_type="Natural Gas / Biogas",
-            reference_url="https://martinenergygroup.com/wp-content/uploads/2019/01/Power_Gas_EN_150927_web-MAN.pdf",
-            notes="Brochure summarizes CHP suitability and outputs for E‑series engines."
-        ),
-    ]
+    return list(catalog().query(oem=('MAN Energy Solutions', 'MAN Engines')))
 
-# ---------------------------
-# Cummins Gas Gensets
-# Sources:
-# - HSK78G spec sheet (1.6–2.0 MW)  https://www.cummins.com/sites/default/files/2019-08/Spec-Sheet-HSK78G-50Hz_2.pdf
-# - C1000 N6C / QSK60G datasheet  https://www.cummins.com/sites/default/files/2020-02/C1000N6C%20-%20D-6203.pdf
-# - C1400 N6C datasheet  https://www.cumminsperu.pe/uploads/shares/DATA_SHEETS/DATA_SHEET_GAS_NATURAL/C1400N6C.pdf
-# - Portfolio overview  https://www.cummins.com/na/sales-and-service/natural-gas-gensets
-# ---------------------------
 def cummins_models() -> List[EngineModel]:
-    return [
-        EngineModel(
-            oem="Cummins",
-            family="HSK78G",
-            model_name="C1600 N5CD (50 Hz) / C1600 N6CD (60 Hz)",
-            rated_power_kw=1600.0,            # series spans 1600–2000 kW
-            electrical_efficiency_pct=41.0,   # datasheet example shows ~41% electrical efficiency (representative)
-            thermal_output_kw=None,
-            frequency_hz=60,
-            voltage_options=["480 V","4.16 kV","MV (per alternator)"],
-            fuel_type="Natural Gas (lean-burn)",
-            reference_url="https://www.cummins.com/sites/default/files/2019-08/Spec-Sheet-HSK78G-50Hz_2.pdf",
-            notes="Lean‑burn with detailed heat balance and emissions; multiple models 1.6–2.0 MW."
-        ),
-        EngineModel(
-            oem="Cummins",
-            family="QSK60G",
-            model_name="C1000 N6C (60 Hz)",
-            rated_power_kw=1000.0,
-            electrical_efficiency_pct=41.0,   # example table shows ~41% at 100% load (representative)
-            thermal_output_kw=None,
-            frequency_hz=60,
-            voltage_options=["480 V","4.16 kV"],
-            fuel_type="Natural Gas (lean-burn)",
-            reference_url="https://www.cummins.com/sites/default/files/2020-02/C1000N6C%20-%20D-6203.pdf",
-            notes="Data sheet provides fuel consumption, electrical efficiency, and heat balance; NSPS variants exist."
-        ),
-        EngineModel(
-            oem="Cummins",
-            family="QSK60G",
-            model_name="C1400 N6C (60 Hz)",
-            rated_power_kw=1400.0,
-            electrical_efficiency_pct=40.0,   # representative; confirm per alternator & load point
-            thermal_output_kw=None,
-            frequency_hz=60,
-            voltage_options=["480 V","4.16 kV"],
-            fuel_type="Natural Gas (lean-burn)",
-            reference_url="https://www.cumminsperu.pe/uploads/shares/DATA_SHEETS/DATA_SHEET_GAS_NATURAL/C1400N6C.pdf",
-            notes="Spec sheet outlines emissions options (0.7–1.0 g/hp-hr NOx) and CHP applicability."
-        ),
-        EngineModel(
-            oem="Cummins",
-            family="Portfolio Overview",
-            model_name="Natural Gas Gensets (55–2000 kW)",
-            rated_power_kw=1000.0,            # placeholder mid-range for overview entry
-            electrical_efficiency_pct=40.0,   # portfolio overview; use model-specific sheets for exact values
-            thermal_output_kw=None,
-            frequency_hz=60,
-            voltage_options=["480 V","4.16 kV","MV"],
-            fuel_type="Natural Gas / Dual Fuel",
-            reference_url="https://www.cummins.com/na/sales-and-service/natural-gas-gensets",
-            notes="Portfolio page—use specific datasheets for performance; HSK/QSK lines cover 1–2 MW nodes."
-        ),
-    ]
+    return list(catalog().query(oem='Cummins'))
 
-# ---------------------------
-# Aggregate helper
-# ---------------------------
-def all_models() -> List[EngineModel]:
-    """Return all engines across OEMs."""
-    return cat_models() + jenbacher_models() + mtu_models() + man_models() + cummins_models()
+def engine_params(m: EngineModel) -> dict:
+    """Engine-specific entries of the finance params dict for a catalog model (efficiency on HHV)."""
+    return {
+        'power_kw': m.rated_power_kw,
+        'elec_eff_pct': m.electrical_efficiency_pct * hhv_scale(m.efficiency_basis),
+        'therm_output_kw': m.thermal_output_kw or 0.0,
+    }
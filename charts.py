@@ -0,0 +1,56 @@
+"""
+In-memory chart rendering.
+
+Charts are drawn on standalone matplotlib Figure objects (no pyplot state, so
+nothing accumulates in pyplot's global figure registry and concurrent sessions
+never share a figure) and returned as PNG bytes. The bytes go straight to
+st.image and report.render_word; nothing is written to the working directory.
+Rendered cash-flow charts are cached by the cash-flow vector, so reruns with
+unchanged inputs skip matplotlib entirely.
+"""
+import io
+
+import instrument
+from cache import LRUCache, params_key
+
+# Process-wide cache of rendered PNGs, keyed by chart kind and data
+CACHE = LRUCache(maxsize=256)
+
+
+def _png(fig, dpi):
+    buf = io.BytesIO()
+    fig.savefig(buf, dpi=dpi, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def _figure(figsize):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    return fig, fig.subplots()
+
+
+@instrument.timed('charts.cashflow')
+def render_cashflow(years, net_cf):
+    """Annual cash-flow bar chart as PNG bytes (uncached)."""
+    fig, ax = _figure((8, 4))
+    ax.bar(list(years), list(net_cf), color="#2E86C1")
+    ax.set_title("Annual Cash Flow")
+    ax.set_xlabel("Year"); ax.set_ylabel("Net cash flow ($)")
+    return _png(fig, 160)
+
+
+def cashflow_png(years, net_cf, cache=CACHE):
+    """Cash-flow chart PNG, rendered once per distinct (years, cash-flow) vector."""
+    years, net_cf = list(years), list(net_cf)
+    return cache.get_or_compute(params_key('cashflow', years, net_cf),
+                                lambda: render_cashflow(years, net_cf))
+
+
+@instrument.timed('charts.histogram')
+def render_histogram(values, title, xlabel, bins=50):
+    """Histogram of Monte Carlo outcomes as PNG bytes."""
+    fig, ax = _figure((5, 3))
+    ax.hist(values, bins=bins, color="#2E86C1")
+    ax.set_title(title); ax.set_xlabel(xlabel); ax.set_ylabel("Draws")
+    return _png(fig, 120)
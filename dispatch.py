@@ -0,0 +1,183 @@
+"""
+Hourly (8760) dispatch mode.
+
+Dispatches the engine hour by hour against electric/thermal load and price
+arrays, then rolls the year up into the same energy dict the flat
+capacity-factor model produces, so `finance.schedule_from_energy` (one site)
+and `batch.cashflows_from_energy` (many sites) build the usual schedule and
+cash flows from it.
+
+Profiles are dicts of equal-length hourly arrays:
+  elec_load_kw      site electric demand (required for load following)
+  therm_load_mmbtu  useful heat demand per hour (optional; unlimited if absent)
+  price_elec        avoided electricity $/kWh (optional; falls back to tariff_elec)
+  price_therm       thermal value $/MMBtu (optional; falls back to tariff_therm)
+  price_gas         fuel $/MMBtu (optional; falls back to gas_price_per_mmbtu)
+  ambient_temp_c    outdoor temperature °C (optional; hourly ambient derate at
+                    params `altitude_m`, else the flat `ambient_derate`)
+Arrays may be 2-D (sites × hours) to dispatch many sites in one pass.
+
+Part-load efficiency, heat recovery and ambient derate follow the curves of
+params `engine` (an EngineModel or catalog display name, or one per site;
+generic curves when absent) via performance.py.
+"""
+import os
+
+import numpy as np
+
+import batch
+import finance
+import instrument
+import performance
+
+KWH_TO_MMBTU = batch.KWH_TO_MMBTU
+
+PROFILE_COLUMNS = ('elec_load_kw', 'therm_load_mmbtu', 'price_elec', 'price_therm', 'price_gas',
+                   'ambient_temp_c')
+
+HOURS_PER_YEAR = 8760
+
+# Generic part-load curve used for engines without their own
+PART_LOAD_CURVE = performance.GENERIC_PART_LOAD
+
+
+def load_profile(source, fmt=None):
+    """
+    Read an hourly profile from a CSV or Parquet file (path or file-like) into a
+    dict of float arrays keyed by PROFILE_COLUMNS. Unknown columns are ignored;
+    the file must hold exactly one 8760-hour year (meter.year_profile builds
+    one from raw interval data).
+    """
+    import pandas as pd
+
+    if fmt is None:
+        name = source if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '')
+        fmt = 'parquet' if str(name).lower().endswith(('.parquet', '.pq')) else 'csv'
+    df = pd.read_parquet(source) if fmt == 'parquet' else pd.read_csv(source)
+
+    if 'elec_load_kw' not in df.columns:
+        raise ValueError("hourly profile needs an 'elec_load_kw' column")
+    if len(df) != HOURS_PER_YEAR:
+        raise ValueError(f"hourly profile must have {HOURS_PER_YEAR} rows (one year), got {len(df)}")
+    return {c: df[c].to_numpy(dtype=float) for c in PROFILE_COLUMNS if c in df.columns}
+
+
+def _param(params, key, default=None):
+    """Param as an array with a trailing hours axis, so scalars and per-site columns both broadcast."""
+    value = params[key] if default is None else params.get(key, default)
+    return np.asarray(value, dtype=float)[..., None]
+
+
+def dispatch(params, profile):
+    """
+    Hour-by-hour dispatch. Returns hourly arrays: output_kw, fuel_mmbtu and
+    useful therm_mmbtu.
+
+    Load following (default) tracks elec_load_kw up to site-rated power
+    (`power_kw` × ambient derate) and shuts the unit down below
+    `min_load_frac` of it (default 0.5); `dispatch_mode` 'baseload' runs at
+    site-rated output every hour. Electrical and thermal efficiency follow the
+    engine's part-load and heat-recovery curves; LHV efficiencies
+    (`hh_basis`) are converted to HHV.
+
+    With `units` > 1 (default 1) the plant is that many identical units of
+    `power_kw` each: only as many units run as the hour needs, sharing the
+    load equally, and the plant shuts down below one unit's minimum load.
+    """
+    params = finance.hhv_params(params)
+    engine = params.get('engine')
+    if 'ambient_temp_c' in profile:
+        derate = performance.ambient_derate(engine, profile['ambient_temp_c'],
+                                            _param(params, 'altitude_m', performance.ISO_ALTITUDE_M))
+    else:
+        derate = _param(params, 'ambient_derate', 1.0)
+    rated = _param(params, 'power_kw') * derate
+    units = _param(params, 'units', 1)
+    min_load = _param(params, 'min_load_frac', 0.5)
+    load = np.asarray(profile['elec_load_kw'], dtype=float)
+
+    if params.get('dispatch_mode', 'load_following') == 'baseload':
+        output_kw = np.broadcast_to(rated * units, np.broadcast_shapes(rated.shape, load.shape))
+    else:
+        output_kw = np.minimum(load, rated * units)
+        output_kw = np.where(output_kw >= min_load * rated, output_kw, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Output in multiples of one unit's rating, and per-running-unit load fraction
+        unit_frac = np.where(rated > 0, output_kw / rated, 0.0)
+        load_frac = np.where(unit_frac > 0, unit_frac / np.maximum(np.ceil(unit_frac - 1e-9), 1.0), 0.0)
+    elec_rel = performance.part_load(engine, load_frac)
+    therm_rel = performance.heat_recovery(engine, load_frac)
+    eff = _param(params, 'elec_eff_pct') / 100.0 * elec_rel
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fuel_mmbtu = np.where(output_kw > 0, output_kw * KWH_TO_MMBTU / eff, 0.0)
+
+    # Recoverable heat, same precedence as the annual model. Rated BTU/hr or kW
+    # outputs scale with fuel burned (÷ relative electrical efficiency) and the
+    # heat-recovery curve, i.e. thermal = fuel × rated thermal eff × therm_rel.
+    btu = _param(params, 'therm_output_btu_per_hr', 0.0) * derate
+    kw = _param(params, 'therm_output_kw', 0.0) * derate
+    rated_therm = np.where(btu > 0.0, btu / 1_000_000.0, kw * KWH_TO_MMBTU)
+    therm_avail = np.where(
+        (btu > 0.0) | (kw > 0.0), rated_therm * unit_frac * (therm_rel / elec_rel),
+        fuel_mmbtu * _param(params, 'therm_eff_pct', 0.0) / 100.0 * therm_rel,
+    )
+    if 'therm_load_mmbtu' in profile:
+        therm_avail = np.minimum(therm_avail, np.asarray(profile['therm_load_mmbtu'], dtype=float))
+
+    return {'output_kw': output_kw, 'fuel_mmbtu': fuel_mmbtu, 'therm_mmbtu': therm_avail}
+
+
+@instrument.timed('dispatch.annual_energy')
+def annual_energy(params, profile):
+    """
+    Roll hourly dispatch up to the annual energy dict used by
+    finance.schedule_from_energy. `cap_factor` is applied as an availability
+    derate on the dispatched year. Values are floats for a single site, or
+    arrays with one entry per site for 2-D profiles.
+    """
+    hourly = dispatch(params, profile)
+    avail = _param(params, 'cap_factor')[..., 0]
+
+    def price(col, key):
+        return np.asarray(profile[col], dtype=float) if col in profile else _param(params, key)
+
+    elec_kwh = hourly['output_kw'].sum(axis=-1) * avail
+    therm_mmbtu = hourly['therm_mmbtu'].sum(axis=-1) * avail
+    fuel_mmbtu = hourly['fuel_mmbtu'].sum(axis=-1) * avail
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total_eff = np.where(fuel_mmbtu > 0, (elec_kwh * KWH_TO_MMBTU + therm_mmbtu) / fuel_mmbtu, 0.0)
+
+    energy = {
+        'elec_kwh': elec_kwh, 'therm_mmbtu': therm_mmbtu, 'fuel_mmbtu': fuel_mmbtu,
+        'total_eff': total_eff,
+        'rev_elec': (hourly['output_kw'] * price('price_elec', 'tariff_elec')).sum(axis=-1) * avail,
+        'rev_therm': (hourly['therm_mmbtu'] * price('price_therm', 'tariff_therm')).sum(axis=-1) * avail,
+        'fuel_cost': (hourly['fuel_mmbtu'] * price('price_gas', 'gas_price_per_mmbtu')).sum(axis=-1) * avail,
+    }
+    if np.ndim(elec_kwh) == 0:
+        energy = {k: float(v) for k, v in energy.items()}
+    return energy
+
+
+def hourly_schedule(params, profile):
+    """Hourly-mode counterpart of finance.annual_schedule: returns (Schedule, cashflows, total_eff)."""
+    return finance.schedule_from_energy(params, annual_energy(params, profile))
+
+
+def hourly_schedule_batch(table, profile):
+    """
+    Dispatch many sites at once: `table` is a scenario table (see
+    batch.columns) with one row per site and `profile` holds (sites × hours)
+    arrays (or 1-D arrays shared by every row). `dispatch_mode` and
+    `min_load_frac` are taken as scalars; `units`, `engine` and `altitude_m`
+    may be scalar or per row.
+    Returns (cashflows, total_eff) like batch.annual_schedule_batch.
+    """
+    cols, _ = batch.columns(table)
+    params = dict(cols)
+    for key in ('dispatch_mode', 'min_load_frac', 'units', 'engine', 'altitude_m'):
+        if key in table:
+            params[key] = table[key]
+    energy = annual_energy(params, profile)
+    return batch.cashflows_from_energy(cols, energy), energy['total_eff']
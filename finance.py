@@ -1,22 +1,102 @@
 
 import math
+from array import array
+from functools import lru_cache
 
-def irr(cashflows, guess=0.1, max_iter=100, tol=1e-6):
-    """Compute IRR via Newton-Raphson."""
+import instrument
+import tax
+
+# Default inputs (match the app sidebar) for callers that only supply some keys
+DEFAULT_PARAMS = {
+    'cap_factor': 0.90, 'therm_output_btu_per_hr': 0.0, 'therm_output_kw': 0.0,
+    'therm_eff_pct': 43.6, 'hh_basis': 'HHV', 'tariff_elec': 0.10, 'tariff_therm': 8.00,
+    'gas_price_per_mmbtu': 5.00, 'capex': 3_000_000.0, 'itc_pct': 0.30, 'om_fixed': 50_000.0,
+    'om_var_per_kwh': 0.003, 'years': 20, 'debt': 0.60, 'interest': 0.07, 'term': 10,
+    'tax_rate': 0.25, 'macrs_class': 5, 'bonus_pct': 0.0,
+    # Site output as a fraction of rated (ambient temperature / altitude derate, see performance.py)
+    'ambient_derate': 1.0,
+    # Multi-year profile (all off by default: every operating year identical)
+    'esc_elec': 0.0, 'esc_therm': 0.0, 'esc_gas': 0.0, 'esc_om': 0.0,
+    'degradation': 0.0, 'eff_degradation': 0.0, 'overhaul_interval': 0, 'overhaul_cost': 0.0,
+}
+
+# Optional multi-year keys and their neutral values, for callers that omit them
+YEAR_PROFILE_DEFAULTS = {
+    'esc_elec': 0.0, 'esc_therm': 0.0, 'esc_gas': 0.0, 'esc_om': 0.0,
+    'degradation': 0.0, 'eff_degradation': 0.0, 'overhaul_interval': 0, 'overhaul_cost': 0.0,
+}
+
+# Pipeline natural gas HHV ÷ LHV: an LHV efficiency divided by this is the HHV efficiency
+HHV_PER_LHV = 1.108
+
+# Search interval for the bracketed IRR fallback
+IRR_BRACKET = (-0.99, 10.0)
+
+def _npv_and_slope(r, cashflows):
+    """NPV and dNPV/dr at rate r, building the discount powers incrementally."""
+    v = 1.0 / (1 + r)
+    d = 1.0
+    npv = dnpv = 0.0
+    for i, cf in enumerate(cashflows):
+        npv += cf * d
+        dnpv -= i * cf * d * v
+        d *= v
+    return npv, dnpv
+
+@instrument.timed('finance.irr')
+def irr_solve(cashflows, guess=0.1, max_iter=100, tol=1e-6):
+    """
+    Compute IRR via Newton-Raphson, falling back to bisection over IRR_BRACKET
+    when Newton diverges or stalls. Returns (rate, converged); rate is NaN when
+    no root was found.
+    """
     r = guess
+    iters = 0
     for _ in range(max_iter):
-        npv = sum(cf / ((1 + r) ** i) for i, cf in enumerate(cashflows))
-        dnpv = sum(-i * cf / ((1 + r) ** (i + 1)) for i, cf in enumerate(cashflows))
+        iters += 1
+        npv, dnpv = _npv_and_slope(r, cashflows)
         if abs(dnpv) < 1e-14:
             break
         r_new = r - npv / dnpv
+        if not math.isfinite(r_new) or r_new <= -1:
+            break
         if abs(r_new - r) < tol:
-            return r_new
+            instrument.count('irr.newton_iters', iters)
+            return r_new, True
         r = r_new
-    return r
+    instrument.count('irr.newton_iters', iters)
+    instrument.count('irr.bisect_fallbacks')
+
+    lo, hi = IRR_BRACKET
+    f_lo = _npv_and_slope(lo, cashflows)[0]
+    f_hi = _npv_and_slope(hi, cashflows)[0]
+    if f_lo == 0:
+        return lo, True
+    if f_lo * f_hi > 0:
+        instrument.count('irr.no_root')
+        return math.nan, False
+    while hi - lo > tol:
+        instrument.count('irr.bisect_iters')
+        mid = 0.5 * (lo + hi)
+        f_mid = _npv_and_slope(mid, cashflows)[0]
+        if (f_mid > 0) == (f_lo > 0):
+            lo, f_lo = mid, f_mid
+        else:
+            hi = mid
+    return 0.5 * (lo + hi), True
+
+def irr(cashflows, guess=0.1, max_iter=100, tol=1e-6):
+    """Compute IRR (NaN when the cash flows have no solvable IRR)."""
+    return irr_solve(cashflows, guess, max_iter, tol)[0]
+
+@lru_cache(maxsize=512)
+def discount_factors(rate, horizon):
+    """Memoized tuple of 1/(1+rate)**i for i = 0..horizon."""
+    return tuple(1.0 / (1 + rate) ** i for i in range(horizon + 1))
 
 def npv(rate, cashflows):
-    return sum(cf / ((1 + rate) ** i) for i, cf in enumerate(cashflows))
+    disc = discount_factors(rate, len(cashflows) - 1)
+    return sum(cf * d for cf, d in zip(cashflows, disc))
 
 def simple_payback(cashflows):
     cum = 0.0
@@ -28,24 +108,50 @@ def simple_payback(cashflows):
 
 def discounted_payback(rate, cashflows):
     cum = 0.0
-    for i, cf in enumerate(cashflows):
-        cum += cf / ((1 + rate) ** i)
+    disc = discount_factors(rate, len(cashflows) - 1)
+    for i, (cf, d) in enumerate(zip(cashflows, disc)):
+        cum += cf * d
         if cum >= 0:
             return i
     return None
 
+def hhv_scale(basis):
+    """Factor converting an efficiency quoted on `basis` ('HHV' or 'LHV') to HHV."""
+    return 1.0 / HHV_PER_LHV if str(basis).upper() == 'LHV' else 1.0
+
+def hhv_params(params):
+    """
+    params with LHV electrical/thermal efficiencies converted to HHV (and
+    hh_basis set to 'HHV'); HHV params are returned unchanged. Fuel is priced
+    and counted on HHV, so every model works on HHV efficiencies.
+    """
+    scale = hhv_scale(params.get('hh_basis', 'HHV'))
+    if scale == 1.0:
+        return params
+    return dict(params, hh_basis='HHV', elec_eff_pct=params['elec_eff_pct'] * scale,
+                therm_eff_pct=params.get('therm_eff_pct', 0.0) * scale)
+
 def annual_schedule(params):
     """
     Core model for energy + cash flows (annual).
     params keys:
       power_kw, cap_factor, elec_eff_pct, therm_output_kw OR therm_eff_pct,
       hh_basis ('HHV'/'LHV'), tariff_elec, tariff_therm, gas_price_per_mmbtu,
-      capex, itc_pct, om_fixed, om_var_per_kwh, years, debt, interest, term, tax_rate
+      capex, itc_pct, om_fixed, om_var_per_kwh, years, debt, interest, term, tax_rate,
+      optional macrs_class (0/5/7/15) and bonus_pct (see tax.py), ambient_derate
     """
+    return schedule_from_energy(params, annual_energy(params))
+
+@instrument.timed('finance.annual_energy')
+def annual_energy(params):
+    """Annual energy balance and value streams for the flat capacity-factor mode."""
+    params = hhv_params(params)
     hrs = 8760 * params['cap_factor']
-    elec_kwh = params['power_kw'] * hrs
+    # Site output: rated power × ambient derate (thermal output scales with it)
+    derate = params.get('ambient_derate', 1.0)
+    elec_kwh = params['power_kw'] * derate * hrs
 
-    # Electrical efficiency fraction (HHV basis by default)
+    # Electrical efficiency fraction (HHV; LHV inputs converted above)
     elec_eff_frac = params['elec_eff_pct'] / 100.0
 
     # kWh → MMBtu (HHV)
@@ -59,15 +165,15 @@ def annual_schedule(params):
     therm_mmbtu = 0.0
     # Prefer BTU/hr if provided (>0); convert BTU/hr × hours → MMBtu/year
     if params.get('therm_output_btu_per_hr', 0.0) and params['therm_output_btu_per_hr'] > 0.0:
-        therm_mmbtu = (params['therm_output_btu_per_hr'] * hrs) / 1_000_000.0  # 1 MMBtu = 1,000,000 BTU
+        therm_mmbtu = (params['therm_output_btu_per_hr'] * derate * hrs) / 1_000_000.0  # 1 MMBtu = 1,000,000 BTU
         therm_eff_frac = therm_mmbtu / fuel_mmbtu_total if fuel_mmbtu_total > 0 else 0.0
     elif params.get('therm_output_kw', 0.0) and params['therm_output_kw'] > 0.0:
         # Legacy kW thermal output support: kW × hours × 0.003412 MMBtu/kWh
-        therm_mmbtu = params['therm_output_kw'] * hrs * 0.003412
+        therm_mmbtu = params['therm_output_kw'] * derate * hrs * 0.003412
         therm_eff_frac = therm_mmbtu / fuel_mmbtu_total if fuel_mmbtu_total > 0 else 0.0
     else:
         therm_eff_frac = (params.get('therm_eff_pct', 0.0) / 100.0)
-        therm_mmbtu = fuel_mmbtu
+        therm_mmbtu = fuel_mmbtu_total * therm_eff_frac
 
 
     # Total system efficiency (EPA definition)
@@ -78,45 +184,195 @@ def annual_schedule(params):
     rev_elec = elec_kwh * params['tariff_elec']
     rev_therm = therm_mmbtu * params['tariff_therm']
 
-    # Fuel & O&M
+    # Fuel
     fuel_cost = fuel_mmbtu_total * params['gas_price_per_mmbtu']
-    om_cost = params['om_fixed'] + params['om_var_per_kwh'] * elec_kwh
+
+    return {
+        'elec_kwh': elec_kwh, 'therm_mmbtu': therm_mmbtu, 'fuel_mmbtu': fuel_mmbtu_total,
+        'total_eff': total_eff, 'rev_elec': rev_elec, 'rev_therm': rev_therm,
+        'fuel_cost': fuel_cost,
+    }
+
+# Schedule columns in display order; 'year' is stored as int, the rest as float
+SCHEDULE_FIELDS = ('year', 'elec_kwh', 'therm_mmbtu', 'fuel_mmbtu', 'rev_elec', 'rev_therm', 'fuel_cost',
+                   'om_cost', 'overhaul_cost', 'debt_service', 'interest', 'depreciation', 'tax', 'net_cf',
+                   'total_eff')
+
+class Schedule:
+    """
+    Columnar annual schedule: one compact array per field (years 0..N).
+
+    Iterating (or indexing with an int) yields per-year row dicts as the old
+    list-of-dicts schedule did; index with a field name for the whole column.
+    to_frame() wraps the arrays in a DataFrame without copying. Pass `build`
+    instead of `columns` to defer building the arrays until first use (most
+    callers only need the cash flows).
+    """
+    __slots__ = ('_columns', '_build')
+
+    def __init__(self, columns=None, build=None):
+        self._columns, self._build = columns, build
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns, self._build = self._build(), None
+        return self._columns
+
+    def __reduce__(self):
+        return Schedule, (self.columns,)
+
+    def __len__(self):
+        return len(self.columns['year'])
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        return {name: col[key] for name, col in self.columns.items()}
+
+    def __iter__(self):
+        names = list(self.columns)
+        return (dict(zip(names, values)) for values in zip(*self.columns.values()))
+
+    def to_dicts(self):
+        """Row-per-year list of dicts."""
+        return list(self)
+
+    def to_lists(self):
+        """{field: list} (e.g. for JSON)."""
+        return {name: col.tolist() for name, col in self.columns.items()}
+
+    def to_frame(self):
+        """pandas DataFrame whose columns are zero-copy views of the schedule arrays."""
+        import numpy as np
+        import pandas as pd
+
+        return pd.DataFrame({name: np.frombuffer(col, dtype=col.typecode) for name, col in self.columns.items()},
+                            copy=False)
+
+def year_profile(params):
+    """
+    Per-operating-year multipliers for years 1..N: escalation factors for
+    electricity, thermal value, gas and O&M, output and efficiency factors
+    from degradation (reset by each overhaul), overhaul-year flags and the
+    debt-service flag (only within the debt term).
+    """
+    p = {k: params.get(k, default) for k, default in YEAR_PROFILE_DEFAULTS.items()}
+    interval = int(p['overhaul_interval'])
+    years, term = params['years'], params['term']
+    elapsed = range(years)                       # year - 1
+    ages = [i % interval for i in elapsed] if interval > 0 else elapsed
+    ones = [1.0] * years                         # neutral inputs skip the power series
+
+    def growth(rate):
+        return [(1 + rate) ** i for i in elapsed] if rate else ones
+
+    def decay(rate):
+        return [(1 - rate) ** a for a in ages] if rate else ones
+
+    return {
+        'elec': growth(p['esc_elec']), 'therm': growth(p['esc_therm']),
+        'gas': growth(p['esc_gas']), 'om': growth(p['esc_om']),
+        'output': decay(p['degradation']), 'eff': decay(p['eff_degradation']),
+        'overhaul': [interval > 0 and (i + 1) % interval == 0 and i + 1 < years for i in elapsed],
+        'debt': [i < term for i in elapsed],
+    }
+
+@instrument.timed('finance.schedule')
+def schedule_from_energy(params, energy):
+    """
+    Annual cash-flow schedule from a year of energy and value streams.
+    `energy` holds elec_kwh, therm_mmbtu, fuel_mmbtu, total_eff, rev_elec,
+    rev_therm and fuel_cost, as returned by annual_energy or
+    dispatch.annual_energy (hourly mode), and describes the first operating
+    year; later years follow year_profile (escalation, degradation,
+    overhauls). Debt service stops after the debt term; tax deducts
+    interest and MACRS depreciation (tax.py) with losses carried forward.
+    Returns (Schedule, cashflows, total_eff).
+    """
+    elec_kwh, therm_mmbtu = energy['elec_kwh'], energy['therm_mmbtu']
+    fuel_mmbtu_total, total_eff = energy['fuel_mmbtu'], energy['total_eff']
+    rev_elec, rev_therm, fuel_cost = energy['rev_elec'], energy['rev_therm'], energy['fuel_cost']
 
     # CapEx net of ITC (IRA §48)
     capex_net = params['capex'] * (1 - params['itc_pct'])
 
-    # Debt service (level payment)
+    # Debt service (level payment over the debt term) and its interest share
     debt_amt = params['debt'] * capex_net
-    equity_amt = (1 - params['debt']) * capex_net
-    ann = 0.0
-    if debt_amt > 0 and params['term'] > 0 and params['interest'] > 0:
-        i = params['interest']
-        n = params['term']
-        ann = debt_amt * (i * (1 + i) ** n) / ((1 + i) ** n - 1)
-
-    schedule, cashflows = [], []
-
-    # Year 0
-    schedule.append({
-        'year': 0, 'elec_kwh': 0, 'therm_mmbtu': 0, 'fuel_mmbtu': 0,
-        'rev_elec': 0, 'rev_therm': 0, 'fuel_cost': 0, 'om_cost': 0,
-        'debt_service': 0, 'tax': 0, 'net_cf': -capex_net, 'total_eff': total_eff
-    })
-    cashflows.append(-capex_net)
-
-    for y in range(1, params['years'] + 1):
-        gross = rev_elec + rev_therm
-        op_costs = fuel_cost + om_cost
-        ebitda = gross - op_costs
-        tax = max(0.0, (ebitda - ann)) * params['tax_rate']  # simplified tax
-        net = ebitda - ann - tax
-        schedule.append({
-            'year': y, 'elec_kwh': elec_kwh, 'therm_mmbtu': therm_mmbtu,
-            'fuel_mmbtu': fuel_mmbtu_total, 'rev_elec': rev_elec,
-            'rev_therm': rev_therm, 'fuel_cost': fuel_cost, 'om_cost': om_cost,
-            'debt_service': ann, 'tax': tax, 'net_cf': net, 'total_eff': total_eff
-        })
-        cashflows.append(net)
-
-    return schedule, cashflows, total_eff
+    ann = tax.loan_payment(debt_amt, params['interest'], params['term'])
+    interest = [debt_amt * x for x in tax.interest_fractions(params['interest'], params['term'])] if ann else []
+
+    # Tax depreciation on the ITC-reduced basis
+    basis = tax.depreciable_basis(params['capex'], params['itc_pct'])
+    dep = tax.depreciation_fractions(params.get('macrs_class', tax.TAX_DEFAULTS['macrs_class']),
+                                     params.get('bonus_pct', tax.TAX_DEFAULTS['bonus_pct']), params['years'])
+
+    overhaul = params.get('overhaul_cost', 0.0)
+    om_fixed, om_var = params['om_fixed'], params['om_var_per_kwh']
+    years, term = params['years'], params['term']
+    debt = [ann] * min(term, years) + [0.0] * (years - term)
+    paid_interest = (interest + [0.0] * years)[:years]
+    depreciation = [basis * d for d in dep]
+
+    # Operating years 1..N, one column at a time
+    if any(params.get(k, 0.0) for k in YEAR_PROFILE_DEFAULTS):
+        f = year_profile(params)
+        output, eff = f['output'], f['eff']
+        e_kwh = [elec_kwh * out for out in output]
+        r_elec = [rev_elec * out * g for out, g in zip(output, f['elec'])]
+        r_therm = [rev_therm * out * g for out, g in zip(output, f['therm'])]
+        fuel = [fuel_cost * out / e * g for out, e, g in zip(output, eff, f['gas'])]
+        om = [(om_fixed + om_var * kwh) * g for kwh, g in zip(e_kwh, f['om'])]
+        oh = [overhaul * g if flag else 0.0 for g, flag in zip(f['om'], f['overhaul'])]
+        # Pre-tax cash: EBITDA less overhaul and debt service
+        cash = [re + rt - fu - o - h - d for re, rt, fu, o, h, d in zip(r_elec, r_therm, fuel, om, oh, debt)]
+    else:
+        # No escalation, degradation or overhauls: every operating year matches year 1
+        output = eff = [1.0] * years
+        om_cost = om_fixed + om_var * elec_kwh
+        e_kwh, r_elec, r_therm = [elec_kwh] * years, [rev_elec] * years, [rev_therm] * years
+        fuel, om, oh = [fuel_cost] * years, [om_cost] * years, [0.0] * years
+        ebitda = rev_elec + rev_therm - fuel_cost - om_cost
+        cash = [ebitda - d for d in debt]
+
+    # Tax on EBITDA less overhaul, interest and depreciation
+    taxable = [c + paid - i - d for c, paid, i, d in zip(cash, debt, paid_interest, depreciation)]
+    taxes = tax.taxes(taxable, params['tax_rate'])
+    net_cf = [-capex_net] + [c - t for c, t in zip(cash, taxes)]
+
+    def columns():
+        cols = {
+            'year': range(years + 1),
+            'elec_kwh': [0.0] + e_kwh,
+            'therm_mmbtu': [0.0] + [therm_mmbtu * out for out in output],
+            'fuel_mmbtu': [0.0] + [fuel_mmbtu_total * out / e for out, e in zip(output, eff)],
+            'rev_elec': [0.0] + r_elec, 'rev_therm': [0.0] + r_therm, 'fuel_cost': [0.0] + fuel,
+            'om_cost': [0.0] + om, 'overhaul_cost': [0.0] + oh, 'debt_service': [0.0] + debt,
+            'interest': [0.0] + paid_interest, 'depreciation': [0.0] + depreciation,
+            'tax': [0.0] + taxes, 'net_cf': net_cf,
+            'total_eff': [total_eff] + [total_eff * e for e in eff],
+        }
+        return {name: array('i' if name == 'year' else 'd', cols[name]) for name in SCHEDULE_FIELDS}
+
+    return Schedule(build=columns), net_cf, total_eff
 
+@instrument.timed('finance.evaluate')
+def evaluate(params, npv_rate=0.10, energy=None):
+    """
+    Run annual_schedule and the KPIs the app reports (IRR, NPV, paybacks) in one
+    call. Pass `energy` (e.g. from hourly dispatch) to skip the flat energy model.
+    """
+    if energy is None:
+        schedule, cashflows, total_eff = annual_schedule(params)
+    else:
+        schedule, cashflows, total_eff = schedule_from_energy(params, energy)
+    return {
+        'schedule': schedule,
+        'cashflows': cashflows,
+        'total_eff': total_eff,
+        'irr': irr(cashflows),
+        'npv_rate': npv_rate,
+        'npv': npv(npv_rate, cashflows),
+        'payback': simple_payback(cashflows),
+        'disc_payback': discounted_payback(npv_rate, cashflows),
+    }
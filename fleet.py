@@ -0,0 +1,179 @@
+"""
+Multi-unit plant (fleet) availability simulation.
+
+A plant is several catalog engines -- identical or mixed -- whose firm
+target output is what remains with the `redundancy` largest units out (N+1
+by default). For every Monte Carlo draw, operating year and unit the hours
+available come from array-based event generation:
+  forced outages   Poisson(outages_per_year) events, each with an
+                   exponential repair time (summed as one gamma draw);
+  maintenance      planned hours every year;
+  major overhauls  overhaul_hours in the unit's overhaul years, every params
+                   `overhaul_interval` years, staggered across the units so
+                   they do not all come down in the same year.
+Within a year each unit is up for its available share of the hours,
+independently of the others, so the plant's available capacity has a
+Poisson-binomial distribution; delivered energy is its expectation capped at
+the target. The (draws × years) delivered fractions scale the plant's
+full-availability energy in batch.cashflows_from_energy, and overhaul costs
+follow the staggered schedule. Nothing loops over hours or draws in Python,
+so a 10,000-draw, 20-year simulation takes a fraction of a second.
+
+In fleet mode `cap_factor` is the site's utilization of the firm capacity
+excluding outages (1.0 for baseload); outages come from the simulation.
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+
+import batch
+import finance
+import performance
+from catalog import engine_params
+from montecarlo import MonteCarloResult
+
+HOURS_PER_YEAR = 8760
+
+
+@dataclass(frozen=True)
+class Reliability:
+    """Per-unit outage assumptions; the defaults give ~96 % availability (lean-burn gas CHP)."""
+    outages_per_year: float = 6.0     # forced outage events per unit-year
+    repair_hours: float = 24.0        # mean forced-outage duration
+    maintenance_hours: float = 150.0  # planned maintenance per unit-year
+    overhaul_hours: float = 500.0     # downtime per major overhaul
+
+
+@dataclass
+class FleetResult(MonteCarloResult):
+    """MonteCarloResult for a simulated plant; samples['availability'] is each draw's lifetime mean."""
+    unit_availability: np.ndarray = field(repr=False)  # (draws × years × units) share of hours up
+    delivered: np.ndarray = field(repr=False)          # (draws × years) output ÷ full-availability output
+    target_kw: float = 0.0
+
+    @property
+    def plant_availability(self):
+        """Mean delivered share of the firm target over all draws and years."""
+        return float(self.delivered.mean()) if self.delivered.size else float('nan')
+
+    def yearly(self, pcts=(10, 50, 90)):
+        """{pct: (years,) delivered share per operating year} across draws."""
+        return dict(zip(pcts, np.percentile(self.delivered, pcts, axis=0)))
+
+
+def firm_capacity(unit_kw, redundancy=1):
+    """Plant output with the `redundancy` largest units out (N+redundancy design)."""
+    kw = np.sort(np.asarray(unit_kw, dtype=float))
+    if not 0 <= redundancy < len(kw):
+        raise ValueError(f"redundancy must be between 0 and {len(kw) - 1} for {len(kw)} units")
+    return float(kw[:len(kw) - redundancy].sum())
+
+
+def plant_params(params, units, target_kw=None, redundancy=1):
+    """
+    Finance params for the plant delivering `target_kw` (default: the firm
+    capacity): the units' HHV efficiencies combined by fuel burned and their
+    catalog thermal output scaled to the target (params' thermal inputs are
+    kept when the catalog has none).
+    """
+    eng = [engine_params(m) for m in units]
+    kw = np.array([e['power_kw'] for e in eng])
+    if target_kw is None:
+        target_kw = firm_capacity(kw, redundancy)
+    plant = dict(finance.hhv_params(params), power_kw=float(target_kw),
+                 elec_eff_pct=float(kw.sum() / sum(e['power_kw'] / e['elec_eff_pct'] for e in eng)))
+    therm_kw = sum(e['therm_output_kw'] for e in eng)
+    if therm_kw > 0:
+        plant.update(therm_output_kw=therm_kw / kw.sum() * target_kw, therm_output_btu_per_hr=0.0)
+    return plant
+
+
+def overhaul_schedule(n_units, years, interval):
+    """
+    (years × units) major-overhaul flags: unit u overhauls when
+    (year + offset_u) % interval == 0, with offsets spread evenly over the
+    interval (unit 0 matches finance.year_profile); none in the final year.
+    """
+    y = np.arange(1, years + 1)[:, None]
+    if interval <= 0:
+        return np.zeros((years, n_units), dtype=bool)
+    offset = np.arange(n_units) * interval // n_units
+    return ((y + offset) % interval == 0) & (y < years)
+
+
+def simulate(n_units, years, reliability=Reliability(), overhaul_interval=0, n=1000, seed=None):
+    """
+    (n × years × units) share of each year's hours each unit is available.
+    `reliability` is one Reliability for every unit or one per unit.
+    """
+    rel = [reliability] * n_units if isinstance(reliability, Reliability) else list(reliability)
+    if len(rel) != n_units:
+        raise ValueError(f"expected {n_units} Reliability entries, got {len(rel)}")
+
+    def per_unit(name):
+        return np.array([getattr(r, name) for r in rel], dtype=float)
+
+    rng = np.random.default_rng(seed)
+    events = rng.poisson(per_unit('outages_per_year'), (n, years, n_units))
+    down = rng.gamma(events, per_unit('repair_hours'))  # sum of `events` exponential repairs
+    down += per_unit('maintenance_hours')
+    down += per_unit('overhaul_hours') * overhaul_schedule(n_units, years, overhaul_interval)
+    np.minimum(down, HOURS_PER_YEAR, out=down)
+    return 1.0 - down / HOURS_PER_YEAR
+
+
+def delivered_fraction(availability, unit_kw, target_kw):
+    """
+    Expected output ÷ target for each plant-year of an (... × units)
+    availability array. The distribution of available capacity is built one
+    unit at a time over capacity levels capped at the target (so identical
+    units stay at N + 1 levels); each step folds the up/down branches back
+    onto the merged levels with one matrix product.
+    """
+    n_units = availability.shape[-1]
+    a = availability.reshape(-1, n_units)
+    levels = np.zeros(1)
+    probs = np.ones((a.shape[0], 1))
+    for u, kw in enumerate(unit_kw):
+        up = a[:, u:u + 1]
+        merged, inv = np.unique(np.minimum(np.concatenate([levels, levels + kw]), target_kw),
+                                return_inverse=True)
+        fold = np.zeros((2 * len(levels), len(merged)))
+        fold[np.arange(2 * len(levels)), inv] = 1.0
+        probs = np.concatenate([probs * (1.0 - up), probs * up], axis=1) @ fold
+        levels = merged
+    return (probs @ (levels / target_kw)).reshape(availability.shape[:-1])
+
+
+def run(params, units, reliability=Reliability(), target_kw=None, redundancy=1,
+        n=1000, npv_rate=0.10, seed=None):
+    """
+    Simulate the plant of `units` (EngineModels or catalog display names,
+    repeated for identical units) over the project life `n` times and
+    evaluate every draw's cash flows. CapEx and O&M come from params as
+    given (for the whole plant); `redundancy` is capped at len(units) - 1, so
+    a single unit is its own firm capacity. Returns a FleetResult.
+    """
+    models = [performance.resolve(u) for u in units]
+    if not models or any(m is None for m in models):
+        raise ValueError("units must be catalog engines")
+    redundancy = min(redundancy, len(models) - 1)
+    unit_kw = np.array([engine_params(m)['power_kw'] for m in models])
+    plant = plant_params(params, models, target_kw, redundancy)
+    years, interval = int(plant['years']), int(plant.get('overhaul_interval', 0))
+
+    availability = simulate(len(models), years, reliability, interval, n, seed)
+    delivered = delivered_fraction(availability, unit_kw, plant['power_kw'])
+    # Each unit's overhaul costs its share (by kW) of the plant's overhaul_cost
+    overhauls = overhaul_schedule(len(models), years, interval) @ (unit_kw / unit_kw.sum())
+
+    table = {k: v for k, v in plant.items() if not isinstance(v, str)}
+    cols, _ = batch.columns(dict(table, years=np.full(n, years, dtype=float)))
+    energy = batch.energy_batch(cols)
+    cf = batch.cashflows_from_energy(cols, energy, availability=delivered, overhauls=overhauls)
+    irr, status = batch.irr_batch(cf)
+    return FleetResult(
+        samples={'availability': delivered.mean(axis=1)}, irr=irr, irr_status=status,
+        npv=batch.npv_batch(npv_rate, cf), npv_rate=npv_rate, total_eff=energy['total_eff'],
+        unit_availability=availability, delivered=delivered, target_kw=plant['power_kw'],
+    )
@@ -0,0 +1,147 @@
+"""
+Goal-seek / breakeven solver.
+
+Finds the value of one numeric input that makes IRR, NPV or (discounted)
+payback hit a target, e.g. "gas price for IRR = 12%" or "max CapEx for a
+5-year payback". Every target is expressed as a linear functional of the
+cash-flow vector being zero:
+  irr          NPV at the target rate (conventional cash flows)
+  npv          NPV at npv_rate minus the target
+  payback      cumulative cash flow at the target year (interpolated)
+  disc_payback same on discounted cash flows
+Cash flows are piecewise linear in most inputs (tariffs, gas price, O&M,
+CapEx, capacity factor), so a single secant step across the bracket is exact
+whenever no tax or debt kink lies inside it; the step is verified and kinked
+rows fall back to bracketed false position. All scenarios -- e.g. every
+catalog engine -- are solved together in vectorized form.
+"""
+import math
+
+import numpy as np
+
+import batch
+import finance
+
+SOLVED_LINEAR = 0     # secant step across the bracket was exact
+SOLVED_BRACKETED = 1  # found by bracketed false position (Illinois)
+NO_SOLUTION = 2       # target not reached anywhere in the bracket; value is NaN
+
+METRICS = ('irr', 'npv', 'payback', 'disc_payback')
+
+# Search ranges for common inputs; others default to (0, 10 × base value)
+DEFAULT_BRACKETS = {
+    'gas_price_per_mmbtu': (0.0, 100.0),
+    'tariff_elec': (0.0, 2.0),
+    'tariff_therm': (0.0, 200.0),
+    'cap_factor': (0.0, 1.0),
+    'capex': (0.0, 1e9),
+    'om_fixed': (0.0, 1e8),
+    'om_var_per_kwh': (0.0, 1.0),
+    'itc_pct': (0.0, 1.0),
+    'debt': (0.0, 1.0),
+    'interest': (0.0, 1.0),
+    'tax_rate': (0.0, 1.0),
+    'bonus_pct': (0.0, 1.0),
+}
+
+
+def _weights(metric, target, horizon, npv_rate):
+    """(weights, offset) so that the residual is cashflows @ weights - offset."""
+    t = np.arange(horizon + 1)
+    if metric == 'irr':
+        return 1.0 / (1.0 + target) ** t, 0.0
+    if metric == 'npv':
+        return 1.0 / (1.0 + npv_rate) ** t, target
+    if metric in ('payback', 'disc_payback'):
+        whole = math.floor(target)
+        w = np.where(t <= whole, 1.0, 0.0)
+        if whole + 1 <= horizon:
+            w[whole + 1] = target - whole
+        if metric == 'disc_payback':
+            w = w / (1.0 + npv_rate) ** t
+        return w, 0.0
+    raise ValueError(f"metric must be one of {METRICS}")
+
+
+def breakeven_batch(table, key, target, metric='irr', bracket=None, npv_rate=0.10,
+                    xtol=1e-9, max_iter=100):
+    """
+    Solve `key` for every scenario in `table` so that `metric` equals `target`.
+    Returns (values, status) arrays; status codes SOLVED_LINEAR,
+    SOLVED_BRACKETED or NO_SOLUTION.
+    """
+    cols, n = batch.columns(table)
+    if key not in cols:
+        raise KeyError(f"'{key}' is not a numeric model input")
+    if bracket is None:
+        bracket = DEFAULT_BRACKETS.get(key, (0.0, 10.0 * float(np.max(np.abs(cols[key])) or 1.0)))
+    lo = np.full(n, float(bracket[0]))
+    hi = np.full(n, float(bracket[1]))
+
+    weights, offset = _weights(metric, target, int(cols['years'].max()), npv_rate)
+
+    def residual(x, rows):
+        sub = {k: v[rows] for k, v in cols.items()}
+        sub[key] = x
+        return batch.cashflows_from_energy(sub, batch.energy_batch(sub)) @ weights - offset
+
+    everyone = np.arange(n)
+    f_lo = residual(lo, everyone)
+    f_hi = residual(hi, everyone)
+    values = np.full(n, np.nan)
+    status = np.full(n, NO_SOLUTION, dtype=np.int8)
+    scale = np.maximum(np.abs(f_lo), np.abs(f_hi))
+
+    exact_lo = f_lo == 0
+    values[exact_lo], status[exact_lo] = lo[exact_lo], SOLVED_LINEAR
+    live = ~exact_lo & (np.sign(f_lo) != np.sign(f_hi))
+
+    # Analytic shortcut: if the residual is linear across the bracket one secant step lands on the root
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = lo - f_lo * (hi - lo) / (f_hi - f_lo)
+    rows = np.flatnonzero(live)
+    if rows.size:
+        f_x = residual(x[rows], rows)
+        exact = np.abs(f_x) <= 1e-9 * scale[rows]
+        values[rows[exact]], status[rows[exact]] = x[rows[exact]], SOLVED_LINEAR
+
+        # Bracketed fallback (Illinois false position) for kinked rows
+        rows, f_x = rows[~exact], f_x[~exact]
+        a, b, x_r = lo[rows], hi[rows], x[rows]
+        fa, fb = f_lo[rows], f_hi[rows]
+        left = np.sign(f_x) == np.sign(fa)
+        a, fa = np.where(left, x_r, a), np.where(left, f_x, fa)
+        b, fb = np.where(left, b, x_r), np.where(left, fb, f_x)
+        side = np.where(left, -1, 1)
+        for _ in range(max_iter):
+            if not rows.size:
+                break
+            x_r = (a * fb - b * fa) / (fb - fa)
+            f_x = residual(x_r, rows)
+            done = (np.abs(b - a) <= xtol * np.maximum(1.0, np.abs(x_r))) | (f_x == 0)
+            values[rows[done]], status[rows[done]] = x_r[done], SOLVED_BRACKETED
+            keep = ~done
+            rows, x_r, f_x = rows[keep], x_r[keep], f_x[keep]
+            a, b, fa, fb, side = a[keep], b[keep], fa[keep], fb[keep], side[keep]
+            left = np.sign(f_x) == np.sign(fa)
+            # Illinois: halve the stale endpoint when the same side is kept twice
+            fb = np.where(left & (side == -1), fb / 2, fb)
+            fa = np.where(~left & (side == 1), fa / 2, fa)
+            a, fa = np.where(left, x_r, a), np.where(left, f_x, fa)
+            b, fb = np.where(left, b, x_r), np.where(left, fb, f_x)
+            side = np.where(left, -1, 1)
+    return values, status
+
+
+def breakeven(params, key, target, metric='irr', bracket=None, npv_rate=0.10):
+    """Breakeven value of `key` for one params dict (NaN if the target is unreachable in the bracket)."""
+    table = {k: v for k, v in finance.hhv_params(params).items() if not isinstance(v, str)}
+    values, _ = breakeven_batch(table, key, target, metric, bracket, npv_rate)
+    return float(values[0])
+
+
+def breakeven_catalog(params, engines, key, target, metric='irr', bracket=None, npv_rate=0.10):
+    """Breakeven value of `key` for every engine at once: [(engine, value, status), ...]."""
+    values, status = breakeven_batch(batch.engine_table(params, engines), key, target, metric,
+                                     bracket, npv_rate)
+    return list(zip(engines, values.tolist(), status.tolist()))
@@ -0,0 +1,136 @@
+"""
+Cold-start import-time budget.
+
+    python import_budget.py                     # check every target, exit 1 on any violation
+    python import_budget.py finance report      # only these targets
+    python import_budget.py --budget app=1500 --repeat 7
+    python import_budget.py --explain catalog   # slowest imports behind one target
+
+Each target is imported in a fresh interpreter (best of --repeat runs:
+bytecode caches are warm, but nothing is imported yet -- what an autoscaled
+instance or a freshly spawned batch worker pays) and its wall time is
+compared with the budget in TARGETS. Each target also names packages it
+must not load at import: the finance library stays free of NumPy, pandas,
+plotting and docx, and the chart/report modules only load matplotlib and
+python-docx when a chart or report is requested. 'app' imports the modules
+app.py imports without running the Streamlit script. Budgets are
+milliseconds on a typical dev machine; scale them with --budget elsewhere.
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY = ('numpy', 'pandas', 'pyarrow', 'matplotlib', 'docx', 'lxml', 'streamlit')
+PLOT_AND_DOCX = ('matplotlib', 'docx', 'lxml')
+
+# name: (modules to import, budget ms, packages that must not be loaded)
+TARGETS = {
+    'finance': (('finance', 'tax'), 25, HEAVY),
+    'catalog': (('catalog',), 60, HEAVY),
+    'batch': (('batch',), 300, ('pandas', 'pyarrow', 'matplotlib', 'docx', 'lxml', 'streamlit')),
+    'charts': (('charts',), 40, PLOT_AND_DOCX),
+    'report': (('report',), 40, PLOT_AND_DOCX),
+    'service': (('service',), 350, ('pandas', 'pyarrow', 'matplotlib', 'docx', 'lxml', 'streamlit')),
+    'app': (None, 1500, PLOT_AND_DOCX),
+}
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(' '.join(sorted({m.partition('.')[0] for m in sys.modules})))
+"""
+
+
+def app_modules(path=os.path.join(HERE, 'app.py')):
+    """Top-level modules app.py imports, in order."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module)
+    return tuple(dict.fromkeys(names))
+
+
+def measure(modules, repeat=5):
+    """(best seconds, loaded top-level packages) for importing `modules` in fresh interpreters."""
+    best, loaded = None, set()
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _PROBE, *modules], cwd=HERE,
+                             capture_output=True, text=True, check=True).stdout.splitlines()
+        elapsed = float(out[0])
+        best = elapsed if best is None else min(best, elapsed)
+        loaded = set(out[1].split())
+    return best, loaded
+
+
+def explain(modules, top=15):
+    """The `top` imports with the largest cumulative time (python -X importtime)."""
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"], cwd=HERE,
+                         capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Check cold-start import time against per-target budgets.")
+    ap.add_argument('targets', nargs='*', help=f"targets to check (default: all of {', '.join(TARGETS)})")
+    ap.add_argument('--repeat', type=int, default=5, help="fresh interpreters per target (best is kept)")
+    ap.add_argument('--budget', action='append', default=[], metavar='TARGET=MS', help="override a budget")
+    ap.add_argument('--explain', metavar='TARGET', help="print the slowest imports behind TARGET and exit")
+    args = ap.parse_args(argv)
+
+    def modules_of(name):
+        return TARGETS[name][0] or app_modules()
+
+    if args.explain:
+        for cumulative, name in explain(modules_of(args.explain)):
+            print(f"{cumulative / 1000:9.1f} ms  {name}")
+        return 0
+
+    budgets = {name: spec[1] for name, spec in TARGETS.items()}
+    for item in args.budget:
+        name, _, ms = item.partition('=')
+        if name not in TARGETS:
+            ap.error(f"unknown target {name!r}")
+        budgets[name] = float(ms)
+
+    failures = 0
+    for name in args.targets or TARGETS:
+        if name not in TARGETS:
+            ap.error(f"unknown target {name!r}")
+        seconds, loaded = measure(modules_of(name), args.repeat)
+        ms = seconds * 1000
+        leaked = sorted(set(TARGETS[name][2]) & loaded)
+        problems = []
+        if ms > budgets[name]:
+            problems.append(f"over budget by {ms - budgets[name]:.1f} ms")
+        if leaked:
+            problems.append(f"loads {', '.join(leaked)}")
+        failures += bool(problems)
+        status = '; '.join(problems) if problems else 'ok'
+        print(f"{name:<10} {ms:8.1f} ms  (budget {budgets[name]:g} ms)  {status}", flush=True)
+
+    if failures:
+        print(f"\n{failures} target(s) failed; run with --explain TARGET for a breakdown")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Lightweight timing/counter instrumentation for the model pipeline.
+
+    import instrument
+    instrument.enable()                 # or run with CHP_INSTRUMENT=1
+    with instrument.stage('app.chart'):
+        ...
+    @instrument.timed('finance.evaluate')
+    def evaluate(...): ...
+    instrument.count('irr.newton_iters', k)
+    instrument.snapshot()               # per-stage calls/total/mean/max + counters
+    instrument.trace_json()             # Chrome/Perfetto trace of recent spans
+
+While disabled, timed() wrappers cost one global flag check per call and
+stage() returns a shared no-op context manager, so the hooks can stay in
+production code. State is process-wide and thread-safe (report jobs and the
+scoring service record from worker threads). Standard library only; json
+and the profiler modules are imported on first use to keep import cheap.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+enabled = os.environ.get('CHP_INSTRUMENT', '').lower() in ('1', 'true', 'yes')
+
+# Most recent spans kept for the trace export
+TRACE_LIMIT = 10_000
+
+_lock = threading.Lock()
+_stages = {}     # name -> [calls, total_s, max_s]
+_counters = {}   # name -> int
+_spans = deque(maxlen=TRACE_LIMIT)
+_origin = time.perf_counter()
+_NOOP = nullcontext()
+
+
+def enable(on=True):
+    """Turn recording on (or off with on=False)."""
+    global enabled
+    enabled = bool(on)
+
+
+def disable():
+    enable(False)
+
+
+def reset():
+    """Clear all recorded stages, counters and spans."""
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _spans.clear()
+
+
+def _record(name, start, elapsed):
+    with _lock:
+        s = _stages.get(name)
+        if s is None:
+            _stages[name] = [1, elapsed, elapsed]
+        else:
+            s[0] += 1
+            s[1] += elapsed
+            if elapsed > s[2]:
+                s[2] = elapsed
+        _spans.append((name, start - _origin, elapsed, threading.get_ident()))
+
+
+@contextmanager
+def _timing(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, start, time.perf_counter() - start)
+
+
+def stage(name):
+    """Context manager timing a block as stage `name` (no-op while disabled)."""
+    return _timing(name) if enabled else _NOOP
+
+
+def timed(name=None):
+    """Decorator timing every call of a function as a stage (default name: module.qualname)."""
+    def wrap(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(label, start, time.perf_counter() - start)
+        return inner
+    return wrap
+
+
+def count(name, n=1):
+    """Add n to counter `name` (no-op while disabled)."""
+    if enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def snapshot():
+    """{'stages': {name: {calls, total_ms, mean_ms, max_ms}}, 'counters': {...}}, stages by total time."""
+    with _lock:
+        stages = {name: list(s) for name, s in _stages.items()}
+        counters = dict(_counters)
+    return {
+        'enabled': enabled,
+        'stages': {
+            name: {'calls': c, 'total_ms': t * 1e3, 'mean_ms': t / c * 1e3, 'max_ms': m * 1e3}
+            for name, (c, t, m) in sorted(stages.items(), key=lambda kv: -kv[1][1])
+        },
+        'counters': dict(sorted(counters.items())),
+    }
+
+
+def trace_json(indent=None):
+    """Recent spans as Chrome trace-event JSON (open in chrome://tracing or ui.perfetto.dev)."""
+    import json
+
+    with _lock:
+        spans = list(_spans)
+        counters = dict(_counters)
+    events = [{'name': name, 'ph': 'X', 'ts': start * 1e6, 'dur': dur * 1e6, 'pid': os.getpid(), 'tid': tid}
+              for name, start, dur, tid in spans]
+    return json.dumps({'traceEvents': events, 'otherData': {'counters': counters}}, indent=indent)
+
+
+@contextmanager
+def profiled(sort='cumulative', limit=30):
+    """
+    Capture a cProfile of the block. Yields a dict whose 'text' entry holds
+    the pstats report (top `limit` functions by `sort`) after the block ends.
+    """
+    import cProfile
+    import io
+    import pstats
+
+    out = {'text': ''}
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield out
+    finally:
+        prof.disable()
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats(sort).print_stats(limit)
+        out['text'] = buf.getvalue()
@@ -0,0 +1,156 @@
+"""
+Streaming loader for interval-meter exports (e.g. 15-minute kW/kWh data).
+
+Files are read in fixed-size chunks and each chunk is reduced to per-hour
+partial sums and counts before the next is read, so memory stays bounded by
+the chunk size plus one row per hour regardless of file size. Hourly results
+can be cached as .npy files and memory-mapped on later runs of the same file,
+and `year_profile` turns them into the hourly profile dict that
+`dispatch.annual_energy` consumes.
+"""
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from dispatch import PROFILE_COLUMNS
+
+# How each profile column aggregates to an hour: demand/price columns average,
+# energy-per-interval columns add up.
+DEFAULT_AGG = {
+    'elec_load_kw': 'mean',
+    'therm_load_mmbtu': 'sum',
+    'price_elec': 'mean',
+    'price_therm': 'mean',
+    'price_gas': 'mean',
+    'ambient_temp_c': 'mean',
+}
+
+CACHE_VERSION = 1
+
+
+def _chunks(path, columns, chunksize):
+    """Yield DataFrames of at most `chunksize` rows from a CSV or Parquet file."""
+    if str(path).lower().endswith(('.parquet', '.pq')):
+        import pyarrow.parquet as pq
+
+        for rb in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield rb.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+
+def _cache_key(path, options):
+    st = os.stat(path)
+    ident = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|{options}|v{CACHE_VERSION}"
+    return hashlib.sha1(ident.encode('utf-8')).hexdigest()
+
+
+def _load_cached(folder, names):
+    try:
+        hours = np.load(os.path.join(folder, 'hour.npy'), mmap_mode='r')
+        return {'hour': hours, **{n: np.load(os.path.join(folder, f'{n}.npy'), mmap_mode='r') for n in names}}
+    except FileNotFoundError:
+        return None
+
+
+def _save_cached(folder, hourly):
+    parent = os.path.dirname(folder)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent)
+    for name, arr in hourly.items():
+        np.save(os.path.join(tmp, f'{name}.npy'), np.asarray(arr))
+    try:
+        os.replace(tmp, folder)
+    except OSError:
+        # Another process cached the same file first; keep theirs
+        for f in os.listdir(tmp):
+            os.remove(os.path.join(tmp, f))
+        os.rmdir(tmp)
+
+
+def read_hourly(path, timestamp_col='timestamp', columns=None, agg=None,
+                interval_ending=False, ts_format=None, chunksize=500_000, cache_dir=None):
+    """
+    Stream an interval file and aggregate it to hourly values.
+
+    columns:  mapping of file column → profile column name (default: the file
+              already uses PROFILE_COLUMNS names; those present are read).
+    agg:      per profile column 'mean' or 'sum' (defaults from DEFAULT_AGG).
+    interval_ending: timestamps mark the end of each interval (common in
+              utility exports), so they are shifted back before bucketing.
+    cache_dir: when set, hourly arrays are saved there as .npy keyed by the
+              file's path/size/mtime and options, and memory-mapped on reuse.
+
+    Returns a dict with 'hour' (datetime64[h]) and one float array per column.
+    """
+    if columns is None:
+        header = next(_chunks(path, None, 1)).columns
+        columns = {c: c for c in PROFILE_COLUMNS if c in header}
+    if not columns:
+        raise ValueError("no profile columns found; pass columns={file_col: profile_col}")
+    agg = {name: (agg or {}).get(name, DEFAULT_AGG.get(name, 'mean')) for name in columns.values()}
+    names = list(columns.values())
+
+    folder = None
+    if cache_dir is not None:
+        options = (timestamp_col, sorted(columns.items()), sorted(agg.items()), interval_ending, ts_format)
+        folder = os.path.join(cache_dir, _cache_key(path, options))
+        cached = _load_cached(folder, names)
+        if cached is not None:
+            return cached
+
+    sums, counts = [], []
+    for chunk in _chunks(path, [timestamp_col, *columns], chunksize):
+        ts = pd.to_datetime(chunk[timestamp_col], format=ts_format)
+        if interval_ending:
+            ts = ts - pd.Timedelta(seconds=1)
+        values = chunk[list(columns)].rename(columns=columns).astype(float)
+        grouped = values.groupby(ts.dt.floor('h').to_numpy())
+        sums.append(grouped.sum())
+        counts.append(grouped.count())
+
+    # Chunk boundaries can split an hour; combine the per-chunk partials
+    total = pd.concat(sums).groupby(level=0).sum().sort_index()
+    count = pd.concat(counts).groupby(level=0).sum().reindex(total.index)
+    hourly = {'hour': total.index.to_numpy().astype('datetime64[h]')}
+    for name in names:
+        if agg[name] == 'sum':
+            hourly[name] = total[name].to_numpy(dtype=float)
+        else:
+            hourly[name] = (total[name] / count[name].where(count[name] > 0)).to_numpy(dtype=float)
+
+    if folder is not None:
+        _save_cached(folder, hourly)
+    return hourly
+
+
+def year_profile(hourly, year):
+    """
+    Slice one calendar year of hourly data into a dispatch profile of exactly
+    8760 hours: Feb 29 is dropped and missing hours are filled with that
+    column's mean for the year.
+    """
+    start = np.datetime64(f'{year}-01-01T00', 'h')
+    stop = np.datetime64(f'{year + 1}-01-01T00', 'h')
+    grid = np.arange(start, stop, dtype='datetime64[h]')
+    month = grid.astype('datetime64[M]')
+    day = (grid.astype('datetime64[D]') - month.astype('datetime64[D]')).astype(int) + 1
+    grid = grid[~((month.astype(int) % 12 == 1) & (day == 29))]
+
+    hours = np.asarray(hourly['hour'])
+    pos = np.searchsorted(hours, grid)
+    pos_ok = np.minimum(pos, len(hours) - 1)
+    found = (pos < len(hours)) & (hours[pos_ok] == grid)
+
+    profile = {}
+    for name, arr in hourly.items():
+        if name == 'hour':
+            continue
+        arr = np.asarray(arr, dtype=float)
+        col = np.where(found, arr[pos_ok], np.nan)
+        fill = np.nanmean(col) if np.isfinite(col).any() else 0.0
+        profile[name] = np.where(np.isfinite(col), col, fill)
+    return profile
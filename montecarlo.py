@@ -0,0 +1,143 @@
+"""
+Monte Carlo uncertainty over the annual model.
+
+Distributions are given per params key as tuples:
+  ('normal', mean, sd)          ('lognormal', median, sigma)
+  ('uniform', low, high)        ('triangular', low, mode, high)
+Correlations between sampled keys use a Gaussian copula: correlated standard
+normals are drawn once and mapped through each marginal. Draws are evaluated
+with the vectorized batch engine in fixed-size blocks, so 100k draws take a
+second or two on one core.
+"""
+from dataclasses import dataclass, field
+from typing import Dict
+
+import numpy as np
+
+import batch
+import finance
+
+# Inputs the app exposes for uncertainty analysis
+UNCERTAIN_KEYS = ('gas_price_per_mmbtu', 'tariff_elec', 'tariff_therm', 'cap_factor', 'capex')
+
+# Hard bounds applied after sampling so draws stay physical (normal tails can go negative)
+CLIP = {
+    'cap_factor': (0.0, 1.0),
+    'gas_price_per_mmbtu': (0.0, np.inf),
+    'tariff_elec': (0.0, np.inf),
+    'tariff_therm': (0.0, np.inf),
+    'capex': (0.0, np.inf),
+}
+
+
+def _norm_cdf(z):
+    """Standard normal CDF (Abramowitz & Stegun 7.1.26, |error| < 1.5e-7)."""
+    x = np.abs(z) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-x * x)
+    return 0.5 * (1.0 + np.sign(z) * erf)
+
+
+def _marginal(spec, z):
+    """Map standard-normal draws z through the marginal distribution `spec`."""
+    kind, *args = spec
+    if kind == 'normal':
+        mean, sd = args
+        return mean + sd * z
+    if kind == 'lognormal':
+        median, sigma = args
+        return median * np.exp(sigma * z)
+    u = _norm_cdf(z)
+    if kind == 'uniform':
+        low, high = args
+        return low + (high - low) * u
+    if kind == 'triangular':
+        low, mode, high = args
+        span = high - low
+        split = (mode - low) / span if span > 0 else 0.5
+        return np.where(
+            u < split,
+            low + np.sqrt(u * span * (mode - low)),
+            high - np.sqrt((1 - u) * span * (high - mode)),
+        )
+    raise ValueError(f"unknown distribution '{kind}'")
+
+
+def correlation_matrix(keys, correlations=None):
+    """Build a correlation matrix for `keys` from {(key_a, key_b): rho} pairs."""
+    corr = np.eye(len(keys))
+    pos = {k: i for i, k in enumerate(keys)}
+    for (a, b), rho in (correlations or {}).items():
+        if a not in pos or b not in pos:
+            raise KeyError(f"correlation given for unsampled key: {a if a not in pos else b}")
+        corr[pos[a], pos[b]] = corr[pos[b], pos[a]] = rho
+    return corr
+
+
+def sample(distributions, n, correlations=None, seed=None):
+    """Draw n correlated samples; returns {key: array}."""
+    keys = list(distributions)
+    rng = np.random.default_rng(seed)
+    z = rng.standard_normal((n, len(keys)))
+    if correlations:
+        try:
+            chol = np.linalg.cholesky(correlation_matrix(keys, correlations))
+        except np.linalg.LinAlgError:
+            raise ValueError("correlation matrix is not positive definite") from None
+        z = z @ chol.T
+    draws = {}
+    for j, key in enumerate(keys):
+        values = _marginal(distributions[key], z[:, j])
+        if key in CLIP:
+            values = np.clip(values, *CLIP[key])
+        draws[key] = values
+    return draws
+
+
+@dataclass
+class MonteCarloResult:
+    samples: Dict[str, np.ndarray]
+    irr: np.ndarray
+    irr_status: np.ndarray
+    npv: np.ndarray
+    npv_rate: float
+    total_eff: np.ndarray = field(repr=False)
+
+    def percentiles(self, pcts=(10, 50, 90)):
+        """{'irr': {10: .., 50: .., 90: ..}, 'npv': {...}}; draws without an IRR are excluded for IRR."""
+        return {
+            'irr': dict(zip(pcts, np.nanpercentile(self.irr, pcts).tolist())) if np.isfinite(self.irr).any()
+                   else {p: float('nan') for p in pcts},
+            'npv': dict(zip(pcts, np.percentile(self.npv, pcts).tolist())),
+        }
+
+    def histogram(self, metric='npv', bins=50):
+        """(counts, bin_edges) for 'irr' or 'npv' (NaN IRRs dropped)."""
+        values = getattr(self, metric)
+        return np.histogram(values[np.isfinite(values)], bins=bins)
+
+    @property
+    def no_irr_share(self):
+        """Fraction of draws whose cash flows have no solvable IRR."""
+        return float(np.mean(self.irr_status == batch.IRR_NO_ROOT)) if len(self.irr_status) else 0.0
+
+
+def run(params, distributions, n=10_000, correlations=None, npv_rate=0.10, seed=None, block=50_000):
+    """
+    Evaluate n Monte Carlo draws around base `params`. Keys in `distributions`
+    are sampled; every other key keeps its value from params.
+    """
+    draws = sample(distributions, n, correlations, seed)
+    irr = np.empty(n)
+    status = np.empty(n, dtype=np.int8)
+    npv = np.empty(n)
+    total_eff = np.empty(n)
+    base = {k: v for k, v in finance.hhv_params(params).items() if not isinstance(v, str)}
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        table = dict(base, **{k: v[start:stop] for k, v in draws.items()})
+        cf, total_eff[start:stop] = batch.annual_schedule_batch(table)
+        irr[start:stop], status[start:stop] = batch.irr_batch(cf)
+        npv[start:stop] = batch.npv_batch(npv_rate, cf)
+    return MonteCarloResult(draws, irr, status, npv, npv_rate, total_eff)
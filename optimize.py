@@ -0,0 +1,190 @@
+"""
+Engine selection and sizing optimizer.
+
+Searches catalog engines × unit counts × rated-power derates for one site and
+returns the candidates on the Pareto front of NPV (or IRR) against total
+efficiency, best first. Candidates are pruned in stages so only plausible ones
+reach the financial evaluation:
+  1. catalog index -- frequency/OEM/fuel filters and the per-unit power window
+     implied by `max_kw`;
+  2. sizing -- plants larger than `max_kw`, engines whose minimum load exceeds
+     the profile's peak, and (load following) unit counts beyond the first
+     that covers peak load, which add CapEx without adding output;
+  3. energy stage -- candidates below `min_total_eff` are dropped before cash
+     flows and IRR are computed.
+Survivors are evaluated with the batch engine (or dispatched hour by hour when
+a profile is given) and reduced to their non-dominated set.
+"""
+import numpy as np
+import pandas as pd
+
+import batch
+import dispatch
+import finance
+import performance
+from catalog import Catalog, catalog, engine_params
+
+# Rated-power derates tried for every engine (1.0 = nameplate)
+DEFAULT_DERATES = (1.0, 0.9, 0.8)
+
+OBJECTIVES = ('npv', 'irr')
+
+# Rows dispatched per block in profile mode (each row holds 8760 hourly values)
+DISPATCH_BLOCK = 256
+
+
+def candidates(engines, derates=DEFAULT_DERATES, max_units=4, max_kw=None, peak_kw=None,
+               min_load_frac=0.5, load_following=True):
+    """
+    Enumerate (engine index, derate, units) arrays over `engines`, minus the
+    sizing prunes. `peak_kw` is the site's peak electric load (profile mode).
+    """
+    rated = np.array([m.rated_power_kw for m in engines], dtype=float)
+    e, d, u = (a.ravel() for a in np.meshgrid(
+        np.arange(len(engines)), np.asarray(derates, dtype=float), np.arange(1, max_units + 1),
+        indexing='ij'))
+    unit_kw = rated[e] * d
+    keep = np.ones(e.size, dtype=bool)
+    if max_kw is not None:
+        keep &= u * unit_kw <= max_kw
+    if peak_kw is not None:
+        keep &= min_load_frac * unit_kw <= peak_kw
+        if load_following:
+            keep &= u <= np.maximum(np.ceil(peak_kw / unit_kw), 1)
+    return e[keep], d[keep], u[keep]
+
+
+def candidate_table(params, engines, e, d, u, capex_per_kw, per_unit=False):
+    """
+    Scenario table for the candidates. CapEx scales with installed nameplate
+    kW; a derated unit keeps its nameplate cost and runs at the part-load
+    efficiency (and heat recovery) of its derate on its engine's curves.
+    Thermal output comes from the catalog (or `therm_eff_pct` where the
+    catalog has none). With site `ambient_temp_c` / `altitude_m` in params
+    each engine gets its own ambient derate; otherwise params `ambient_derate`
+    applies to all. With `per_unit` the power columns describe one unit and
+    `units` holds the count (for dispatch); otherwise they describe the whole
+    plant.
+    """
+    eng = [engine_params(m) for m in engines]
+    rated = np.array([x['power_kw'] for x in eng], dtype=float)[e]
+    eff = np.array([x['elec_eff_pct'] for x in eng], dtype=float)[e]
+    therm_kw = np.array([x['therm_output_kw'] for x in eng], dtype=float)[e]
+    models = [engines[i] for i in e]
+    elec_rel = performance.part_load(models, d)
+    therm_rel = performance.heat_recovery(models, d)
+    scale = d if per_unit else d * u
+
+    table = {k: v for k, v in finance.hhv_params(params).items() if not isinstance(v, str)}
+    table.update(
+        power_kw=rated * scale,
+        elec_eff_pct=eff * elec_rel,
+        therm_output_kw=therm_kw * scale * (therm_rel / elec_rel),
+        therm_output_btu_per_hr=0.0,
+        capex=capex_per_kw * rated * u,
+    )
+    if 'ambient_temp_c' in params or 'altitude_m' in params:
+        table['ambient_derate'] = performance.ambient_derate(
+            list(engines), np.full(len(engines), params.get('ambient_temp_c', performance.ISO_TEMP_C)),
+            params.get('altitude_m', performance.ISO_ALTITUDE_M))[e]
+    if per_unit:
+        table['units'] = u.astype(float)
+        table['engine'] = models
+    return table
+
+
+def _energy(table, profile):
+    cols, n = batch.columns(table)
+    if profile is None:
+        return cols, batch.energy_batch(cols)
+    params = dict(cols, units=np.broadcast_to(table['units'], (n,)))
+    for key in ('dispatch_mode', 'min_load_frac', 'altitude_m'):
+        if key in table:
+            params[key] = table[key]
+    blocks = []
+    for start in range(0, n, DISPATCH_BLOCK):
+        sub = {k: (v[start:start + DISPATCH_BLOCK] if isinstance(v, np.ndarray) and v.ndim else v)
+               for k, v in params.items()}
+        sub['engine'] = table['engine'][start:start + DISPATCH_BLOCK]
+        blocks.append(dispatch.annual_energy(sub, profile))
+    return cols, {k: np.concatenate([np.atleast_1d(b[k]) for b in blocks]) for k in blocks[0]}
+
+
+def pareto_front(objective, total_eff):
+    """Indices of non-dominated rows (maximizing both), ordered best objective first."""
+    order = np.lexsort((-total_eff, -np.nan_to_num(objective, nan=-np.inf)))
+    front, best_eff = [], -np.inf
+    for i in order:
+        if np.isfinite(objective[i]) and total_eff[i] > best_eff:
+            front.append(i)
+            best_eff = total_eff[i]
+    return np.array(front, dtype=int)
+
+
+def optimize(params, profile=None, engines=None, objective='npv', max_kw=None, min_total_eff=None,
+             frequency_hz=None, oem=None, fuel_type=None, max_units=4, derates=DEFAULT_DERATES,
+             capex_per_kw=None, npv_rate=0.10, pareto=True):
+    """
+    Rank engine/size candidates for a site.
+
+    params:       site and economic inputs (finance params dict); engine inputs
+                  are replaced per candidate.
+    profile:      optional hourly profile (see dispatch); otherwise the flat
+                  capacity-factor model is used.
+    capex_per_kw: installed cost per nameplate kW (default params capex / power_kw).
+    pareto:       return only the non-dominated set (objective vs. total
+                  efficiency); False returns every feasible candidate.
+
+    Returns a DataFrame ranked best-first by `objective`.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    pool = catalog() if engines is None else Catalog(engines)
+    derates = tuple(derates)
+    engines = pool.query(oem=oem, frequency_hz=frequency_hz, fuel_type=fuel_type,
+                         max_kw=None if max_kw is None else max_kw / min(derates))
+    if capex_per_kw is None:
+        capex_per_kw = params['capex'] / params['power_kw']
+
+    peak_kw = None
+    load_following = params.get('dispatch_mode', 'load_following') != 'baseload'
+    if profile is not None:
+        peak_kw = float(np.max(profile['elec_load_kw']))
+    e, d, u = candidates(engines, derates, max_units, max_kw, peak_kw,
+                         params.get('min_load_frac', 0.5), load_following)
+
+    out = pd.DataFrame({
+        'oem': [engines[i].oem for i in e],
+        'model_name': [engines[i].model_name for i in e],
+        'frequency_hz': [engines[i].frequency_hz for i in e],
+        'units': u, 'derate': d,
+    })
+    if not len(out):
+        return out
+
+    table = candidate_table(params, engines, e, d, u, capex_per_kw, per_unit=profile is not None)
+    cols, energy = _energy(table, profile)
+    ok = np.ones(len(out), dtype=bool) if min_total_eff is None else energy['total_eff'] >= min_total_eff
+    if not ok.any():
+        return out.iloc[:0]
+    cols = {k: v[ok] for k, v in cols.items()}
+    energy = {k: v[ok] for k, v in energy.items()}
+
+    cf = batch.cashflows_from_energy(cols, energy)
+    irr, _ = batch.irr_batch(cf)
+    kpis = batch.kpis_batch(cf, rates=(npv_rate,), payback_rate=npv_rate)
+    out = out[ok].reset_index(drop=True)
+    out['plant_kw'] = np.asarray(table['power_kw'])[ok] * (u[ok] if profile is not None else 1)
+    out['capex'] = cols['capex']
+    out['total_eff'] = energy['total_eff']
+    out['npv'] = kpis['npv'][:, 0]
+    out['irr'] = irr
+    out['payback'] = kpis['payback']
+
+    if pareto:
+        out = out.iloc[pareto_front(out[objective].to_numpy(), out['total_eff'].to_numpy())]
+    else:
+        out = out.sort_values(objective, ascending=False, na_position='last', kind='stable')
+    out = out.reset_index(drop=True)
+    out.insert(0, 'rank', np.arange(1, len(out) + 1))
+    return out
@@ -0,0 +1,148 @@
+"""
+Vectorized engine performance lookups: part-load electrical efficiency, heat
+recovery and ambient temperature / altitude derating.
+
+Curves come from the catalog record (EngineModel.part_load_curve,
+heat_recovery_curve, ambient_derate) with generic curves standing in where a
+record has none. Each engine's curves are resampled once onto uniform grids
+(LOAD_STEP in load fraction; TEMP_STEP °C × ALT_STEP m for the derate) and
+cached, so a lookup is an index computation and a gather for any array of
+points -- including a different engine per row of a (sites × hours) array.
+Breakpoints on the grid are reproduced exactly; between them values are
+piecewise (bi)linear and clamped at the table edges, as np.interp does.
+
+`engine` arguments take an EngineModel, a catalog display name, None (generic
+curves) or a sequence of those with one entry per row of the points.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from catalog import EngineModel, catalog
+
+# Generic lean-burn recip part-load curve: load fraction → efficiency relative to rated
+GENERIC_PART_LOAD = ((0.5, 0.90), (0.75, 0.96), (1.0, 1.0))
+# Thermal efficiency held at its rated value (heat recovered ∝ fuel burned)
+GENERIC_HEAT_RECOVERY = ((1.0, 1.0),)
+# Generic gas-engine derate: full output to 30 °C and 500 m, then ~1 %/°C and ~1 %/100 m
+_T, _A = (30.0, 40.0, 50.0), (500.0, 1500.0, 3000.0)
+GENERIC_DERATE = (_T, _A, tuple(tuple(round((1 - 0.01 * (t - 30)) * (1 - 1e-4 * (a - 500)), 6) for t in _T)
+                                for a in _A))
+
+# ISO 3046 reference conditions (no derate with the generic table)
+ISO_TEMP_C = 15.0
+ISO_ALTITUDE_M = 0.0
+
+LOAD_STEP = 1 / 256
+TEMP_RANGE, TEMP_STEP = (-40.0, 60.0), 1.0
+ALT_RANGE, ALT_STEP = (0.0, 5000.0), 50.0
+
+_LOADS = np.linspace(0.0, 1.0, round(1 / LOAD_STEP) + 1)
+_TEMPS = np.linspace(*TEMP_RANGE, round((TEMP_RANGE[1] - TEMP_RANGE[0]) / TEMP_STEP) + 1)
+_ALTS = np.linspace(*ALT_RANGE, round((ALT_RANGE[1] - ALT_RANGE[0]) / ALT_STEP) + 1)
+
+
+def resolve(engine):
+    """EngineModel for an EngineModel, catalog display name or None (generic curves)."""
+    if engine is None or isinstance(engine, EngineModel):
+        return engine
+    return catalog().by_display_name(str(engine))
+
+
+def _curve_table(curve):
+    x, y = zip(*curve)
+    values = np.interp(_LOADS, x, y)
+    return values, np.append(np.diff(values), 0.0)
+
+
+def _derate_grid(table):
+    temps, alts, rows = table
+    by_temp = np.array([np.interp(_TEMPS, temps, row) for row in rows])      # (altitudes, _TEMPS)
+    return np.array([np.interp(_ALTS, alts, col) for col in by_temp.T]).T   # (_ALTS, _TEMPS)
+
+
+@lru_cache(maxsize=None)
+def engine_tables(model):
+    """
+    Resampled lookup tables for one engine (None: generic curves):
+    {'part_load': (values, steps), 'heat_recovery': (values, steps), 'derate': grid}.
+    """
+    model = resolve(model)
+    part = model.part_load_curve if model is not None and model.part_load_curve else GENERIC_PART_LOAD
+    heat = model.heat_recovery_curve if model is not None and model.heat_recovery_curve else GENERIC_HEAT_RECOVERY
+    derate = model.ambient_derate if model is not None and model.ambient_derate else GENERIC_DERATE
+    tables = {'part_load': _curve_table(part), 'heat_recovery': _curve_table(heat),
+              'derate': _derate_grid(derate)}
+    for arrays in tables.values():
+        for a in (arrays if isinstance(arrays, tuple) else (arrays,)):
+            a.setflags(write=False)
+    return tables
+
+
+@lru_cache(maxsize=64)
+def _stacked(models, kind):
+    """Tables of several engines stacked on a leading axis."""
+    tables = [engine_tables(m)[kind] for m in models]
+    if isinstance(tables[0], tuple):
+        return tuple(np.stack(parts) for parts in zip(*tables))
+    return np.stack(tables)
+
+
+def _rows(engine, kind):
+    """(stacked tables, row index or None) for a single engine or a per-row sequence."""
+    if engine is None or isinstance(engine, (EngineModel, str)):
+        return _stacked((resolve(engine),), kind), None
+    models = [resolve(e) for e in engine]
+    distinct = tuple(dict.fromkeys(models))
+    if len(distinct) == 1:
+        return _stacked(distinct, kind), None
+    pos = {m: i for i, m in enumerate(distinct)}
+    return _stacked(distinct, kind), np.array([pos[m] for m in models], dtype=np.intp)
+
+
+def _position(x, lo, step, n):
+    """Lower grid index and weight of each point on a uniform grid of n points."""
+    pos = np.clip((np.asarray(x, dtype=float) - lo) / step, 0, n - 1)
+    i = np.minimum(pos.astype(np.intp), n - 2)
+    return i, pos - i
+
+
+def _per_row(rows, ndim):
+    """Row index shaped to broadcast against points with `ndim` dimensions (rows first)."""
+    return rows.reshape(rows.shape + (1,) * (ndim - rows.ndim))
+
+
+def _curve(engine, load_frac, kind):
+    (values, steps), rows = _rows(engine, kind)
+    i, w = _position(load_frac, 0.0, LOAD_STEP, values.shape[1])
+    if rows is None:
+        return values[0][i] + w * steps[0][i]
+    r = _per_row(rows, i.ndim)
+    return values[r, i] + w * steps[r, i]
+
+
+def part_load(engine, load_frac):
+    """Electrical efficiency relative to rated at each load fraction (of site-rated output)."""
+    return _curve(engine, load_frac, 'part_load')
+
+
+def heat_recovery(engine, load_frac):
+    """Thermal efficiency (heat recovered ÷ fuel) relative to rated at each load fraction."""
+    return _curve(engine, load_frac, 'heat_recovery')
+
+
+def ambient_derate(engine, temp_c=ISO_TEMP_C, altitude_m=ISO_ALTITUDE_M):
+    """
+    Available output as a fraction of rated at ambient `temp_c` and site
+    `altitude_m` (scalars or arrays that broadcast, e.g. hourly temperatures
+    against a per-site altitude column). Returns a float for scalar inputs.
+    """
+    grid, rows = _rows(engine, 'derate')
+    temp_c, altitude_m = np.broadcast_arrays(np.asarray(temp_c, dtype=float), np.asarray(altitude_m, dtype=float))
+    it, wt = _position(temp_c, TEMP_RANGE[0], TEMP_STEP, grid.shape[2])
+    ia, wa = _position(altitude_m, ALT_RANGE[0], ALT_STEP, grid.shape[1])
+    r = 0 if rows is None else _per_row(rows, it.ndim)
+    lo = grid[r, ia, it] + wt * (grid[r, ia, it + 1] - grid[r, ia, it])
+    hi = grid[r, ia + 1, it] + wt * (grid[r, ia + 1, it + 1] - grid[r, ia + 1, it])
+    out = lo + wa * (hi - lo)
+    return float(out) if out.ndim == 0 else out
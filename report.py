@@ -1,10 +1,68 @@
 
+import copy
+import io
+import itertools
+import math
 import os
-from docx import Document
-from docx.shared import Inches
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-def export_word(kpis: dict, schedule_table, chart_path: str, outfile: str = "CHP_Report.docx"):
-    doc = Document()
+import instrument
+
+# python-docx is imported inside the render functions: importing this module
+# (e.g. for ReportJobs at app start) stays cheap until a report is requested.
+
+# Optional branded .docx to start every report from (styles, headers, logo)
+TEMPLATE_PATH = os.environ.get('CHP_REPORT_TEMPLATE')
+
+TABLE_HEADER = ('Year', 'Revenue ($)', 'Fuel ($)', 'O&M ($)', 'Debt ($)', 'Net CF ($)')
+
+
+_template_lock = threading.Lock()
+
+
+@lru_cache(maxsize=8)
+def _template(path=None):
+    """Template document parsed (or generated) once per process; never modified, only copied."""
+    from docx import Document
+
+    return Document(path) if path else Document()
+
+
+def _new_document(path=None):
+    """Fresh report document: a deep copy of the parsed template (no re-parse per report)."""
+    with _template_lock:
+        return copy.deepcopy(_template(path))
+
+
+def _table_rows(schedule_table):
+    for row in schedule_table:
+        yield (str(row['year']),
+               f"{(row['rev_elec']+row['rev_therm']):,.0f}",
+               f"{row['fuel_cost']:,.0f}",
+               f"{row['om_cost'] + row.get('overhaul_cost', 0.0):,.0f}",
+               f"{row['debt_service']:,.0f}",
+               f"{row['net_cf']:,.0f}")
+
+
+def _add_cashflow_table(doc, schedule_table):
+    """Cash-flow table created at full size in one call, cells filled straight into the XML."""
+    rows = [TABLE_HEADER, *_table_rows(schedule_table)]
+    table = doc.add_table(rows=len(rows), cols=len(TABLE_HEADER))
+    for tr, values in zip(table._tbl.tr_lst, rows):
+        for tc, text in zip(tr.tc_lst, values):
+            tc.p_lst[0].add_r().text = text
+    return table
+
+
+@instrument.timed('report.render_word')
+def render_word(kpis: dict, schedule_table, chart=None, template: str = TEMPLATE_PATH) -> bytes:
+    """Build the report and return the .docx file as bytes. `chart` is PNG bytes (or a file path)."""
+    from docx.shared import Inches
+
+    doc = _new_document(template)
     doc.add_heading('CHP Feasibility & Financial Summary', level=1)
 
     doc.add_paragraph(f"Engine: {kpis.get('engine_display','')}")
@@ -15,30 +73,17 @@ def export_word(kpis: dict, schedule_table, chart_path: str, outfile: str = "CHP
 
     doc.add_heading('Key Financials', level=2)
     p = doc.add_paragraph()
-    p.add_run(f"IRR: {kpis['irr']:.2%}\n")
+    p.add_run(f"IRR: {kpis['irr']:.2%}\n" if math.isfinite(kpis['irr']) else "IRR: n/a\n")
     p.add_run(f"NPV @ {kpis['npv_rate']:.0%}: ${kpis['npv']:,.0f}\n")
     p.add_run(f"Simple Payback: {kpis['payback']} years\n")
     p.add_run(f"Discounted Payback: {kpis['disc_payback']} years\n")
 
     doc.add_heading('Annual Cash Flow', level=2)
-    table = doc.add_table(rows=1, cols=6)
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'Year'; hdr_cells[1].text = 'Revenue ($)'
-    hdr_cells[2].text = 'Fuel ($)'; hdr_cells[3].text = 'O&M ($)'
-    hdr_cells[4].text = 'Debt ($)'; hdr_cells[5].text = 'Net CF ($)'
+    _add_cashflow_table(doc, schedule_table)
 
-    for row in schedule_table:
-        r = table.add_row().cells
-        r[0].text = str(row['year'])
-        r[1].text = f"{(row['rev_elec']+row['rev_therm']):,.0f}"
-        r[2].text = f"{row['fuel_cost']:,.0f}"
-        r[3].text = f"{row['om_cost']:,.0f}"
-        r[4].text = f"{row['debt_service']:,.0f}"
-        r[5].text = f"{row['net_cf']:,.0f}"
-
-    if chart_path and os.path.exists(chart_path):
+    if isinstance(chart, (bytes, bytearray)) or (chart and os.path.exists(chart)):
         doc.add_heading('Annual Cash Flow Chart', level=2)
-        doc.add_picture(chart_path, width=Inches(6.0))
+        doc.add_picture(io.BytesIO(chart) if isinstance(chart, (bytes, bytearray)) else chart, width=Inches(6.0))
 
 
     # Assumptions block
@@ -49,6 +94,10 @@ def export_word(kpis: dict, schedule_table, chart_path: str, outfile: str = "CHP
         f"interest {kpis.get('interest_display','7%')} (real), term {kpis.get('term_display','10 years')}, "
         f"tax rate {kpis.get('tax_rate_display','25%')}, project life {kpis.get('life_display','20 years')}."
     )
+    doc.add_paragraph(
+        f"Tax: depreciation {kpis.get('depreciation_display','5-year MACRS')} on CapEx less half the ITC; "
+        f"debt interest deductible; tax losses carried forward."
+    )
     # Thermal valuation assumptions
     doc.add_paragraph(
         f"Thermal valuation: ${kpis.get('thermal_value_display','$8.00')}/MMBtu. "
@@ -56,10 +105,100 @@ def export_word(kpis: dict, schedule_table, chart_path: str, outfile: str = "CHP
     )
     # NEW: show BTU/hr rate when used
     if kpis.get('thermal_btu_per_hr_display'):
-        doc.add_paragraph(f"Thermal output
+        doc.add_paragraph(f"Thermal output: {kpis['thermal_btu_per_hr_display']} BTU/hr (converted to annual MMBtu by operating hours).")
+
 
-    
     doc.add_paragraph("Methodology aligns with EPA CHP efficiency framework (total system efficiency).")
-    doc.save(outfile)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+def export_word(kpis: dict, schedule_table, chart, outfile: str = "CHP_Report.docx"):
+    with open(outfile, 'wb') as f:
+        f.write(render_word(kpis, schedule_table, chart))
     return outfile
 
+def export_zip(reports, progress=None) -> bytes:
+    """
+    Zip of many reports. `reports` yields (filename, kpis, schedule_table,
+    chart) tuples; `progress(done, total)` is called after each one.
+    """
+    reports = list(reports)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for done, (name, kpis, schedule_table, chart) in enumerate(reports, 1):
+            zf.writestr(name, render_word(kpis, schedule_table, chart))
+            if progress:
+                progress(done, len(reports))
+    return buf.getvalue()
+
+
+# ---------------------------
+# Background report jobs
+# ---------------------------
+class ReportJobs:
+    """
+    Runs report generation on a small thread pool so the UI never waits on
+    python-docx. submit()/submit_zip() return a job id; status() reports
+    state ('queued', 'running', 'done', 'failed') and progress in [0, 1],
+    result() returns the .docx / .zip bytes once done. Only the newest `keep`
+    finished jobs are kept; older ids report state 'expired'.
+    """
+
+    def __init__(self, workers: int = 2, keep: int = 64):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report')
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._keep = keep
+        self._lock = threading.Lock()
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _run(self, job_id, fn, *args):
+        self._update(job_id, state='running')
+        try:
+            data = fn(*args)
+        except Exception as exc:
+            self._update(job_id, state='failed', error=f"{type(exc).__name__}: {exc}")
+        else:
+            self._update(job_id, state='done', progress=1.0, result=data)
+
+    def _submit(self, fn, *args, progress=False):
+        with self._lock:
+            job_id = f"r{next(self._ids)}"
+            self._jobs[job_id] = {'state': 'queued', 'progress': 0.0, 'error': None, 'result': None}
+            # Forget the oldest finished jobs beyond `keep`
+            finished = [j for j, v in self._jobs.items() if v['state'] in ('done', 'failed')]
+            for j in finished[:max(0, len(finished) - self._keep)]:
+                del self._jobs[j]
+        if progress:
+            args = (*args, lambda done, total: self._update(job_id, progress=done / total))
+        self._pool.submit(self._run, job_id, fn, *args)
+        return job_id
+
+    def submit(self, kpis: dict, schedule_table, chart=None) -> str:
+        """Queue one report; returns its job id."""
+        return self._submit(render_word, kpis, list(schedule_table), chart)
+
+    def submit_zip(self, reports) -> str:
+        """Queue a batch export of (filename, kpis, schedule_table, chart) tuples into one zip."""
+        return self._submit(export_zip, list(reports), progress=True)
+
+    def status(self, job_id: str) -> dict:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return {'state': 'expired', 'progress': 0.0, 'error': None}
+            return {'state': job['state'], 'progress': job['progress'], 'error': job['error']}
+
+    def result(self, job_id: str) -> bytes:
+        with self._lock:
+            job = self._jobs.get(job_id, {'state': 'expired'})
+        if job['state'] != 'done':
+            raise RuntimeError(f"report job {job_id} is {job['state']}")
+        return job['result']
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
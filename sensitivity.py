@@ -0,0 +1,177 @@
+"""
+One-at-a-time sensitivity (tornado) analysis.
+
+Each input is moved to a low and a high value while everything else stays at
+the base case. Perturbed scenarios only recompute the model stages that depend
+on the moved input -- energy balance, value streams, financing -- and reuse
+the base case's results for the rest; every perturbation for every base
+scenario (e.g. every catalog engine) runs as one batch.
+"""
+import io
+
+import numpy as np
+
+import batch
+import finance
+
+# Inputs feeding each stage. A perturbation recomputes its own stage and the
+# stages downstream of it; inputs in none of these sets (O&M, tax rate, years)
+# only touch the final cash-flow stage, which always runs.
+ENERGY_KEYS = frozenset({'power_kw', 'cap_factor', 'elec_eff_pct', 'therm_output_btu_per_hr',
+                         'therm_output_kw', 'therm_eff_pct', 'ambient_derate'})
+VALUE_KEYS = frozenset({'tariff_elec', 'tariff_therm', 'gas_price_per_mmbtu'})
+FINANCING_KEYS = frozenset({'capex', 'itc_pct', 'debt', 'interest', 'term'})
+
+DEFAULT_KEYS = ('tariff_elec', 'tariff_therm', 'gas_price_per_mmbtu', 'cap_factor', 'elec_eff_pct',
+                'therm_eff_pct', 'capex', 'itc_pct', 'om_fixed', 'om_var_per_kwh', 'debt',
+                'interest', 'tax_rate')
+
+# Upper limits for fractional/percentage inputs when applying ±pct
+UPPER = {'cap_factor': 1.0, 'debt': 1.0, 'itc_pct': 1.0, 'tax_rate': 1.0,
+         'elec_eff_pct': 100.0, 'therm_eff_pct': 100.0}
+
+
+def perturbations(params, keys=DEFAULT_KEYS, pct=0.10, ranges=None):
+    """
+    [(key, low, high), ...] moving each key ±pct of its base value (or to the
+    explicit (low, high) in `ranges`). Base values may be per-scenario arrays.
+    Keys with no spread (e.g. a zero base value) are skipped.
+    """
+    ranges = ranges or {}
+    out = []
+    for key in dict.fromkeys([*keys, *ranges]):
+        if key in ranges:
+            low, high = ranges[key]
+        elif key in params:
+            base = np.asarray(params[key], dtype=float)
+            low = base * (1 - pct)
+            high = np.minimum(base * (1 + pct), UPPER.get(key, np.inf))
+        else:
+            continue
+        if np.all(np.asarray(low) == np.asarray(high)):
+            continue
+        out.append((key, low, high))
+    return out
+
+
+def _take(arrays, idx):
+    return {k: v[idx] for k, v in arrays.items()}
+
+
+def _patch(target, mask, source_cols, stage):
+    """Recompute `stage` for the masked rows only and write the results into target."""
+    if mask.any():
+        for k, v in stage(_take(source_cols, mask)).items():
+            target[k][mask] = v
+
+
+def sensitivity_batch(table, perturbs, npv_rate=0.10):
+    """
+    Evaluate base scenarios and every (key, low, high) perturbation of them.
+
+    Returns a dict with base_irr, base_npv (scenarios,) and irr, npv arrays
+    shaped (scenarios × perturbations × 2) where the last axis is (low, high).
+    """
+    cols, n = batch.columns(table)
+    phys = batch.physical_energy_batch(cols)
+    energy = batch.value_streams_batch(cols, phys)
+    capex_net, ann = batch.debt_service_batch(cols)
+    base_cf = batch.cashflows_from_energy(cols, energy, (capex_net, ann))
+
+    n_p = len(perturbs)
+    base_idx = np.repeat(np.arange(n), 2 * n_p)
+    pert_idx = np.tile(np.repeat(np.arange(n_p), 2), n)
+    side = np.tile([0, 1], n * n_p)
+
+    pcols = _take(cols, base_idx)
+    for p, (key, low, high) in enumerate(perturbs):
+        for s, value in enumerate((low, high)):
+            pcols[key][(pert_idx == p) & (side == s)] = np.broadcast_to(np.asarray(value, dtype=float), (n,))
+
+    row_keys = np.array([key for key, _, _ in perturbs] or [''], dtype=object)[pert_idx]
+    in_energy = np.isin(row_keys, list(ENERGY_KEYS))
+    in_value = in_energy | np.isin(row_keys, list(VALUE_KEYS))
+    in_financing = np.isin(row_keys, list(FINANCING_KEYS))
+
+    # Start from the base stages and recompute only where a perturbation reaches
+    pphys = _take(phys, base_idx)
+    _patch(pphys, in_energy, pcols, batch.physical_energy_batch)
+    penergy = _take(energy, base_idx)
+    if in_value.any():
+        sub = batch.value_streams_batch(_take(pcols, in_value), _take(pphys, in_value))
+        for k, v in sub.items():
+            penergy[k][in_value] = v
+    pfin = {'capex_net': capex_net[base_idx], 'ann': ann[base_idx]}
+    _patch(pfin, in_financing, pcols,
+           lambda c: dict(zip(('capex_net', 'ann'), batch.debt_service_batch(c))))
+
+    cf = batch.cashflows_from_energy(pcols, penergy, (pfin['capex_net'], pfin['ann']))
+    irr, _ = batch.irr_batch(cf)
+    npv = batch.npv_batch(npv_rate, cf)
+    base_irr, _ = batch.irr_batch(base_cf)
+    return {
+        'base_irr': base_irr, 'base_npv': batch.npv_batch(npv_rate, base_cf),
+        'irr': irr.reshape(n, n_p, 2), 'npv': npv.reshape(n, n_p, 2),
+    }
+
+
+def _rows(perturbs, res, i):
+    rows = []
+    for p, (key, low, high) in enumerate(perturbs):
+        rows.append({
+            'param': key,
+            'low': float(np.broadcast_to(low, (res['irr'].shape[0],))[i]),
+            'high': float(np.broadcast_to(high, (res['irr'].shape[0],))[i]),
+            'irr_low': float(res['irr'][i, p, 0]), 'irr_high': float(res['irr'][i, p, 1]),
+            'npv_low': float(res['npv'][i, p, 0]), 'npv_high': float(res['npv'][i, p, 1]),
+        })
+    rows.sort(key=lambda r: abs(r['npv_high'] - r['npv_low']), reverse=True)
+    return rows
+
+
+def tornado(params, keys=DEFAULT_KEYS, pct=0.10, ranges=None, npv_rate=0.10):
+    """
+    Tornado table for one scenario: (base, rows) where base has irr/npv and
+    rows are sorted by NPV swing, largest first. Efficiencies are perturbed on
+    the HHV basis.
+    """
+    params = finance.hhv_params(params)
+    perturbs = perturbations(params, keys, pct, ranges)
+    res = sensitivity_batch(params, perturbs, npv_rate)
+    base = {'irr': float(res['base_irr'][0]), 'npv': float(res['base_npv'][0])}
+    return base, _rows(perturbs, res, 0)
+
+
+def tornado_catalog(params, engines, keys=DEFAULT_KEYS, pct=0.10, npv_rate=0.10):
+    """Tornado tables for every engine in one batch: [(engine, base, rows), ...]."""
+    table = batch.engine_table(params, engines)
+    perturbs = perturbations(table, keys, pct)
+    res = sensitivity_batch(table, perturbs, npv_rate)
+    return [
+        (m, {'irr': float(res['base_irr'][i]), 'npv': float(res['base_npv'][i])}, _rows(perturbs, res, i))
+        for i, m in enumerate(engines)
+    ]
+
+
+def render_tornado(base, rows, metric='npv', title=None):
+    """Horizontal tornado chart of metric deltas vs. base, as PNG bytes."""
+    from matplotlib.figure import Figure
+
+    scale, unit = (100.0, "pp") if metric == 'irr' else (1.0, "$")
+    # Largest swing on top
+    rows = sorted(rows, key=lambda r: abs(r[f'{metric}_high'] - r[f'{metric}_low']))
+    labels = [r['param'] for r in rows]
+    lo = [(r[f'{metric}_low'] - base[metric]) * scale for r in rows]
+    hi = [(r[f'{metric}_high'] - base[metric]) * scale for r in rows]
+
+    fig = Figure(figsize=(7, 0.35 * len(rows) + 1.2))
+    ax = fig.subplots()
+    ax.barh(labels, lo, color="#C0392B", label="low")
+    ax.barh(labels, hi, color="#2E86C1", label="high")
+    ax.axvline(0, color="black", linewidth=0.8)
+    ax.set_xlabel(f"Δ {metric.upper()} vs. base ({unit})")
+    ax.set_title(title or f"{metric.upper()} sensitivity")
+    ax.legend(loc="lower right")
+    buf = io.BytesIO()
+    fig.savefig(buf, dpi=140, bbox_inches="tight")
+    return buf.getvalue()
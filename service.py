@@ -0,0 +1,293 @@
+"""
+Headless HTTP/JSON scoring service around the finance model.
+
+    python service.py --port 8080
+
+POST /score with a JSON params dict (one scenario), a JSON list of params
+dicts, or {"scenarios": [...]} (batch). Missing keys take
+finance.DEFAULT_PARAMS; power_kw and elec_eff_pct are required, and
+hh_basis ('HHV' or 'LHV') states the basis of the efficiencies. Query
+options: npv_rate (default 0.10) and schedule=1 to add the per-year schedule
+(columnar: {field: [value per year]}).
+GET /health and GET /stats report liveness and cache/batching counters.
+
+Each scenario is looked up in an LRU response cache first; misses from all
+concurrent requests are collected by a micro-batcher for up to --window-ms
+and evaluated together on the vectorized batch path by a small worker pool.
+Only the standard library and NumPy are needed, so it runs locally as is.
+"""
+import argparse
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import batch
+from cache import LRUCache, params_key
+from finance import DEFAULT_PARAMS, evaluate
+from tax import MACRS_CLASSES
+
+# Whole-number inputs (JSON 20.0 is accepted and coerced to int) and their minimum
+INTEGER_KEYS = {'years': 1, 'term': 1, 'overhaul_interval': 0, 'macrs_class': 0}
+
+# Inputs that are fractions and must lie in [0, 1]
+FRACTION_KEYS = ('cap_factor', 'itc_pct', 'debt', 'tax_rate', 'bonus_pct', 'ambient_derate',
+                 'degradation', 'eff_degradation')
+
+
+class RequestError(ValueError):
+    """Invalid request payload (reported as HTTP 400)."""
+
+
+def _json_value(value):
+    """Plain JSON value; NaN/inf become null."""
+    if isinstance(value, dict):
+        return {k: _json_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_value(v) for v in value]
+    if isinstance(value, (float, np.floating)):
+        return float(value) if math.isfinite(value) else None
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def _scenario(raw, where):
+    if not isinstance(raw, dict):
+        raise RequestError(f"{where}: expected a JSON object of params")
+    params = dict(DEFAULT_PARAMS, **raw)
+    for key in batch.REQUIRED_KEYS + tuple(batch.OPTIONAL_DEFAULTS):
+        if key not in params:
+            raise RequestError(f"{where}: missing '{key}'")
+        value = params[key]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise RequestError(f"{where}: '{key}' must be a finite number")
+    for key, low in INTEGER_KEYS.items():
+        if params[key] != int(params[key]) or params[key] < low:
+            raise RequestError(f"{where}: '{key}' must be an integer >= {low}")
+        params[key] = int(params[key])
+    if params['macrs_class'] not in MACRS_CLASSES:
+        raise RequestError(f"{where}: 'macrs_class' must be one of {MACRS_CLASSES}")
+    for key in FRACTION_KEYS:
+        if not 0.0 <= params[key] <= 1.0:
+            raise RequestError(f"{where}: '{key}' must be between 0 and 1")
+    basis = params['hh_basis']
+    if not isinstance(basis, str) or basis.upper() not in ('HHV', 'LHV'):
+        raise RequestError(f"{where}: 'hh_basis' must be 'HHV' or 'LHV'")
+    params['hh_basis'] = basis.upper()
+    return params
+
+
+def score_batch(scenarios, npv_rate=0.10):
+    """KPIs and cash flows for a list of params dicts, evaluated in one vectorized pass."""
+    table = {k: np.array([p[k] for p in scenarios], dtype=float)
+             for k in batch.REQUIRED_KEYS + tuple(batch.OPTIONAL_DEFAULTS)}
+    table['hh_basis'] = [p['hh_basis'] for p in scenarios]   # LHV efficiencies are converted by batch.columns
+    cf, total_eff = batch.annual_schedule_batch(table)
+    irr, status = batch.irr_batch(cf)
+    kpis = batch.kpis_batch(cf, rates=(npv_rate,), payback_rate=npv_rate)
+    years = table['years'].astype(int)
+    return [
+        {
+            'kpis': {
+                'irr': irr[i], 'irr_status': int(status[i]), 'npv': kpis['npv'][i, 0], 'npv_rate': npv_rate,
+                'payback': kpis['payback'][i], 'disc_payback': kpis['disc_payback'][i],
+                'total_eff': total_eff[i],
+            },
+            'cashflows': cf[i, :years[i] + 1].tolist(),
+        }
+        for i in range(len(scenarios))
+    ]
+
+
+class MicroBatcher:
+    """
+    Collects single scenarios submitted from many threads and evaluates them
+    in batches: a worker takes the first waiting item, gathers more for up to
+    `window` seconds or `max_batch` items, and scores them together.
+    """
+
+    def __init__(self, workers=2, window=0.002, max_batch=1024):
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._worker, name=f'batcher-{i}', daemon=True)
+                         for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, params, npv_rate):
+        fut = Future()
+        self._queue.put((params, npv_rate, fut))
+        return fut
+
+    def _gather(self):
+        items = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(items) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                items.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _worker(self):
+        while True:
+            items = self._gather()
+            with self._lock:
+                self.batches += 1
+                self.items += len(items)
+            by_rate = {}
+            for item in items:
+                by_rate.setdefault(item[1], []).append(item)
+            for rate, group in by_rate.items():
+                try:
+                    results = score_batch([p for p, _, _ in group], rate)
+                except Exception as exc:
+                    if len(group) == 1:
+                        group[0][2].set_exception(exc)
+                        continue
+                    # Score the items one at a time so only the failing scenario's request gets the error
+                    for p, _, fut in group:
+                        try:
+                            fut.set_result(score_batch([p], rate)[0])
+                        except Exception as item_exc:
+                            fut.set_exception(item_exc)
+                else:
+                    for (_, _, fut), res in zip(group, results):
+                        fut.set_result(res)
+
+    def stats(self):
+        with self._lock:
+            return {'batches': self.batches, 'items': self.items,
+                    'mean_batch': self.items / self.batches if self.batches else 0.0}
+
+
+class ScoringService:
+    """Cache + micro-batcher; `score` is the programmatic entry point the HTTP handler uses."""
+
+    def __init__(self, workers=2, window=0.002, max_batch=1024, cache_size=4096):
+        self.cache = LRUCache(maxsize=cache_size)
+        self.batcher = MicroBatcher(workers, window, max_batch)
+
+    def score(self, payload, npv_rate=0.10, schedule=False):
+        """Score one params dict or a list of them; returns one result dict or a list."""
+        single = isinstance(payload, dict) and 'scenarios' not in payload
+        raw = [payload] if single else payload.get('scenarios') if isinstance(payload, dict) else payload
+        if not isinstance(raw, list) or not raw:
+            raise RequestError("expected a params object, a non-empty list, or {\"scenarios\": [...]}")
+        scenarios = [_scenario(p, f"scenario {i}") for i, p in enumerate(raw)]
+
+        keys = [params_key(p, npv_rate, schedule) for p in scenarios]
+        results = [self.cache.get(k) for k in keys]
+        # Identical scenarios within one request share a single evaluation
+        pending = {}
+        for i, res in enumerate(results):
+            if res is None and keys[i] not in pending:
+                pending[keys[i]] = (i, self.batcher.submit(scenarios[i], npv_rate))
+        fresh = {}
+        for key, (i, fut) in pending.items():
+            res = fut.result()
+            if schedule:
+                res = dict(res, schedule=evaluate(scenarios[i], npv_rate)['schedule'].to_lists())
+            fresh[key] = _json_value(res)
+            self.cache.put(key, fresh[key])
+        results = [res if res is not None else fresh[k] for k, res in zip(keys, results)]
+        return results[0] if single else results
+
+    def stats(self):
+        return {'cache': self.cache.stats(), 'batcher': self.batcher.stats()}
+
+
+def make_handler(service, verbose=False):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+        disable_nagle_algorithm = True  # headers and body go out as separate small writes
+
+        def _send(self, status, body):
+            data = json.dumps(body, separators=(',', ':')).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == '/health':
+                self._send(200, {'status': 'ok'})
+            elif path == '/stats':
+                self._send(200, service.stats())
+            else:
+                self._send(404, {'error': f"unknown path {path}"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != '/score':
+                self._send(404, {'error': f"unknown path {url.path}"})
+                return
+            query = parse_qs(url.query)
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'null')
+                npv_rate = float(query.get('npv_rate', ['0.10'])[0])
+                schedule = query.get('schedule', ['0'])[0].lower() in ('1', 'true', 'yes')
+                self._send(200, service.score(payload, npv_rate, schedule))
+            except (RequestError, ValueError) as exc:
+                self._send(400, {'error': str(exc)})
+            except Exception as exc:
+                self._send(500, {'error': f"{type(exc).__name__}: {exc}"})
+
+        def log_message(self, fmt, *args):
+            if verbose:
+                super().log_message(fmt, *args)
+
+    return Handler
+
+
+def serve(host='127.0.0.1', port=8080, workers=2, window_ms=2.0, max_batch=1024, cache_size=4096,
+          verbose=False):
+    """Build the HTTP server (call serve_forever() on the result)."""
+    service = ScoringService(workers, window_ms / 1000.0, max_batch, cache_size)
+    server = ThreadingHTTPServer((host, port), make_handler(service, verbose))
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="HTTP/JSON scoring API for the CHP finance model.")
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8080)
+    ap.add_argument('--workers', type=int, default=2, help="batch evaluation threads")
+    ap.add_argument('--window-ms', type=float, default=2.0, help="micro-batch collection window")
+    ap.add_argument('--max-batch', type=int, default=1024, help="scenarios per batch evaluation")
+    ap.add_argument('--cache-size', type=int, default=4096, help="cached responses (scenarios)")
+    ap.add_argument('--verbose', action='store_true', help="log every request")
+    args = ap.parse_args(argv)
+
+    server = serve(args.host, args.port, args.workers, args.window_ms, args.max_batch, args.cache_size,
+                   args.verbose)
+    print(f"Scoring API on http://{args.host}:{server.server_address[1]}/score", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""
+Persistent scenario store (SQLite).
+
+    from store import ScenarioStore
+    db = ScenarioStore()                                  # CHP_STORE or ~/.chp_model/scenarios.sqlite
+    result = db.get_or_evaluate(params, engine=name)      # served from disk when seen before
+    db.save(result['key'], name='Plant A, 2 x J620')      # keep it in the saved list
+    rows = db.query(engine=name, min_irr=0.12, order_by='npv')   # {column: array}
+    cmp = db.compare(rows['key'][:5])                     # KPIs + cash-flow matrix
+
+Each scenario is keyed by a content hash of its full params dict (missing
+keys filled with the values the model assumes for them, KEY_DEFAULTS;
+efficiencies converted to HHV; numbers normalized), the NPV rate, any extra inputs (e.g. an hourly profile
+hash) and MODEL_VERSION, so the same inputs always map to the same row and
+model changes never serve stale results. Rows hold the params as JSON, KPIs as indexed columns, and the
+cash flows and annual schedule as packed float64 blobs. Bulk reads come
+back column-wise as NumPy arrays. One connection is shared behind a lock,
+so an instance can be used from several threads (Streamlit sessions,
+report workers).
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+import numpy as np
+
+import batch
+import finance
+from cache import params_key
+
+DEFAULT_PATH = os.environ.get('CHP_STORE') or os.path.join(os.path.expanduser('~'), '.chp_model', 'scenarios.sqlite')
+
+# Part of every key: bump when the model's results change for the same inputs
+MODEL_VERSION = 3
+
+# What finance.evaluate and the batch engine use for omitted inputs, so an
+# omitted input and its explicit default share a key (and nothing else does)
+KEY_DEFAULTS = dict(batch.OPTIONAL_DEFAULTS, hh_basis='HHV')
+
+KPI_COLUMNS = ('irr', 'npv', 'npv_rate', 'payback', 'disc_payback', 'total_eff')
+LIST_COLUMNS = ('key', 'name', 'engine', 'created', *KPI_COLUMNS)
+ORDER_COLUMNS = frozenset({'created', 'name', 'engine', *KPI_COLUMNS})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    key TEXT PRIMARY KEY,
+    name TEXT,
+    engine TEXT,
+    created REAL NOT NULL,
+    params TEXT NOT NULL,
+    irr REAL, npv REAL, npv_rate REAL, payback REAL, disc_payback REAL, total_eff REAL,
+    cashflows BLOB NOT NULL,
+    schedule BLOB,
+    schedule_fields TEXT
+);
+CREATE INDEX IF NOT EXISTS scenarios_engine ON scenarios (engine);
+CREATE INDEX IF NOT EXISTS scenarios_irr ON scenarios (irr);
+CREATE INDEX IF NOT EXISTS scenarios_npv ON scenarios (npv);
+CREATE INDEX IF NOT EXISTS scenarios_name ON scenarios (name) WHERE name IS NOT NULL;
+"""
+
+
+def _normalized(params):
+    """
+    Full params dict on an HHV basis with every number as float, so 20 and
+    20.0 (or an LHV efficiency and its HHV equivalent) hash alike.
+    """
+    full = finance.hhv_params(dict(KEY_DEFAULTS, **params))
+    for k, v in full.items():
+        if not isinstance(v, (str, bool)):
+            full[k] = float(v)
+    return full
+
+
+def _key(normalized, npv_rate, extra=()):
+    return params_key(normalized, float(npv_rate), MODEL_VERSION, *extra)
+
+
+def scenario_key(params, npv_rate=0.10, *extra):
+    """Content hash identifying a scenario's inputs (see module docstring)."""
+    return _key(_normalized(params), npv_rate, extra)
+
+
+def _number(value):
+    """SQLite REAL (NULL for None/NaN)."""
+    if value is None:
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def _pack_schedule(schedule):
+    fields = list(schedule.columns)
+    data = np.vstack([np.frombuffer(schedule.columns[f], dtype=schedule.columns[f].typecode).astype(float)
+                      for f in fields])
+    return data.tobytes(), ','.join(fields)
+
+
+def _unpack_schedule(blob, fields):
+    fields = fields.split(',')
+    data = np.frombuffer(blob).reshape(len(fields), -1)
+    return finance.Schedule({f: array('i', data[i].astype(int).tolist()) if f == 'year' else array('d', data[i].tobytes())
+                             for i, f in enumerate(fields)})
+
+
+def _payback(value):
+    """Stored payback back to the int the scalar model returns (fractional batch values stay float)."""
+    if value is None:
+        return None
+    return int(value) if float(value).is_integer() else value
+
+
+class ScenarioStore:
+    """SQLite-backed scenario/result store; see the module docstring."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM scenarios').fetchone()[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM scenarios WHERE key = ?', (key,)).fetchone() is not None
+
+    # ---------------------------
+    # Single scenarios
+    # ---------------------------
+    def put(self, key, params, result, engine=None, name=None):
+        """Store an evaluate()-style result dict (schedule optional) under `key`."""
+        self.put_many([(key, params, result, engine, name)])
+
+    def put_many(self, rows):
+        """Store many (key, params, result, engine, name) tuples in one transaction."""
+        now = time.time()
+        records = []
+        for key, params, result, engine, name in rows:
+            schedule = result.get('schedule')
+            packed, fields = _pack_schedule(schedule) if schedule is not None else (None, None)
+            records.append((
+                key, name, engine, now, json.dumps(_normalized(params), sort_keys=True),
+                *(_number(result.get(c)) for c in KPI_COLUMNS),
+                np.asarray(result['cashflows'], dtype=float).tobytes(), packed, fields,
+            ))
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN')
+            # A re-evaluated scenario keeps its name unless a new one is given
+            self._conn.executemany(
+                """INSERT INTO scenarios VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (key) DO UPDATE SET
+                     name = COALESCE(excluded.name, name), engine = COALESCE(excluded.engine, engine),
+                     irr = excluded.irr, npv = excluded.npv, npv_rate = excluded.npv_rate,
+                     payback = excluded.payback, disc_payback = excluded.disc_payback,
+                     total_eff = excluded.total_eff, cashflows = excluded.cashflows,
+                     schedule = COALESCE(excluded.schedule, schedule),
+                     schedule_fields = COALESCE(excluded.schedule_fields, schedule_fields)""",
+                records,
+            )
+
+    def get(self, key):
+        """evaluate()-style result dict for `key` (schedule None if it was stored without one), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(KPI_COLUMNS)}, cashflows, schedule, schedule_fields FROM scenarios WHERE key = ?",
+                (key,)).fetchone()
+        if row is None:
+            return None
+        kpis = dict(zip(KPI_COLUMNS, row))
+        return {
+            'key': key,
+            'schedule': _unpack_schedule(row[-2], row[-1]) if row[-2] is not None else None,
+            'cashflows': np.frombuffer(row[-3]).tolist(),
+            'total_eff': kpis['total_eff'],
+            'irr': kpis['irr'] if kpis['irr'] is not None else math.nan,
+            'npv_rate': kpis['npv_rate'],
+            'npv': kpis['npv'],
+            'payback': _payback(kpis['payback']),
+            'disc_payback': _payback(kpis['disc_payback']),
+        }
+
+    def params(self, key):
+        """Stored params dict for `key` (None if absent)."""
+        with self._lock:
+            row = self._conn.execute('SELECT params FROM scenarios WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_or_evaluate(self, params, npv_rate=0.10, engine=None, name=None, energy=None, extra=()):
+        """
+        Result for params from disk, or finance.evaluate it and store it.
+        Pass `energy` (e.g. hourly dispatch, or a zero-argument function
+        returning it, called only on a miss) together with an `extra` that
+        identifies it, such as the profile hash. The result carries its 'key'.
+        """
+        key = scenario_key(params, npv_rate, *extra)
+        result = self.get(key)
+        if result is not None and result['schedule'] is not None:
+            with self._lock:
+                self.hits += 1
+            if name is not None:
+                self.save(key, name)
+            return result
+        with self._lock:
+            self.misses += 1
+        if callable(energy):
+            energy = energy()
+        result = dict(finance.evaluate(params, npv_rate, energy=energy), key=key)
+        self.put(key, params, result, engine, name)
+        return result
+
+    def save(self, key, name):
+        """Name a stored scenario so it shows up in the saved list."""
+        with self._lock:
+            self._conn.execute('UPDATE scenarios SET name = ? WHERE key = ?', (name, key))
+
+    def delete(self, keys):
+        """Remove scenarios by key (one key or a list)."""
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN')
+            self._conn.executemany('DELETE FROM scenarios WHERE key = ?', [(k,) for k in keys])
+
+    # ---------------------------
+    # Bulk
+    # ---------------------------
+    def evaluate_batch(self, table, npv_rate=0.10, engines=None, names=None):
+        """
+        KPIs for a columnar scenario table (see batch.columns), evaluating
+        only rows not already stored -- on the vectorized batch path -- and
+        storing them (cash flows only, no schedule; paybacks rounded up to
+        whole years as the scalar model reports them). Returns the same
+        columns as query() in table order.
+        """
+        cols, n = batch.columns(table)
+        # Every numeric input is a column already (efficiencies on an HHV basis); only the basis needs filling in
+        values = [v.tolist() for v in cols.values()]
+        rows = [dict(zip(cols, row), hh_basis='HHV') for row in zip(*values)]
+        keys = [_key(p, npv_rate) for p in rows]
+        known = set(self._select_keys(keys, ('key',))['key'])
+        todo = [i for i in range(n) if keys[i] not in known]
+        with self._lock:
+            self.hits += n - len(todo)
+            self.misses += len(todo)
+        if todo:
+            sub = {k: v[todo] for k, v in cols.items()}
+            cf, total_eff = batch.annual_schedule_batch(sub)
+            irr, _ = batch.irr_batch(cf)
+            kpis = batch.kpis_batch(cf, rates=(npv_rate,), payback_rate=npv_rate)
+            years = sub['years'].astype(int)
+            self.put_many(
+                (keys[i], rows[i],
+                 {'irr': irr[j], 'npv': kpis['npv'][j, 0], 'npv_rate': npv_rate,
+                  'payback': np.ceil(kpis['payback'][j]), 'disc_payback': np.ceil(kpis['disc_payback'][j]),
+                  'total_eff': total_eff[j],
+                  'cashflows': cf[j, :years[j] + 1]},
+                 engines[i] if engines is not None else None, names[i] if names is not None else None)
+                for j, i in enumerate(todo)
+            )
+        found = self._select_keys(keys, LIST_COLUMNS)
+        order = {k: i for i, k in enumerate(found['key'])}
+        idx = np.array([order[k] for k in keys], dtype=int)
+        return {c: v[idx] for c, v in found.items()}
+
+    def _select(self, where, args, columns, order=None, limit=None):
+        sql = f"SELECT {', '.join(columns)} FROM scenarios WHERE {where}"
+        if order:
+            sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return _columnar(rows, columns)
+
+    def _select_keys(self, keys, columns):
+        """Rows for `keys` (any order), in chunks below SQLite's bound-parameter limit."""
+        parts = [self._select(f"key IN ({','.join('?' * len(chunk))})", chunk, columns)
+                 for chunk in (keys[i:i + 900] for i in range(0, len(keys), 900))]
+        if not parts:
+            return _columnar([], columns)
+        return {c: np.concatenate([p[c] for p in parts]) for c in columns}
+
+    def query(self, engine=None, name_like=None, saved_only=False, min_irr=None, max_irr=None,
+              min_npv=None, max_npv=None, order_by='npv', descending=True, limit=None):
+        """
+        Filter stored scenarios. Returns {column: array} for LIST_COLUMNS
+        (KPIs as float arrays with NaN for missing, text as object arrays).
+        `engine` may be one name or a list.
+        """
+        where, args = ['1'], []
+        if engine is not None:
+            engines = [engine] if isinstance(engine, str) else list(engine)
+            where.append(f"engine IN ({','.join('?' * len(engines))})")
+            args += engines
+        if name_like:
+            where.append('name LIKE ?')
+            args.append(f'%{name_like}%')
+        elif saved_only:
+            where.append('name IS NOT NULL')
+        for column, op, value in (('irr', '>=', min_irr), ('irr', '<=', max_irr),
+                                  ('npv', '>=', min_npv), ('npv', '<=', max_npv)):
+            if value is not None:
+                where.append(f'{column} {op} ?')
+                args.append(float(value))
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"order_by must be one of {sorted(ORDER_COLUMNS)}")
+        order = f"{order_by} IS NULL, {order_by} {'DESC' if descending else 'ASC'}"
+        return self._select(' AND '.join(where), args, LIST_COLUMNS, order, limit)
+
+    def compare(self, keys):
+        """
+        Side-by-side view of scenarios in the given order: LIST_COLUMNS plus
+        'cashflows', a (scenarios × longest life+1) matrix padded with zeros.
+        """
+        keys = list(keys)
+        if not keys:
+            return {**_columnar([], LIST_COLUMNS), 'cashflows': np.zeros((0, 0))}
+        found = self._select_keys(keys, (*LIST_COLUMNS, 'cashflows'))
+        order = {k: i for i, k in enumerate(found['key'])}
+        missing = [k for k in keys if k not in order]
+        if missing:
+            raise KeyError(f"unknown scenario keys: {', '.join(missing[:3])}")
+        idx = np.array([order[k] for k in keys], dtype=int)
+        flows = [np.frombuffer(found['cashflows'][i]) for i in idx]
+        matrix = np.zeros((len(flows), max(len(f) for f in flows)))
+        for row, f in zip(matrix, flows):
+            row[:len(f)] = f
+        out = {c: found[c][idx] for c in LIST_COLUMNS}
+        out['cashflows'] = matrix
+        return out
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {'scenarios': len(self), 'hits': hits, 'misses': misses,
+                'hit_rate': hits / total if total else 0.0, 'path': self.path}
+
+
+def _columnar(rows, columns):
+    """Column-wise NumPy arrays from SQL rows: floats for numeric columns, object arrays otherwise."""
+    data = list(zip(*rows)) if rows else [()] * len(columns)
+    out = {}
+    for column, values in zip(columns, data):
+        if column in KPI_COLUMNS or column == 'created':
+            out[column] = np.array(values, dtype=float) if values else np.zeros(0)
+        else:
+            out[column] = np.array(values, dtype=object) if values else np.zeros(0, dtype=object)
+    return out
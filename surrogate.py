@@ -0,0 +1,208 @@
+"""
+Response-surface surrogate for instant slider feedback.
+
+For one set of "base" inputs (engine, financing terms, tax, escalation...)
+the KPIs are precomputed with the batch engine on a regular grid over the
+main sliders (AXES: gas price, both tariffs, capacity factor, CapEx, debt
+fraction) spanning a window around the current values. A slider change
+inside the window is then answered by multilinear interpolation from the
+2^d surrounding grid points -- one gather and one weighted sum, about
+100 µs -- instead of a schedule/IRR/NPV evaluation. A ±30 % window keeps
+IRR within a few tenths of a point for typical projects; narrower windows
+are more accurate and rebuilt more often.
+
+Every surrogate is checked against the exact model on random points inside
+its window and carries the error bounds (max and 95th percentile absolute
+error per KPI), so the app can show how far to trust it. Builds run on a
+background thread (SurrogateBuilder) and a new window is queued whenever a
+slider leaves the current one. Flat (capacity-factor) mode only.
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import batch
+import finance
+from cache import params_key
+
+# Slider inputs spanned by the grid
+AXES = ('gas_price_per_mmbtu', 'tariff_elec', 'tariff_therm', 'cap_factor', 'capex', 'debt')
+
+# Fractions use an absolute window clipped to these bounds; other axes a relative one
+FRACTION_BOUNDS = {'cap_factor': (0.0, 1.0), 'debt': (0.0, 1.0)}
+
+KPIS = ('irr', 'npv', 'payback', 'disc_payback')
+
+DEFAULT_POINTS = 7     # grid points per axis (7^6 ≈ 118k scenarios)
+DEFAULT_SPAN = 0.3     # ± relative window (± span/2 absolute for fractions)
+VALIDATION_POINTS = 512
+
+
+def axis_values(params, points=DEFAULT_POINTS, span=DEFAULT_SPAN):
+    """{axis: grid values} for a window around params' current values (one point where the value is 0)."""
+    axes = {}
+    for key in AXES:
+        value = float(params[key])
+        if key in FRACTION_BOUNDS:
+            lo, hi = FRACTION_BOUNDS[key]
+            lo, hi = max(lo, value - span / 2), min(hi, value + span / 2)
+        else:
+            lo, hi = sorted((value * (1 - span), value * (1 + span)))
+        axes[key] = np.linspace(lo, hi, points) if hi > lo else np.array([value])
+    return axes
+
+
+def base_key(params, npv_rate=0.10):
+    """Hash of everything a surrogate depends on except the slider axes."""
+    return params_key({k: v for k, v in params.items() if k not in AXES}, float(npv_rate))
+
+
+def _table(params, columns):
+    """Scenario table: params' other inputs with the axis columns replaced."""
+    table = {k: v for k, v in finance.hhv_params(params).items() if not isinstance(v, str)}
+    table.update(columns)
+    return table
+
+
+def _exact(params, columns, npv_rate):
+    """Exact KPIs for every row of `columns` (batch engine)."""
+    cf, _ = batch.annual_schedule_batch(_table(params, columns))
+    irr, _ = batch.irr_batch(cf)
+    kpis = batch.kpis_batch(cf, rates=(npv_rate,), payback_rate=npv_rate)
+    return {'irr': irr, 'npv': kpis['npv'][:, 0], 'payback': kpis['payback'],
+            'disc_payback': kpis['disc_payback']}
+
+
+class Surrogate:
+    """KPI grid over AXES for one base scenario, with multilinear lookup and validated error bounds."""
+
+    def __init__(self, key, axes, values, npv_rate):
+        self.key = key
+        self.axes = axes                  # {axis: grid values}
+        self.npv_rate = npv_rate
+        self.errors = {}                  # {kpi: {'max': .., 'p95': ..}} vs. the exact model
+        self.build_seconds = 0.0
+        shape = tuple(len(v) for v in axes.values())
+        self._values = np.stack([values[k].reshape(-1) for k in KPIS])   # (KPIs × grid points)
+        self._lo = np.array([v[0] for v in axes.values()])
+        self._hi = np.array([v[-1] for v in axes.values()])
+        n = np.array(shape)
+        self._step = np.where(n > 1, (self._hi - self._lo) / np.maximum(n - 1, 1), 1.0)
+        self._last = np.maximum(n - 2, 0)
+        strides = np.cumprod((1,) + shape[:0:-1])[::-1]
+        # Corners of a grid cell over the axes that vary (single-point axes have none)
+        active = np.flatnonzero(n > 1)
+        bits = np.zeros((2 ** active.size, len(shape)), dtype=np.intp)
+        bits[:, active] = list(itertools.product((0, 1), repeat=active.size))
+        self._bits = bits.astype(bool)
+        self._offsets = bits @ strides
+        self._strides = strides
+
+    @property
+    def grid_size(self):
+        return self._values.shape[1]
+
+    def points(self, params):
+        """(m × axes) query points from a params dict or a table of axis columns."""
+        return np.column_stack([np.asarray(params[k], dtype=float).reshape(-1) for k in self.axes])
+
+    def covers(self, params, npv_rate=None):
+        """True when params share this surrogate's base inputs and every slider lies inside its window."""
+        if base_key(params, self.npv_rate if npv_rate is None else npv_rate) != self.key:
+            return False
+        x = self.points(params)
+        return bool(np.all((x >= self._lo - 1e-12) & (x <= self._hi + 1e-12)))
+
+    def predict_points(self, x):
+        """{kpi: (m,) values} at query points (m × axes) inside the window; NaN near IRR-less corners."""
+        pos = (np.asarray(x, dtype=float) - self._lo) / self._step
+        i = np.clip(np.floor(pos), 0, self._last).astype(np.intp)
+        w = np.clip(pos - i, 0.0, 1.0)
+        weights = np.prod(np.where(self._bits, w[:, None, :], 1.0 - w[:, None, :]), axis=2)   # (m × corners)
+        corners = self._values[:, (i @ self._strides)[:, None] + self._offsets]             # (KPIs × m × corners)
+        out = np.where(weights > 0, corners * weights, 0.0).sum(axis=2)
+        return dict(zip(KPIS, out))
+
+    def predict(self, params):
+        """KPIs for one params dict (floats) or a table of axis columns (arrays)."""
+        out = self.predict_points(self.points(params))
+        if all(np.ndim(params[k]) == 0 for k in self.axes):
+            return {k: float(v[0]) for k, v in out.items()}
+        return out
+
+    def validate(self, params, n=VALIDATION_POINTS, seed=0):
+        """Compare with the exact model at n random points in the window; fills and returns self.errors."""
+        rng = np.random.default_rng(seed)
+        columns = {k: rng.uniform(v[0], v[-1], n) for k, v in self.axes.items()}
+        exact = _exact(params, columns, self.npv_rate)
+        approx = self.predict_points(np.column_stack(list(columns.values())))
+        for kpi in KPIS:
+            err = np.abs(approx[kpi] - exact[kpi])
+            both = np.isfinite(approx[kpi]) & np.isfinite(exact[kpi])
+            self.errors[kpi] = {
+                'max': float(err[both].max()) if both.any() else float('nan'),
+                'p95': float(np.percentile(err[both], 95)) if both.any() else float('nan'),
+                # Points where only one side has a value (e.g. IRR or payback appears/disappears)
+                'mismatch': float(np.mean(np.isfinite(approx[kpi]) != np.isfinite(exact[kpi]))),
+            }
+        return self.errors
+
+
+def build(params, npv_rate=0.10, points=DEFAULT_POINTS, span=DEFAULT_SPAN, validate=VALIDATION_POINTS):
+    """Evaluate the KPI grid around params (one batch run) and validate it. Returns a Surrogate."""
+    start = time.perf_counter()
+    axes = axis_values(params, points, span)
+    mesh = np.meshgrid(*axes.values(), indexing='ij')
+    exact = _exact(params, {k: m.reshape(-1) for k, m in zip(axes, mesh)}, npv_rate)
+    shape = mesh[0].shape
+    sg = Surrogate(base_key(params, npv_rate), axes, {k: v.reshape(shape) for k, v in exact.items()}, npv_rate)
+    if validate:
+        sg.validate(params, validate)
+    sg.build_seconds = time.perf_counter() - start
+    return sg
+
+
+class SurrogateBuilder:
+    """
+    Builds surrogates on one background thread. get() returns a finished
+    surrogate covering the inputs, or None after queuing a build centred on
+    them (at most one pending build per base scenario); the most recent
+    `keep` surrogates are kept.
+    """
+
+    def __init__(self, keep=8, **options):
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='surrogate')
+        self._builds = OrderedDict()   # (base key, window) -> Future
+        self._keep = keep
+        self._options = options
+        self._lock = threading.Lock()
+
+    def get(self, params, npv_rate=0.10):
+        key = base_key(params, npv_rate)
+        with self._lock:
+            pending = False
+            for (k, _), future in reversed(self._builds.items()):
+                if k != key:
+                    continue
+                if not future.done():
+                    pending = True
+                elif future.exception() is None and future.result().covers(params, npv_rate):
+                    return future.result()
+            if not pending:
+                window = params_key({k: float(params[k]) for k in AXES})
+                self._builds[(key, window)] = self._pool.submit(build, dict(params), npv_rate, **self._options)
+                while len(self._builds) > self._keep:
+                    self._builds.popitem(last=False)
+        return None
+
+    def status(self):
+        """{'ready': n, 'building': n, 'failed': n}."""
+        with self._lock:
+            futures = list(self._builds.values())
+        done = [f for f in futures if f.done()]
+        failed = sum(f.exception() is not None for f in done)
+        return {'ready': len(done) - failed, 'building': len(futures) - len(done), 'failed': failed}
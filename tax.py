@@ -0,0 +1,88 @@
+"""
+Tax depreciation, debt amortization and income tax for the finance model.
+
+Depreciation uses MACRS GDS tables (half-year convention) for 5-, 7- and
+15-year property, optionally with bonus depreciation taken in the first
+year. The depreciable basis is CapEx reduced by half the §48 ITC. Debt is
+a level-payment loan; only its interest share is deductible. Taxable losses
+carry forward against later years' income.
+
+Tables depend only on (class, project life) and (rate, term), so they are
+computed once per distinct key and shared by every scenario using it;
+batch.py expands them into (scenarios × years) arrays. Standard library only.
+"""
+from functools import lru_cache
+
+# IRS Pub. 946 Table A-1 (GDS, 200%/150% DB, half-year convention), fraction of basis per year
+MACRS_TABLES = {
+    5: (0.2000, 0.3200, 0.1920, 0.1152, 0.1152, 0.0576),
+    7: (0.1429, 0.2449, 0.1749, 0.1249, 0.0893, 0.0892, 0.0893, 0.0446),
+    15: (0.0500, 0.0950, 0.0855, 0.0770, 0.0693, 0.0623, 0.0590, 0.0590,
+         0.0591, 0.0590, 0.0591, 0.0590, 0.0591, 0.0590, 0.0591, 0.0295),
+}
+
+# 0 = no depreciation deduction
+MACRS_CLASSES = (0, *MACRS_TABLES)
+
+# Optional tax keys and their values when a caller omits them (CHP is 5-year energy property)
+TAX_DEFAULTS = {'macrs_class': 5, 'bonus_pct': 0.0}
+
+
+def depreciable_basis(capex, itc_pct):
+    """Depreciable basis after the ITC basis reduction (half the credit)."""
+    return capex * (1 - 0.5 * itc_pct)
+
+
+@lru_cache(maxsize=256)
+def macrs_fractions(macrs_class, years):
+    """
+    Fraction of basis deducted in operating years 1..years. Basis still
+    undepreciated at the end of the project is written off in the final year.
+    """
+    macrs_class = int(macrs_class)
+    if macrs_class == 0:
+        return (0.0,) * years
+    if macrs_class not in MACRS_TABLES:
+        raise ValueError(f"macrs_class must be one of {MACRS_CLASSES}, got {macrs_class}")
+    table = MACRS_TABLES[macrs_class][:years]
+    fractions = table + (0.0,) * (years - len(table))
+    if years:
+        fractions = fractions[:-1] + (fractions[-1] + 1.0 - sum(table),)
+    return fractions
+
+
+def depreciation_fractions(macrs_class, bonus_pct, years):
+    """macrs_fractions with `bonus_pct` of the basis expensed in year 1 and the rest on the MACRS table."""
+    fractions = macrs_fractions(macrs_class, years)
+    if not bonus_pct or not years or int(macrs_class) == 0:
+        return fractions
+    rest = 1.0 - bonus_pct
+    return (bonus_pct + rest * fractions[0],) + tuple(rest * f for f in fractions[1:])
+
+
+def loan_payment(principal, rate, term):
+    """Level annual payment; 0 without debt, term or (positive) interest, as in the cash-flow model."""
+    if principal > 0 and term > 0 and rate > 0:
+        growth = (1 + rate) ** term
+        return principal * rate * growth / (growth - 1)
+    return 0.0
+
+
+@lru_cache(maxsize=1024)
+def interest_fractions(rate, term):
+    """Interest paid in years 1..term per unit of principal on a level-payment loan."""
+    term = int(term)
+    payment = loan_payment(1.0, rate, term)
+    return tuple(payment * (1 - (1 + rate) ** -(term - k)) for k in range(term))
+
+
+def taxes(taxable, tax_rate):
+    """Tax per year on `taxable` income; losses carry forward (no carryback, no refund)."""
+    out = []
+    cum = taxed = 0.0
+    for income in taxable:
+        cum += income
+        base = max(taxed, cum)
+        out.append((base - taxed) * tax_rate)
+        taxed = base
+    return out
@@ -0,0 +1,67 @@
+"""
+Streamlit app reruns (run headless with streamlit.testing's AppTest).
+
+    python -m pytest -q
+"""
+import os
+import time
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import charts
+import instrument
+import store
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+
+@pytest.fixture
+def recording(monkeypatch, tmp_path):
+    """Stage timings on and reset; the scenario store in a temp folder."""
+    monkeypatch.setattr(store.ScenarioStore.__init__, '__defaults__', (str(tmp_path / 'scenarios.sqlite'),))
+    was = instrument.enabled
+    instrument.enable(True)
+    instrument.reset()
+    yield
+    instrument.enable(was)
+    instrument.reset()
+
+
+def _metric_labels(at):
+    return [m.label for m in at.metric]
+
+
+def test_surrogate_rerun_skips_exact_model(recording, monkeypatch):
+    monkeypatch.setattr(st, 'rerun', lambda *a, **k: None)   # drive the settle rerun by hand
+    at = AppTest.from_file(APP, default_timeout=300).run()
+    [c for c in at.sidebar.checkbox if c.label.startswith("Surrogate")][0].check().run()
+    deadline = time.perf_counter() + 120
+    while any('building' in c.value for c in at.caption):
+        assert time.perf_counter() < deadline, "surrogate grid did not finish"
+        time.sleep(0.5)
+        at.run()
+
+    instrument.reset()
+    [n for n in at.number_input if n.label.startswith("Natural gas price")][0].set_value(5.5).run()
+    assert not at.exception
+    assert "IRR ≈" in _metric_labels(at)
+    assert 'app.evaluate' not in instrument.snapshot()['stages']
+
+    at.run()   # the rerun queued once the inputs settle
+    assert "IRR" in _metric_labels(at)
+    assert instrument.snapshot()['stages']['app.evaluate']['calls'] >= 1
+
+
+def test_profiler_and_timer_closed_on_error(recording, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("chart failed")
+
+    monkeypatch.setattr(charts, 'cashflow_png', fail)
+    at = AppTest.from_file(APP, default_timeout=300)
+    at.session_state['debug_profile'] = True
+    at.run()
+    assert at.exception
+    assert instrument.snapshot()['stages']['app.rerun']['calls'] == 1
+    assert at.session_state['debug_profile_text']
@@ -0,0 +1,128 @@
+"""
+Scalar vs. batch agreement: the vectorized engine must reproduce
+finance.annual_schedule / irr / npv / paybacks row by row.
+
+    python -m pytest -q
+"""
+import math
+
+import numpy as np
+import pytest
+
+import batch
+import finance
+
+N = 200
+
+
+def scenarios(n, years, seed=0):
+    """Columnar table of n varied scenarios (escalation, degradation, overhauls, tax, thermal inputs)."""
+    rng = np.random.default_rng(seed)
+    table = {k: np.full(n, v, dtype=float) for k, v in finance.DEFAULT_PARAMS.items() if not isinstance(v, str)}
+    table.update(
+        power_kw=rng.uniform(300, 4500, n),
+        elec_eff_pct=rng.uniform(30, 46, n),
+        therm_eff_pct=rng.uniform(30, 50, n),
+        therm_output_kw=np.where(rng.random(n) < 0.3, rng.uniform(300, 4000, n), 0.0),
+        cap_factor=rng.uniform(0.3, 1.0, n),
+        tariff_elec=rng.uniform(0.04, 0.20, n),
+        tariff_therm=rng.uniform(3.0, 12.0, n),
+        gas_price_per_mmbtu=rng.uniform(2.5, 9.0, n),
+        capex=rng.uniform(1e6, 8e6, n),
+        itc_pct=rng.choice([0.0, 0.1, 0.3], n),
+        debt=rng.uniform(0.0, 0.8, n),
+        interest=rng.uniform(0.03, 0.09, n),
+        term=rng.choice([5.0, 10.0, 15.0], n),
+        tax_rate=rng.uniform(0.0, 0.35, n),
+        macrs_class=rng.choice([5.0, 7.0, 15.0], n),
+        bonus_pct=rng.choice([0.0, 0.6, 1.0], n),
+        ambient_derate=rng.uniform(0.9, 1.0, n),
+        esc_elec=rng.uniform(-0.01, 0.04, n),
+        esc_gas=rng.uniform(-0.01, 0.04, n),
+        esc_om=rng.uniform(0.0, 0.03, n),
+        degradation=rng.uniform(0.0, 0.01, n),
+        eff_degradation=rng.uniform(0.0, 0.005, n),
+        overhaul_interval=rng.choice([0.0, 5.0, 8.0], n),
+        overhaul_cost=rng.uniform(0.0, 3e5, n),
+        years=np.full(n, float(years)) if np.isscalar(years) else rng.choice(years, n).astype(float),
+    )
+    table['hh_basis'] = rng.choice(['HHV', 'LHV'], n)
+    return table
+
+
+INT_KEYS = ('years', 'term', 'macrs_class', 'overhaul_interval')
+
+
+def rows(table):
+    """The table as scalar params dicts."""
+    out = []
+    for i in range(len(table['power_kw'])):
+        p = {k: float(v[i]) for k, v in table.items() if k != 'hh_basis'}
+        p.update({k: int(p[k]) for k in INT_KEYS}, hh_basis=str(table['hh_basis'][i]))
+        out.append(p)
+    return out
+
+
+@pytest.fixture(scope='module', params=[20, 30, (10, 20, 30)], ids=['y20', 'y30', 'mixed'])
+def case(request):
+    table = scenarios(N, request.param, seed=len(str(request.param)))
+    scalar = [finance.annual_schedule(p) for p in rows(table)]
+    cf, total_eff = batch.annual_schedule_batch(table)
+    return table, scalar, cf, total_eff
+
+
+def test_annual_schedule_matches(case):
+    table, scalar, cf, total_eff = case
+    for i, (_, flows, eff) in enumerate(scalar):
+        np.testing.assert_allclose(cf[i, :len(flows)], flows, rtol=1e-9, atol=1e-6)
+        assert not cf[i, len(flows):].any()   # padding beyond the row's horizon
+        assert total_eff[i] == pytest.approx(eff, rel=1e-12)
+
+
+def test_irr_matches(case):
+    _, scalar, cf, _ = case
+    rates, status = batch.irr_batch(cf)
+    for i, (_, flows, _) in enumerate(scalar):
+        expected = finance.irr(flows)
+        if math.isnan(expected):
+            assert math.isnan(rates[i]) and status[i] == batch.IRR_NO_ROOT
+        else:
+            assert rates[i] == pytest.approx(expected, abs=1e-5)
+
+
+def test_npv_and_paybacks_match(case):
+    _, scalar, cf, _ = case
+    kpis = batch.kpis_batch(cf, rates=(0.08, 0.10), payback_rate=0.10)
+    np.testing.assert_allclose(kpis['npv'], batch.npv_batch((0.08, 0.10), cf), rtol=1e-12)
+    for i, (_, flows, _) in enumerate(scalar):
+        assert kpis['npv'][i, 0] == pytest.approx(finance.npv(0.08, flows), rel=1e-9, abs=1e-6)
+        assert kpis['npv'][i, 1] == pytest.approx(finance.npv(0.10, flows), rel=1e-9, abs=1e-6)
+        # The batch paybacks are fractional; the scalar model reports the year they fall in
+        for fractional, whole in ((kpis['payback'][i], finance.simple_payback(flows)),
+                                  (kpis['disc_payback'][i], finance.discounted_payback(0.10, flows))):
+            assert (whole is None) == math.isnan(fractional)
+            if whole is not None:
+                assert math.ceil(fractional) == whole
+
+
+def test_evaluate_matches_batch_kpis():
+    table = scenarios(50, 25, seed=7)
+    cf, total_eff = batch.annual_schedule_batch(table)
+    irr, _ = batch.irr_batch(cf)
+    kpis = batch.kpis_batch(cf)
+    for i, p in enumerate(rows(table)):
+        res = finance.evaluate(p)
+        assert res['npv'] == pytest.approx(kpis['npv'][i, 0], rel=1e-9, abs=1e-6)
+        assert res['total_eff'] == pytest.approx(total_eff[i], rel=1e-12)
+        if not math.isnan(res['irr']):
+            assert res['irr'] == pytest.approx(irr[i], abs=1e-5)
+
+
+def test_neutral_profile_fast_path():
+    # Zero escalation/degradation skips the year profile; a zero-cost overhaul forces the full path
+    for p in rows(scenarios(50, (10, 20, 30), seed=11)):
+        p.update({k: 0.0 for k in finance.YEAR_PROFILE_DEFAULTS}, overhaul_interval=0)
+        fast = finance.annual_schedule(p)
+        full = finance.annual_schedule(dict(p, overhaul_cost=1.0))
+        assert fast[1] == full[1]
+        assert fast[0].to_lists() == full[0].to_lists()
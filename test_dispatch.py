@@ -0,0 +1,34 @@
+"""
+Hourly profiles: file loading and validation.
+
+    python -m pytest -q
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dispatch
+
+
+def _csv(rows, **extra):
+    df = pd.DataFrame({'elec_load_kw': np.linspace(200.0, 900.0, rows), **extra})
+    return io.BytesIO(df.to_csv(index=False).encode('utf-8'))
+
+
+def test_load_profile_columns():
+    profile = dispatch.load_profile(_csv(8760, price_elec=0.1, notes='x'))
+    assert set(profile) == {'elec_load_kw', 'price_elec'}
+    assert profile['elec_load_kw'].shape == (8760,) and profile['elec_load_kw'].dtype == float
+
+
+@pytest.mark.parametrize('rows', [24, 8759, 8784])
+def test_load_profile_rejects_partial_years(rows):
+    with pytest.raises(ValueError, match='8760 rows'):
+        dispatch.load_profile(_csv(rows))
+
+
+def test_load_profile_needs_electric_load():
+    with pytest.raises(ValueError, match='elec_load_kw'):
+        dispatch.load_profile(io.BytesIO(b'price_elec\n0.1\n'))
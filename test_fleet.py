@@ -0,0 +1,55 @@
+"""
+Fleet availability: capacity-distribution folding and plant runs.
+
+    python -m pytest -q
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+import catalog
+import finance
+import fleet
+
+PARAMS = dict(finance.DEFAULT_PARAMS, power_kw=1500.0, elec_eff_pct=40.0)
+
+
+def brute_force(availability, unit_kw, target_kw):
+    """Expected min(capacity, target) ÷ target by enumerating every up/down combination."""
+    out = np.zeros(availability.shape[:-1])
+    for states in itertools.product((0, 1), repeat=len(unit_kw)):
+        up = np.array(states, dtype=bool)
+        prob = np.prod(np.where(up, availability, 1.0 - availability), axis=-1)
+        out += prob * min(float(np.dot(up, unit_kw)), target_kw) / target_kw
+    return out
+
+
+@pytest.mark.parametrize('unit_kw', [[1000.0] * 4, [2000.0, 1500.0, 1500.0, 800.0, 400.0], [1200.0]])
+def test_delivered_fraction_matches_enumeration(unit_kw):
+    rng = np.random.default_rng(1)
+    availability = rng.uniform(0.7, 1.0, (30, 3, len(unit_kw)))
+    for redundancy in range(len(unit_kw)):
+        target = fleet.firm_capacity(unit_kw, redundancy)
+        np.testing.assert_allclose(fleet.delivered_fraction(availability, unit_kw, target),
+                                   brute_force(availability, unit_kw, target), rtol=1e-12)
+
+
+def test_firm_capacity():
+    assert fleet.firm_capacity([1000.0, 2000.0, 1500.0]) == 2500.0
+    assert fleet.firm_capacity([1000.0, 2000.0, 1500.0], redundancy=0) == 4500.0
+    with pytest.raises(ValueError):
+        fleet.firm_capacity([1000.0], redundancy=1)
+
+
+def test_single_unit_plant_runs_with_default_redundancy():
+    engine = catalog.all_models()[0]
+    res = fleet.run(PARAMS, [engine], n=200, seed=0)
+    assert res.target_kw == catalog.engine_params(engine)['power_kw']
+    assert 0.9 < res.plant_availability < 1.0
+
+
+def test_overhauls_staggered():
+    flags = fleet.overhaul_schedule(3, 20, 6)
+    assert flags.sum(axis=1).max() == 1
+    np.testing.assert_array_equal(flags[:, 0], finance.year_profile(dict(PARAMS, overhaul_interval=6))['overhaul'])
@@ -0,0 +1,53 @@
+"""
+Goal-seek: solved inputs must reproduce the target through the scalar model.
+
+    python -m pytest -q
+"""
+import math
+
+import numpy as np
+import pytest
+
+import batch
+import catalog
+import finance
+import goalseek
+
+PARAMS = dict(finance.DEFAULT_PARAMS, power_kw=1500.0, elec_eff_pct=40.0, therm_eff_pct=40.0)
+
+
+@pytest.mark.parametrize('key', ['gas_price_per_mmbtu', 'tariff_elec', 'capex'])
+def test_irr_target(key):
+    value = goalseek.breakeven(PARAMS, key, 0.12, 'irr')
+    assert finance.irr(finance.annual_schedule(dict(PARAMS, **{key: value}))[1]) == pytest.approx(0.12, abs=1e-6)
+
+
+def test_npv_target_with_tax_kink():
+    # A taxed project: the residual kinks where taxable income crosses zero
+    params = dict(PARAMS, tax_rate=0.25, debt=0.5)
+    values, status = goalseek.breakeven_batch(
+        {k: v for k, v in params.items() if not isinstance(v, str)}, 'gas_price_per_mmbtu', 1e6, 'npv')
+    assert status[0] in (goalseek.SOLVED_LINEAR, goalseek.SOLVED_BRACKETED)
+    cf = finance.annual_schedule(dict(params, gas_price_per_mmbtu=values[0]))[1]
+    assert finance.npv(0.10, cf) == pytest.approx(1e6, abs=1.0)
+
+
+def test_payback_target():
+    capex = goalseek.breakeven(PARAMS, 'capex', 5.0, 'payback')
+    cf = finance.annual_schedule(dict(PARAMS, capex=capex))[1]
+    assert sum(cf[:6]) == pytest.approx(0.0, abs=1e-3 * capex)
+
+
+def test_unreachable_target():
+    values, status = goalseek.breakeven_batch(
+        {k: v for k, v in PARAMS.items() if not isinstance(v, str)}, 'tariff_elec', 5.0, 'irr', bracket=(0.0, 0.01))
+    assert math.isnan(values[0]) and status[0] == goalseek.NO_SOLUTION
+
+
+def test_catalog_matches_single_solves():
+    engines = catalog.all_models()[:4]
+    solved = goalseek.breakeven_catalog(PARAMS, engines, 'gas_price_per_mmbtu', 0.10)
+    table = batch.engine_table(PARAMS, engines)
+    for i, (engine, value, _) in enumerate(solved):
+        row = {k: v[i] if isinstance(v, np.ndarray) else v for k, v in table.items()}
+        assert value == pytest.approx(goalseek.breakeven(row, 'gas_price_per_mmbtu', 0.10), rel=1e-9)
@@ -0,0 +1,41 @@
+"""
+Interval-meter loader: hourly aggregation across chunks and the .npy cache.
+
+    python -m pytest -q
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import meter
+
+
+@pytest.fixture
+def interval_csv(tmp_path):
+    # Two days of 15-minute data with day-first timestamps
+    ts = pd.date_range('2024-01-02', periods=192, freq='15min')
+    path = tmp_path / 'meter.csv'
+    pd.DataFrame({
+        'timestamp': ts.strftime('%d/%m/%Y %H:%M'),
+        'elec_load_kw': np.arange(192, dtype=float),
+        'therm_load_mmbtu': np.full(192, 0.25),
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_hourly_aggregation_across_chunks(interval_csv):
+    hourly = meter.read_hourly(interval_csv, ts_format='%d/%m/%Y %H:%M', chunksize=7)
+    assert len(hourly['hour']) == 48
+    assert hourly['hour'][0] == np.datetime64('2024-01-02T00', 'h')
+    np.testing.assert_allclose(hourly['elec_load_kw'][:2], [1.5, 5.5])
+    np.testing.assert_allclose(hourly['therm_load_mmbtu'], 1.0)
+
+
+def test_cache_keyed_on_timestamp_format(interval_csv, tmp_path):
+    cache = str(tmp_path / 'cache')
+    day_first = meter.read_hourly(interval_csv, ts_format='%d/%m/%Y %H:%M', cache_dir=cache)
+    assert isinstance(meter.read_hourly(interval_csv, ts_format='%d/%m/%Y %H:%M', cache_dir=cache)['hour'],
+                      np.memmap)
+    month_first = meter.read_hourly(interval_csv, ts_format='%m/%d/%Y %H:%M', cache_dir=cache)
+    assert month_first['hour'][0] == np.datetime64('2024-02-01T00', 'h')
+    assert day_first['hour'][0] == np.datetime64('2024-01-02T00', 'h')
@@ -0,0 +1,23 @@
+"""
+Monte Carlo sampling.
+
+    python -m pytest -q
+"""
+import numpy as np
+
+import montecarlo
+
+
+def test_draws_clipped_to_physical_bounds():
+    dists = {k: ('normal', 0.5, 2.0) for k in montecarlo.CLIP}
+    draws = montecarlo.sample(dists, 20_000, seed=1)
+    for key, (low, high) in montecarlo.CLIP.items():
+        assert draws[key].min() >= low and draws[key].max() <= high
+    assert (draws['gas_price_per_mmbtu'] == 0.0).any()   # the tail is clipped, not redrawn
+
+
+def test_correlated_draws():
+    dists = {'gas_price_per_mmbtu': ('normal', 5.0, 1.0), 'tariff_elec': ('normal', 0.10, 0.01)}
+    draws = montecarlo.sample(dists, 50_000, {('gas_price_per_mmbtu', 'tariff_elec'): 0.6}, seed=2)
+    rho = np.corrcoef(draws['gas_price_per_mmbtu'], draws['tariff_elec'])[0, 1]
+    assert abs(rho - 0.6) < 0.02
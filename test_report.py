@@ -0,0 +1,65 @@
+"""
+Background report jobs.
+
+    python -m pytest -q
+"""
+import io
+import time
+
+import pytest
+
+import finance
+import report
+
+
+def _wait(jobs, job_id, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while jobs.status(job_id)['state'] in ('queued', 'running'):
+        assert time.perf_counter() < deadline, "report job did not finish"
+        time.sleep(0.01)
+    return jobs.status(job_id)
+
+
+@pytest.fixture(scope='module')
+def inputs():
+    res = finance.evaluate(dict(finance.DEFAULT_PARAMS, power_kw=1500.0, elec_eff_pct=40.0))
+    kpis = {'irr': res['irr'], 'npv_rate': res['npv_rate'], 'npv': res['npv'],
+            'payback': res['payback'], 'disc_payback': res['disc_payback']}
+    return kpis, res['schedule']
+
+
+def test_report_job_round_trip(inputs):
+    from docx import Document
+
+    jobs = report.ReportJobs(workers=1)
+    job_id = jobs.submit(*inputs)
+    assert _wait(jobs, job_id)['state'] == 'done'
+    doc = Document(io.BytesIO(jobs.result(job_id)))
+    assert len(doc.tables) == 1
+    assert len(doc.tables[0].rows) == len(inputs[1].to_lists()['year']) + 1
+    assert not report._template().paragraphs   # the cached template is never written to
+    jobs.shutdown()
+
+
+def test_evicted_job_reports_expired(inputs):
+    jobs = report.ReportJobs(workers=1, keep=1)
+    first = jobs.submit(*inputs)
+    _wait(jobs, first)
+    second = jobs.submit(*inputs)
+    _wait(jobs, second)
+    _wait(jobs, jobs.submit(*inputs))   # the third submit drops the oldest finished job
+    assert jobs.status(first)['state'] == 'expired'
+    assert jobs.status('r999')['state'] == 'expired'
+    with pytest.raises(RuntimeError, match='expired'):
+        jobs.result(first)
+    assert jobs.status(second)['state'] == 'done'
+    jobs.shutdown()
+
+
+def test_unsolvable_irr_shown_as_na(inputs):
+    from docx import Document
+
+    kpis, schedule = inputs
+    doc = Document(io.BytesIO(report.render_word(dict(kpis, irr=float('nan')), schedule)))
+    text = '\n'.join(p.text for p in doc.paragraphs)
+    assert 'IRR: n/a' in text and 'nan%' not in text
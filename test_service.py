@@ -0,0 +1,81 @@
+"""
+Scoring service: request validation, micro-batching and the response cache.
+
+    python -m pytest -q
+"""
+import math
+import threading
+
+import pytest
+
+import finance
+import service
+
+SCENARIO = {'power_kw': 1500.0, 'elec_eff_pct': 40.0}
+
+
+@pytest.fixture(scope='module')
+def svc():
+    # A long window so concurrent requests land in the same micro-batch
+    return service.ScoringService(workers=1, window=0.05)
+
+
+@pytest.mark.parametrize('bad', [
+    {'macrs_class': 3}, {'years': 0}, {'years': 20.5}, {'term': -1}, {'debt': 1.2}, {'cap_factor': -0.1},
+    {'tax_rate': 'high'}, {'capex': float('nan')}, {'hh_basis': 'XYZ'},
+])
+def test_invalid_scenarios_rejected(svc, bad):
+    with pytest.raises(service.RequestError):
+        svc.score(dict(SCENARIO, **bad))
+
+
+def test_integral_floats_coerced():
+    params = service._scenario(dict(SCENARIO, years=20.0, term=10.0, macrs_class=7.0), 'scenario 0')
+    assert all(type(params[k]) is int for k in service.INTEGER_KEYS)
+
+
+def test_float_years_with_schedule(svc):
+    res = svc.score(dict(SCENARIO, years=20.0), schedule=True)
+    assert res['schedule']['year'][-1] == 20
+    assert res['kpis']['npv'] == pytest.approx(finance.evaluate(dict(finance.DEFAULT_PARAMS, **SCENARIO))['npv'])
+
+
+def test_failing_scenario_isolated_in_batch():
+    # Bypasses request validation to force an evaluation error inside a shared batch
+    batcher = service.MicroBatcher(workers=1, window=0.05)
+    good = service._scenario(SCENARIO, 'good')
+    bad = dict(good, macrs_class=3)
+    futures = [batcher.submit(p, 0.10) for p in (good, bad, good)]
+    assert batcher.stats()['batches'] <= 1
+    assert futures[0].result()['kpis']['npv'] == pytest.approx(futures[2].result()['kpis']['npv'])
+    with pytest.raises(ValueError, match='macrs_class'):
+        futures[1].result()
+
+
+def test_concurrent_requests_batched_and_cached(svc):
+    results = [None] * 16
+
+    def call(i):
+        results[i] = svc.score(dict(SCENARIO, tariff_elec=0.08 + 0.005 * i))
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for i, res in enumerate(results):
+        expected = finance.evaluate(dict(finance.DEFAULT_PARAMS, **SCENARIO, tariff_elec=0.08 + 0.005 * i))
+        assert res['kpis']['npv'] == pytest.approx(expected['npv'])
+    assert svc.batcher.stats()['mean_batch'] > 1
+    hits = svc.cache.stats()['hits']
+    assert svc.score(dict(SCENARIO, tariff_elec=0.08)) == results[0]
+    assert svc.cache.stats()['hits'] == hits + 1
+
+
+def test_batch_payload_and_lhv():
+    svc = service.ScoringService(workers=1)
+    out = svc.score({'scenarios': [SCENARIO, dict(SCENARIO, hh_basis='lhv')]}, npv_rate=0.08)
+    lhv = finance.evaluate(dict(finance.DEFAULT_PARAMS, **SCENARIO, hh_basis='LHV'), 0.08)
+    assert out[1]['kpis']['npv'] == pytest.approx(lhv['npv'])
+    assert out[0]['kpis']['npv'] > out[1]['kpis']['npv']
+    assert all(v is None or math.isfinite(v) for v in out[0]['kpis'].values())
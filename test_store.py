@@ -0,0 +1,92 @@
+"""
+Scenario store: key stability, scalar/batch round trips, query and compare.
+
+    python -m pytest -q
+"""
+import math
+import threading
+
+import numpy as np
+import pytest
+
+import finance
+import store
+
+SCENARIO = dict(finance.DEFAULT_PARAMS, power_kw=1500.0, elec_eff_pct=40.0)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = store.ScenarioStore(str(tmp_path / 'scenarios.sqlite'))
+    yield db
+    db.close()
+
+
+def test_key_stability():
+    key = store.scenario_key(SCENARIO)
+    assert store.scenario_key(dict(SCENARIO, years=20.0)) == store.scenario_key(dict(SCENARIO, years=20))
+    assert store.scenario_key(dict(SCENARIO, esc_elec=0.0)) == key   # explicit default
+    lhv = dict(SCENARIO, hh_basis='LHV', elec_eff_pct=40.0 * finance.HHV_PER_LHV)
+    assert store.scenario_key(lhv) == store.scenario_key(finance.hhv_params(lhv))
+    assert store.scenario_key(SCENARIO, 0.08) != key
+    assert store.scenario_key(SCENARIO, 0.10, 'profile') != key
+    assert store.scenario_key(dict(SCENARIO, tariff_elec=0.13)) != key
+
+
+def test_round_trip(db):
+    first = db.get_or_evaluate(SCENARIO, engine='J620')
+    again = db.get_or_evaluate(dict(SCENARIO, years=20.0))
+    assert (db.hits, db.misses) == (1, 1)
+    expected = finance.evaluate(SCENARIO)
+    for res in (first, again):
+        assert res['cashflows'] == pytest.approx(expected['cashflows'])
+        assert res['npv'] == pytest.approx(expected['npv'])
+        assert res['payback'] == expected['payback']
+    assert again['schedule'].to_lists() == pytest.approx(expected['schedule'].to_lists())
+    assert db.params(first['key'])['years'] == 20.0
+
+
+def test_lhv_scalar_and_batch_share_a_row(db):
+    lhv = dict(SCENARIO, hh_basis='LHV')
+    scalar = db.get_or_evaluate(lhv)
+    table = {k: v for k, v in lhv.items() if k != 'hh_basis'}
+    table.update(power_kw=np.array([1500.0]), hh_basis=['LHV'])
+    rows = db.evaluate_batch(table)
+    assert rows['key'][0] == scalar['key']
+    assert (db.hits, db.misses) == (1, 1)
+    assert len(db) == 1
+
+
+def test_query_and_compare(db):
+    table = dict(SCENARIO, tariff_elec=np.array([0.06, 0.10, 0.14]))
+    del table['hh_basis']
+    rows = db.evaluate_batch(table, engines=['A', 'B', 'A'])
+    assert np.all(np.diff(rows['npv']) > 0)
+    db.save(rows['key'][1], 'mid tariff')
+
+    found = db.query(engine='A', order_by='npv')
+    assert list(found['key']) == [rows['key'][2], rows['key'][0]]
+    assert list(db.query(saved_only=True)['name']) == ['mid tariff']
+    assert len(db.query(min_npv=rows['npv'][1])['key']) == 2
+
+    cmp = db.compare([rows['key'][2], rows['key'][0]])
+    assert cmp['npv'] == pytest.approx(rows['npv'][[2, 0]])
+    assert cmp['cashflows'].shape == (2, SCENARIO['years'] + 1)
+    with pytest.raises(KeyError):
+        db.compare(['missing'])
+
+
+def test_concurrent_counters(db):
+    def call():
+        for i in range(20):
+            db.get_or_evaluate(dict(SCENARIO, tariff_elec=0.08 + 0.01 * (i % 4)))
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = db.stats()
+    assert stats['hits'] + stats['misses'] == 80
+    assert stats['scenarios'] == 4
+    assert math.isclose(stats['hit_rate'], stats['hits'] / 80)